@@ -0,0 +1,115 @@
+"""
+bloom.py – Memory-mapped Bloom filter over revoked token hashes.
+
+One file is shared by every worker process. It has a 32-byte header followed
+by the bit array:
+
+    magic        8s     b"RVBLOOM1"
+    generation   uint64 bumped on every change (and on a retired file when it
+                        is replaced by a rebuilt one)
+    num_bits     uint64
+    num_hashes   uint64
+
+Workers map the file and answer "definitely not revoked" from memory. Only a
+hit needs the exact store, and the exact store only needs re-reading when the
+generation differs from the one it was last synced to.
+
+Writers must hold the revocation lock (see utils._revocation_lock).
+"""
+
+import os, math, mmap, struct, tempfile, shutil
+from typing import Iterable, Tuple
+
+MAGIC = b"RVBLOOM1"
+HEADER = struct.Struct("<8sQQQ")  # magic, generation, num_bits, num_hashes
+
+
+def optimal_size(capacity: int, error_rate: float) -> Tuple[int, int]:
+    """(num_bits, num_hashes) for `capacity` entries at `error_rate` false positives."""
+    capacity = max(capacity, 1)
+    num_bits = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+    num_bits = (num_bits + 7) // 8 * 8
+    num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+    return num_bits, num_hashes
+
+
+def _positions(token_hash: str, num_bits: int, num_hashes: int):
+    # Double hashing over the sha256 hex digest (already uniformly distributed)
+    h1 = int(token_hash[:16], 16)
+    h2 = int(token_hash[16:32], 16) | 1
+    for i in range(num_hashes):
+        yield (h1 + i * h2) % num_bits
+
+
+def write(path: str, num_bits: int, num_hashes: int, token_hashes: Iterable[str], generation: int = 0) -> None:
+    """Write a filter containing `token_hashes` atomically (replacing any existing file)."""
+    bits = bytearray(num_bits // 8)
+    for token_hash in token_hashes:
+        for pos in _positions(token_hash, num_bits, num_hashes):
+            bits[pos >> 3] |= 1 << (pos & 7)
+    tmp_fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    os.close(tmp_fd)
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, generation, num_bits, num_hashes))
+            f.write(bits)
+        shutil.move(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class BloomFilter:
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "r+b") as f:
+            self.inode = os.fstat(f.fileno()).st_ino
+            self._mm = mmap.mmap(f.fileno(), 0)
+        magic, _, self.num_bits, self.num_hashes = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or len(self._mm) != HEADER.size + self.num_bits // 8:
+            self._mm.close()
+            raise ValueError(f"{path} is not a revocation filter")
+
+    @classmethod
+    def open(cls, path: str, capacity: int, error_rate: float) -> "BloomFilter":
+        """Map the shared filter, creating an empty one if it is missing or unreadable."""
+        try:
+            return cls(path)
+        except (FileNotFoundError, ValueError, struct.error):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            write(path, *optimal_size(capacity, error_rate), token_hashes=[])
+            return cls(path)
+
+    @property
+    def generation(self) -> int:
+        return HEADER.unpack_from(self._mm, 0)[1]
+
+    def bump(self) -> int:
+        generation = self.generation + 1
+        struct.pack_into("<Q", self._mm, 8, generation)
+        return generation
+
+    def might_contain(self, token_hash: str) -> bool:
+        mm = self._mm
+        for pos in _positions(token_hash, self.num_bits, self.num_hashes):
+            if not mm[HEADER.size + (pos >> 3)] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def add(self, token_hash: str) -> bool:
+        """Set the bits for a hash; True if any was newly set."""
+        mm, changed = self._mm, False
+        for pos in _positions(token_hash, self.num_bits, self.num_hashes):
+            i = HEADER.size + (pos >> 3)
+            if not mm[i] & (1 << (pos & 7)):
+                mm[i] |= 1 << (pos & 7)
+                changed = True
+        return changed
+
+    def replaced(self) -> bool:
+        """True if the shared file was swapped for a rebuilt one since it was mapped."""
+        try:
+            return os.stat(self.path).st_ino != self.inode
+        except FileNotFoundError:
+            return True
+
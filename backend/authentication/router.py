@@ -1,8 +1,10 @@
-from fastapi import APIRouter, HTTPException, Depends, status
+from fastapi import APIRouter, HTTPException, Depends, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm, HTTPAuthorizationCredentials, HTTPBearer
-from backend.authentication import schemas, utils, security
+from backend.authentication import schemas, utils, security, throttle
 from backend.penalties import utils as penalty_utils
-import uuid
+import uuid, math
+from typing import Optional
 
 bearer_scheme = HTTPBearer()
 
@@ -20,7 +22,7 @@ async def register(user: schemas.UserCreate):
         "user_id": str(uuid.uuid4()),
         "username": user.username,
         "email": user.email,
-        "hashed_password": security.hash_password(user.password),
+        "hashed_password": await security.hash_password_async(user.password),
         "role": user.role.value,
         "status": schemas.UserStatus.ACTIVE.value,
         "movies_reviewed": [],
@@ -41,14 +43,24 @@ async def register(user: schemas.UserCreate):
 
 # Login
 @router.post('/login', response_model=schemas.Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends()):
+async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
     """
     Authenticate user and issue a token.
     Restricted by penalties:
     - suspension → cannot log in
+    Throttled per client IP and per username (429 before any lookup or hashing).
     """
+    limited = throttle.check_login(form_data.username, request.client.host if request.client else None)
+    if limited:
+        limit, wait = limited
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Too many login attempts for this {limit}. Try again later.",
+            headers={"Retry-After": str(math.ceil(wait))},
+        )
+
     user = utils.get_user_by_username(form_data.username)
-    if not user or not security.verify_password(form_data.password, user["hashed_password"]):
+    if not user or not await security.verify_password_async(form_data.password, user["hashed_password"]):
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid username or password")
     
     if user["status"] != schemas.UserStatus.ACTIVE.value:
@@ -59,26 +71,55 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
     if restriction:
         raise HTTPException(status_code=403, detail="Your account is suspended. Please contact support.")
 
+    return _issue_tokens(user, utils.issue_refresh_token(user["user_id"]))
+
+
+def _issue_tokens(user: dict, refresh_token: str) -> dict:
     access_token = security.create_access_token(
         data={"sub": user["user_id"], "role": user["role"], "status": user["status"]}
     )
-
-    return {"access_token": access_token, "token_type": "bearer"}
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "refresh_token": refresh_token,
+        "expires_in": security.ACCESS_TOKEN_EXPIRE_MINUTES * 60,
+    }
 
 # Logout
 @router.post('/logout')
-async def logout(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme)):
+async def logout(
+    body: Optional[schemas.RefreshRequest] = None,
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+):
     token = credentials.credentials
     security.revoke_token(token)
+    if body is not None:
+        utils.revoke_refresh_token(body.refresh_token)  # 🔄 End the session too
     return {"message": "Successfully logged out and token revoked."}
 
 # Refresh
 @router.post("/refresh", response_model=schemas.Token)
-async def refresh_token(current_user: schemas.TokenData = Depends(security.get_current_user)):
-    new_token = security.create_access_token(
-        data={"sub": current_user.user_id, "role": current_user.role, "status": current_user.status}
-    )
-    return {"access_token": new_token, "token_type": "bearer"}
+async def refresh_token(body: schemas.RefreshRequest):
+    """
+    Exchange a refresh token for a new access token and the next refresh token.
+    Each refresh token works once; replaying a used one ends the session.
+    """
+    rotated = utils.rotate_refresh_token(body.refresh_token)
+    if not rotated:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired refresh token")
+    user_id, next_refresh_token = rotated
+
+    # Role and status come from the user record, not from the old token
+    user = utils.get_user_by_id(user_id)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid or expired refresh token")
+    if user["status"] != schemas.UserStatus.ACTIVE.value:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Account is deactivated")
+    restriction = penalty_utils.check_active_penalty(user_id, ["suspension"])
+    if restriction:
+        raise HTTPException(status_code=403, detail="Your account is suspended. Please contact support.")
+
+    return _issue_tokens(user, next_refresh_token)
 
 # Who Am I
 @router.get("/whoami", response_model=schemas.TokenData)
@@ -89,8 +130,7 @@ async def whoami(current_user=Depends(security.get_current_user)):
 # REQUEST PASSWORD RESET
 @router.post("/password/request")
 async def request_password_reset(email: str):
-    users = utils.load_all_users()
-    user = next((u for u in users if u["email"] == email), None)
+    user = utils.get_user_by_email(email)
     if not user:
         raise HTTPException(status_code=404, detail="Email not found")
 
@@ -106,23 +146,14 @@ async def reset_password(token: str, new_password: str):
     if not user_id:
         raise HTTPException(status_code=400, detail="Invalid or expired token")
 
-    # Update user's hashed password
-    users = utils.load_all_users()
-    updated = False
-    for user in users:
-        if user["user_id"] == user_id:
-            user["hashed_password"] = security.hash_password(new_password)
-            updated = True
-            break
-
-    if not updated:
+    if not utils.get_user_by_id(user_id):
         raise HTTPException(status_code=404, detail="User not found")
 
-    # Save to correct file
-    active = [u for u in users if u["status"] == "active"]
-    inactive = [u for u in users if u["status"] == "inactive"]
-    utils.save_active_users(active)
-    utils.save_inactive_users(inactive)
+    # Update user's hashed password (only the file holding this user is rewritten)
+    hashed_password = await security.hash_password_async(new_password)
+    if not await run_in_threadpool(utils.update_user_fields, user_id, {"hashed_password": hashed_password}):
+        raise HTTPException(status_code=404, detail="User not found")
+    await run_in_threadpool(utils.bump_token_generation, user_id)  # 🔁 Sign out every existing session
 
     return {"message": "Password successfully reset"}
 
@@ -66,6 +66,12 @@ class UserLogin(BaseModel):
 class Token(BaseModel):
     access_token: str  # 🔑 JWT token
     token_type: str = "bearer"  # 🏷️ Standard token type
+    refresh_token: Optional[str] = None  # 🔄 Opaque, single-use: exchange at /auth/refresh
+    expires_in: Optional[int] = None  # ⏱️ Access token lifetime in seconds
+
+# REFRESH / LOGOUT CONTRACT
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 # TOKEN DATA CONTRACT (What's embedded in JWT)
 class TokenData(BaseModel):
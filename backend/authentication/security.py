@@ -1,7 +1,9 @@
-import os
+import os, time, asyncio, threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from passlib.context import CryptContext
 from datetime import datetime, timezone, timedelta
-from typing import Optional
+from typing import Callable, Dict, Optional, Tuple
 import jwt
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -12,7 +14,9 @@ from backend.authentication import utils
 security_scheme = HTTPBearer()
 
 # Token Expiration Configuration
-ACCESS_TOKEN_EXPIRE_MINUTES = 60  # Tokens expire after 60 minutes
+# Short-lived: sessions continue through rotating refresh tokens (see utils), so a
+# logged-out access token only needs to stay on the revocation list for minutes
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "5"))
 
 # Secret Configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "fallback-secret-key")  # 🗝️ Get from env or use fallback
@@ -21,14 +25,89 @@ ALGORITHM = "HS256"  # JWT signing algorithm
 # Password Hashing Context
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-# Password Hashing
-def hash_password(password: str) -> str:
+# ────────────────────────────────
+# Password hashing pool
+# ────────────────────────────────
+# bcrypt takes ~200 ms of CPU per call. It runs on a small dedicated pool
+# (bcrypt releases the GIL, so threads hash in parallel) instead of on the
+# event loop or the shared request threadpool. At most PASSWORD_HASH_MAX_PENDING
+# operations may be queued or running; beyond that callers get 503 rather than
+# piling up behind a login burst.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
+
+_password_pool = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_password_slots = threading.BoundedSemaphore(PASSWORD_HASH_MAX_PENDING)
+_password_metrics_lock = threading.Lock()
+_password_metrics = {"submitted": 0, "completed": 0, "rejected": 0, "queue_seconds_total": 0.0, "queue_seconds_max": 0.0}
+
+
+def _submit_password_op(fn: Callable, *args) -> Future:
+    if not _password_slots.acquire(blocking=False):
+        with _password_metrics_lock:
+            _password_metrics["rejected"] += 1
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many password operations in progress, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
+    submitted = time.perf_counter()
+
+    def run():
+        waited = time.perf_counter() - submitted
+        with _password_metrics_lock:
+            _password_metrics["queue_seconds_total"] += waited
+            _password_metrics["queue_seconds_max"] = max(_password_metrics["queue_seconds_max"], waited)
+        try:
+            return fn(*args)
+        finally:
+            with _password_metrics_lock:
+                _password_metrics["completed"] += 1
+            _password_slots.release()
+
+    with _password_metrics_lock:
+        _password_metrics["submitted"] += 1
+    try:
+        return _password_pool.submit(run)
+    except RuntimeError:  # pool shut down
+        _password_slots.release()
+        raise
+
+
+def password_pool_stats() -> Dict[str, float]:
+    """Counters and queue wait (seconds spent waiting for a worker) of the hashing pool."""
+    with _password_metrics_lock:
+        stats = dict(_password_metrics)
+    stats["workers"] = PASSWORD_HASH_WORKERS
+    stats["max_pending"] = PASSWORD_HASH_MAX_PENDING
+    stats["pending"] = stats["submitted"] - stats["completed"]
+    stats["queue_seconds_avg"] = stats["queue_seconds_total"] / stats["completed"] if stats["completed"] else 0.0
+    return stats
+
+
+def _hash(password: str) -> str:
     return pwd_context.hash(password)  # Convert plain text to secure hash
 
-# Password Verification
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)  # ✅ Check if password matches hash
 
+
+# Password Hashing (blocking: for sync code paths, which run in a worker thread)
+def hash_password(password: str) -> str:
+    return _submit_password_op(_hash, password).result()
+
+# Password Verification (blocking)
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return _submit_password_op(_verify, plain_password, hashed_password).result()
+
+# Async variants for `async def` endpoints: the event loop keeps serving while bcrypt runs
+async def hash_password_async(password: str) -> str:
+    return await asyncio.wrap_future(_submit_password_op(_hash, password))
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await asyncio.wrap_future(_submit_password_op(_verify, plain_password, hashed_password))
+
 # Access Token Creation
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
@@ -37,6 +116,9 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     to_encode.update({ 
         "exp": expire,  # Add expiration timestamp
     })
+    if "sub" in to_encode:
+        # 🔁 Bumping the user's generation invalidates every token issued before
+        to_encode.setdefault("gen", utils.get_token_generation(to_encode["sub"]))
     # 🔏 Encode JWT with secret key
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
@@ -50,35 +132,30 @@ def verify_access_token(token: str) -> Optional[dict]:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         if not payload.get("sub"):
             return None
-        return payload
     except jwt.PyJWTError:
         return None
+    # Issued before the user's last password reset / status change / suspension?
+    if not _current_generation(payload, _now()):
+        return None
+    return payload
     
-def cleanup_revoked_tokens():
-    """Remove expired tokens from the revocation list."""
-    tokens = utils.load_revoked_tokens()
-    active_tokens = []
-    for t in tokens:
-        try:
-            payload = jwt.decode(t, SECRET_KEY, algorithms=[ALGORITHM])
-            exp = datetime.fromtimestamp(payload["exp"], tz=timezone.utc)
-            if exp > datetime.now(timezone.utc):
-                active_tokens.append(t)
-        except jwt.ExpiredSignatureError:
-            continue  # Token already expired
-        except Exception:
-            continue
-    utils.save_revoked_tokens(active_tokens)
+def _now() -> int:
+    return int(datetime.now(timezone.utc).timestamp())
 
 def revoke_token(token: str):
-    cleanup_revoked_tokens()
-    tokens = utils.load_revoked_tokens()
-    if token not in tokens:
-        tokens.append(token)
-    utils.save_revoked_tokens(tokens)
+    """Revoke a token until it would have expired anyway."""
+    try:
+        exp = jwt.decode(token, options={"verify_signature": False}).get("exp")
+    except jwt.PyJWTError:
+        return  # Not a JWT: it can never verify, nothing to revoke
+    if not isinstance(exp, (int, float)):
+        exp = _now() + ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    token_hash = utils.hash_token(token)
+    utils.revoke_token_hash(token_hash, int(exp), _now())
+    _token_cache.discard(token_hash)
 
 def is_token_revoked(token: str) -> bool:
-    return token in utils.load_revoked_tokens()
+    return utils.is_token_hash_revoked(utils.hash_token(token), _now())
 
 # Create password reset token
 def create_reset_token(user_id: str) -> str:
@@ -97,9 +174,79 @@ def verify_reset_token(token: str) -> Optional[str]:
         return None
 
 
-# CURRENT USER EXTRACTION PROCESS (Dependency)
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security_scheme)):
-    token = credentials.credentials
+# ────────────────────────────────
+# Verified-token cache
+# ────────────────────────────────
+# The same bearer token arrives on every request of a session. After one full
+# verification its claims and TokenData are kept (bounded LRU keyed by the
+# token's sha256) until the token's exp; a hit only repeats the revocation
+# check, which is an in-memory filter lookup. revoke_token drops the entry.
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "10000"))
+
+
+class _TokenCache:
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries: "OrderedDict[str, Tuple[int, dict, schemas.TokenData]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, token_hash: str, now: int) -> Optional[Tuple[dict, schemas.TokenData]]:
+        with self._lock:
+            entry = self.entries.get(token_hash)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self.entries[token_hash]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(token_hash)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def put(self, token_hash: str, exp: int, payload: dict, token_data: schemas.TokenData) -> None:
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self.entries[token_hash] = (exp, payload, token_data)
+            self.entries.move_to_end(token_hash)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def discard(self, token_hash: str) -> None:
+        with self._lock:
+            self.entries.pop(token_hash, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": len(self.entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
+
+
+_token_cache = _TokenCache(TOKEN_CACHE_SIZE)
+
+
+def token_cache_stats() -> Dict[str, int]:
+    return _token_cache.stats()
+
+
+def _current_generation(payload: dict, now: int) -> bool:
+    return payload.get("gen", 0) == utils.get_token_generation(payload["sub"], now)
+
+
+def _authenticate(token: str) -> Tuple[dict, schemas.TokenData]:
+    """Claims and TokenData of a valid active-user token (raises 401/403 otherwise)."""
+    token_hash = utils.hash_token(token)
+    now = _now()
+    cached = _token_cache.get(token_hash, now)
+    if cached is not None:
+        if not utils.is_token_hash_revoked(token_hash, now) and _current_generation(cached[0], now):
+            return cached
+        _token_cache.discard(token_hash)
+
     payload = verify_access_token(token)
     if not payload:
         raise HTTPException(
@@ -107,14 +254,21 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
             detail="Invalid authentication credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
+
     # 🆕 Check if account is active
     if payload.get("status") != schemas.UserStatus.ACTIVE.value:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Account is deactivated"
         )
-    
-    # ✅ Return user data from token
-    return schemas.TokenData(user_id=payload["sub"], role=payload["role"], status=payload["status"])
 
+    token_data = schemas.TokenData(user_id=payload["sub"], role=payload["role"], status=payload["status"])
+    if isinstance(payload.get("exp"), (int, float)):
+        _token_cache.put(token_hash, int(payload["exp"]), payload, token_data)
+    return payload, token_data
+
+
+# CURRENT USER EXTRACTION PROCESS (Dependency)
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security_scheme)):
+    # ✅ Return user data from token
+    return _authenticate(credentials.credentials)[1]
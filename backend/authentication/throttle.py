@@ -0,0 +1,158 @@
+"""
+throttle.py – Token-bucket login throttling shared by all worker processes.
+
+Every login attempt takes one token from the bucket of the client IP and one
+from the bucket of the username. A bucket holds up to BURST tokens and refills
+at PER_MINUTE tokens a minute; an empty bucket rejects the attempt with 429
+before the user is looked up or a password is hashed.
+
+Buckets live in a fixed-size memory-mapped table (THROTTLE_FILE) so that all
+workers see the same counts:
+
+    header   magic 8s, slots, rejected_ip, rejected_username, allowed (uint64)
+    slot     key uint64 (0 = empty), tokens float64, updated float64 (unix time)
+
+A key hashes to a slot and probes PROBE_LENGTH slots after it; when none is
+free the least recently updated of them is evicted, which bounds memory like
+an LRU (an evicted bucket simply starts full again).
+Updates are serialized across processes with flock on the table file.
+"""
+
+import os, mmap, time, struct, hashlib, threading
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development only
+    fcntl = None
+
+THROTTLE_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "users", "login_throttle.bin")
+
+LOGIN_IP_BURST = int(os.getenv("LOGIN_IP_BURST", "20"))
+LOGIN_IP_PER_MINUTE = float(os.getenv("LOGIN_IP_PER_MINUTE", "20"))
+LOGIN_USERNAME_BURST = int(os.getenv("LOGIN_USERNAME_BURST", "5"))
+LOGIN_USERNAME_PER_MINUTE = float(os.getenv("LOGIN_USERNAME_PER_MINUTE", "5"))
+SLOTS = int(os.getenv("LOGIN_THROTTLE_SLOTS", "65536"))
+PROBE_LENGTH = 8
+
+MAGIC = b"RVTHROT1"
+HEADER = struct.Struct("<8sQQQQ")  # magic, slots, rejected_ip, rejected_username, allowed
+SLOT = struct.Struct("<Qdd")       # key, tokens, updated
+_COUNTERS = {"rejected_ip": 16, "rejected_username": 24, "allowed": 32}
+
+
+def _key(kind: str, value: str) -> int:
+    digest = hashlib.blake2b(f"{kind}:{value}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little") or 1
+
+
+class _Table:
+    def __init__(self, path: str, slots: int):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        size = HEADER.size + slots * SLOT.size
+        with open(path, "a+b") as f:
+            with _flock(f):
+                st = os.fstat(f.fileno())
+                if st.st_size != size:
+                    # New (or sized for another SLOTS setting): start with empty buckets
+                    f.truncate(0)
+                    f.write(HEADER.pack(MAGIC, slots, 0, 0, 0))
+                    f.truncate(size)
+                self._mm = mmap.mmap(f.fileno(), size)
+        self.slots = slots
+        self._fd = open(path, "rb")  # kept open for flock
+        self._lock = threading.Lock()
+
+    def _slot(self, i: int) -> Tuple[int, float, float]:
+        return SLOT.unpack_from(self._mm, HEADER.size + i * SLOT.size)
+
+    def take(self, key: int, burst: int, per_minute: float, now: float) -> float:
+        """Take one token; 0.0 if allowed, else seconds until a token is available."""
+        rate = per_minute / 60.0
+        start = key % self.slots
+        target, oldest = None, None
+        for n in range(PROBE_LENGTH):
+            i = (start + n) % self.slots
+            slot_key, tokens, updated = self._slot(i)
+            if slot_key == key:
+                target = (i, min(burst, tokens + (now - updated) * rate))
+                break
+            if slot_key == 0 and target is None:
+                target = (i, float(burst))
+            if oldest is None or updated < oldest[1]:
+                oldest = (i, updated)
+        if target is None:
+            target = (oldest[0], float(burst))  # evict the least recently updated bucket
+        i, tokens = target
+        if tokens >= 1:
+            SLOT.pack_into(self._mm, HEADER.size + i * SLOT.size, key, tokens - 1, now)
+            return 0.0
+        SLOT.pack_into(self._mm, HEADER.size + i * SLOT.size, key, tokens, now)
+        return (1 - tokens) / rate if rate > 0 else 60.0
+
+    def count(self, counter: str) -> None:
+        offset = _COUNTERS[counter]
+        value = struct.unpack_from("<Q", self._mm, offset)[0]
+        struct.pack_into("<Q", self._mm, offset, value + 1)
+
+    def counters(self) -> Dict[str, int]:
+        return {name: struct.unpack_from("<Q", self._mm, offset)[0] for name, offset in _COUNTERS.items()}
+
+    @contextmanager
+    def locked(self):
+        with self._lock, _flock(self._fd):
+            yield
+
+
+@contextmanager
+def _flock(f):
+    if fcntl is not None:
+        fcntl.flock(f, fcntl.LOCK_EX)
+    try:
+        yield
+    finally:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+_table: Optional[_Table] = None
+_table_lock = threading.Lock()
+
+
+def _get_table() -> _Table:
+    global _table
+    table = _table
+    if table is None or table.path != THROTTLE_FILE:
+        with _table_lock:
+            table = _table
+            if table is None or table.path != THROTTLE_FILE:
+                table = _table = _Table(THROTTLE_FILE, SLOTS)
+    return table
+
+
+def check_login(username: str, client_ip: Optional[str], now: Optional[float] = None) -> Optional[Tuple[str, float]]:
+    """
+    Take a login attempt from the IP and username buckets.
+    Returns None if allowed, else (which limit, seconds to wait).
+    """
+    now = time.time() if now is None else now
+    table = _get_table()
+    with table.locked():
+        if client_ip:
+            wait = table.take(_key("ip", client_ip), LOGIN_IP_BURST, LOGIN_IP_PER_MINUTE, now)
+            if wait:
+                table.count("rejected_ip")
+                return "ip", wait
+        wait = table.take(_key("username", username.lower()), LOGIN_USERNAME_BURST, LOGIN_USERNAME_PER_MINUTE, now)
+        if wait:
+            table.count("rejected_username")
+            return "username", wait
+        table.count("allowed")
+    return None
+
+
+def stats() -> Dict[str, int]:
+    """Allowed / rejected attempt counters, summed over all workers."""
+    return _get_table().counters()
@@ -1,7 +1,15 @@
-import os, json
-from typing import List, Dict, Any, Optional
+import os, json, base64, bisect, itertools, threading, heapq, hashlib, secrets, tempfile, shutil
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
-from backend.authentication import schemas
+import jwt
+from backend.authentication import schemas, bloom
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development only
+    fcntl = None
 
 
 # DATA STORAGE CONFIGURATION
@@ -38,22 +46,309 @@ def _save_json(file_path: str, data: List[Dict[str, Any]]):
     data_serializable = _convert_datetime_to_string(data)
     with open(file_path, 'w') as f:
         json.dump(data_serializable, f, indent=4)
+    if _is_user_file(file_path):
+        # The serialized copy shares nothing with `data`: index it as the new version
+        _remember_user_file(file_path, data_serializable)
+
+
+# ────────────────────────────────
+# User repository
+# ────────────────────────────────
+# Each user file is parsed once and indexed by user_id, username and email.
+# An entry is reused while the file's (mtime_ns, size) is unchanged, so writes
+# from other processes or by hand are picked up on the next call, and saves
+# through _save_json replace it without re-reading the file.
+#
+# update_user_fields() changes one record in place: the user is located via
+# the id index, the cached entry is patched rather than re-indexed, and only
+# the file holding the user is rewritten. The file is assembled from each
+# record's cached JSON text (encoded once, the first time the file is
+# rewritten this way), so only the changed record is re-encoded. The bytes
+# are identical to json.dump(users, f, indent=4).
+
+class _UserFile:
+    def __init__(self, stamp: Optional[Tuple[int, int]], users: List[Dict[str, Any]]):
+        self.stamp = stamp
+        self.users = users
+        self.by_id: Dict[str, Dict[str, Any]] = {}
+        self.by_username: Dict[str, Dict[str, Any]] = {}
+        self.by_email: Dict[str, Dict[str, Any]] = {}
+        self.positions: Dict[str, int] = {}
+        self.version = 0  # bumped by in-place changes (see replace)
+        self.encoded: Optional[List[str]] = None  # per-record JSON text, built on first targeted write
+        for i, user in enumerate(users):
+            # First record wins, as with the linear scans this replaces
+            self.positions.setdefault(user.get('user_id'), i)
+            self.by_id.setdefault(user.get('user_id'), user)
+            self.by_username.setdefault(user.get('username'), user)
+            self.by_email.setdefault(user.get('email'), user)
+
+    def replace(self, position: int, user: Dict[str, Any], encoded: str) -> None:
+        """Swap one record (and its text) without re-indexing the whole file."""
+        old = self.users[position]
+        self.users[position] = user
+        self.version += 1
+        self.encoded[position] = encoded
+        self.by_id[user.get('user_id')] = user
+        for index, field in ((self.by_username, 'username'), (self.by_email, 'email')):
+            if index.get(old.get(field)) is old:
+                del index[old.get(field)]
+            index.setdefault(user.get(field), user)
+
+
+_user_files: Dict[str, _UserFile] = {}
+_user_files_lock = threading.Lock()
+
+
+def _file_stamp(file_path: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(file_path)
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _is_user_file(file_path: str) -> bool:
+    return file_path in (ACTIVE_FILE, INACTIVE_FILE)
+
+
+def _remember_user_file(file_path: str, users: List[Dict[str, Any]]) -> None:
+    with _user_files_lock:
+        _user_files[file_path] = _UserFile(_file_stamp(file_path), users)
+
+
+def _user_file(file_path: str) -> _UserFile:
+    """Parsed and indexed contents of a user file, re-read only when it changed on disk."""
+    stamp = _file_stamp(file_path)
+    entry = _user_files.get(file_path)
+    if entry is None or entry.stamp != stamp:
+        users = _load_json(file_path)
+        entry = _UserFile(stamp, users if isinstance(users, list) else [])
+        with _user_files_lock:
+            _user_files[file_path] = entry
+    return entry
+
+
+def _copy_user(user: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy deep enough that callers can edit a user (incl. its lists) without touching the cache."""
+    return {k: (list(v) if isinstance(v, list) else dict(v) if isinstance(v, dict) else v) for k, v in user.items()}
+
+
+def _encode_user(user: Dict[str, Any]) -> str:
+    # One element of json.dump(users, f, indent=4), nested one level deep
+    return "    " + json.dumps(user, indent=4).replace("\n", "\n    ")
+
+
+def _write_user_file(file_path: str, encoded: List[str]) -> None:
+    """Atomically write a user file from per-record text."""
+    tmp_fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(file_path))
+    os.close(tmp_fd)
+    try:
+        with open(tmp_path, 'w') as f:
+            if encoded:
+                f.write("[\n")
+                f.write(",\n".join(encoded))
+                f.write("\n]")
+            else:
+                f.write("[]")
+        shutil.move(tmp_path, file_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def update_user_fields(user_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Set fields on one user and persist only the file that holds them.
+    Returns a copy of the updated user, or None if no user has this id.
+    """
+    for file_path in (ACTIVE_FILE, INACTIVE_FILE):
+        entry = _user_file(file_path)
+        position = entry.positions.get(user_id)
+        if position is None:
+            continue
+        updated = {**entry.users[position], **_convert_datetime_to_string(updates)}
+        with _user_files_lock:
+            if entry.encoded is None:
+                entry.encoded = [_encode_user(u) for u in entry.users]
+            entry.replace(position, updated, _encode_user(updated))
+            _write_user_file(file_path, entry.encoded)
+            entry.stamp = _file_stamp(file_path)
+        return _copy_user(updated)
+    return None
+
+
+def _find_user(index: str, key: str) -> Optional[Dict[str, Any]]:
+    for file_path in (ACTIVE_FILE, INACTIVE_FILE):
+        user = getattr(_user_file(file_path), index).get(key)
+        if user is not None:
+            return _copy_user(user)
+    return None
+
+
+# ────────────────────────────────
+# User listing (secondary indexes)
+# ────────────────────────────────
+# Listing pages through users ordered by (username, user_id). Each user file
+# keeps sorted key lists for every role, every status and every (role, status)
+# pair, built once per version of that file, so a write to one file leaves the
+# other file's lists alone. A query picks the narrowest list for its filters in
+# both files; a username prefix and a cursor are binary searches into them and
+# the page is a merge of the two ranges, so both the page and the total count
+# cost O(log n + limit).
+
+UserKey = Tuple[str, str]  # (username, user_id)
+Group = Tuple[Optional[str], Optional[str]]  # (role, status), None = any
+
+
+def _user_key(user: Dict[str, Any]) -> UserKey:
+    return user.get('username') or '', user.get('user_id') or ''
+
+
+def _groups_of(user: Dict[str, Any]) -> List[Group]:
+    role, status = user.get('role'), user.get('status')
+    return [(None, None), (role, None), (None, status), (role, status)]
+
+
+class _UserGroups:
+    """Sorted keys of one user file's users, per group."""
+
+    def __init__(self, entry: _UserFile):
+        self.entry, self.version = entry, entry.version
+        self.users: Dict[UserKey, Dict[str, Any]] = {}
+        groups: Dict[Group, List[UserKey]] = {}
+        for user in entry.users:
+            key = _user_key(user)
+            if key in self.users:
+                continue
+            self.users[key] = user
+            for group in _groups_of(user):
+                groups.setdefault(group, []).append(key)
+        self.groups = {group: sorted(keys) for group, keys in groups.items()}
+
+    def matches(self, entry: _UserFile) -> bool:
+        return self.entry is entry and self.version == entry.version
+
+
+_file_groups: Dict[str, _UserGroups] = {}
+
+
+def _user_groups(file_path: str) -> _UserGroups:
+    entry = _user_file(file_path)
+    groups = _file_groups.get(file_path)
+    if groups is None or not groups.matches(entry):
+        groups = _file_groups[file_path] = _UserGroups(entry)
+    return groups
+
+
+def _key_range(keys: List[UserKey], username_prefix: Optional[str], after: Optional[UserKey]) -> Tuple[int, int, int]:
+    """(lo, hi) of the keys matching the prefix, and where the page starts after the cursor."""
+    lo, hi = 0, len(keys)
+    if username_prefix:
+        lo = bisect.bisect_left(keys, (username_prefix, ''))
+        hi = bisect.bisect_left(keys, (username_prefix + '\U0010ffff', ''), lo)
+    start = max(lo, bisect.bisect_right(keys, tuple(after), lo, hi)) if after else lo
+    return lo, hi, start
+
+
+class _UserDirectory:
+    """Both files' groups; a user listed in both files counts once, as its active record."""
+
+    def __init__(self, active: _UserGroups, inactive: _UserGroups):
+        self.active, self.inactive = active, inactive
+        # Inactive keys shadowed by an active record, per group (normally none)
+        small, large = sorted((active.users, inactive.users), key=len)
+        hidden: Dict[Group, List[UserKey]] = {}
+        for key in small:
+            if key in large:
+                for group in _groups_of(inactive.users[key]):
+                    hidden.setdefault(group, []).append(key)
+        self.hidden = {group: sorted(keys) for group, keys in hidden.items()}
+
+    def query(
+        self,
+        role: Optional[str] = None,
+        status: Optional[str] = None,
+        username_prefix: Optional[str] = None,
+        limit: int = 50,
+        after: Optional[UserKey] = None,
+    ) -> Tuple[int, List[Dict[str, Any]], bool]:
+        """(total matching, page of users, whether more follow)."""
+        total, ranges = 0, []
+        for groups in (self.active, self.inactive):
+            keys = groups.groups.get((role, status), [])
+            lo, hi, start = _key_range(keys, username_prefix, after)
+            total += hi - lo
+            ranges.append(map(keys.__getitem__, range(start, hi)))
+        hidden_lo, hidden_hi, _ = _key_range(self.hidden.get((role, status), []), username_prefix, None)
+        total -= hidden_hi - hidden_lo
+
+        active_users = self.active.users
+        merged = heapq.merge(ranges[0], (key for key in ranges[1] if key not in active_users))
+        page = [active_users.get(key) or self.inactive.users[key] for key in itertools.islice(merged, limit + 1)]
+        return total, page[:limit], len(page) > limit
+
+
+_directory: Optional[_UserDirectory] = None
+
+
+def _user_directory() -> _UserDirectory:
+    global _directory
+    active, inactive = _user_groups(ACTIVE_FILE), _user_groups(INACTIVE_FILE)
+    directory = _directory
+    if directory is None or directory.active is not active or directory.inactive is not inactive:
+        directory = _directory = _UserDirectory(active, inactive)
+    return directory
+
+
+def encode_user_cursor(user: Dict[str, Any]) -> str:
+    """Opaque cursor pointing just after `user` in username order."""
+    raw = json.dumps([user.get('username') or '', user.get('user_id') or ''])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_user_cursor(cursor: str) -> UserKey:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        username, user_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor.")
+    if not isinstance(username, str) or not isinstance(user_id, str):
+        raise ValueError("Invalid cursor.")
+    return username, user_id
+
+
+def list_users(
+    role: Optional[str] = None,
+    status: Optional[str] = None,
+    username_prefix: Optional[str] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+) -> Tuple[int, List[Dict[str, Any]], Optional[str]]:
+    """
+    One page of users ordered by username, filtered by role, status and
+    username prefix: (total matching, users, next cursor or None).
+    """
+    after = decode_user_cursor(cursor) if cursor else None
+    total, page, more = _user_directory().query(role, status, username_prefix, limit, after)
+    next_cursor = encode_user_cursor(page[-1]) if more and page else None
+    return total, [_copy_user(u) for u in page], next_cursor
 
 
 # Load all users (active + inactive)
 def load_all_users() -> List[Dict[str, Any]]:
-    return _load_json(ACTIVE_FILE) + _load_json(INACTIVE_FILE)
+    return load_active_users() + load_inactive_users()
 
 # Load active users
 def load_active_users() -> List[Dict[str, Any]]:
-    return _load_json(ACTIVE_FILE)
+    return [_copy_user(u) for u in _user_file(ACTIVE_FILE).users]
 # Save activeusers
 def save_active_users(users: List[Dict[str, Any]]):
     _save_json(ACTIVE_FILE, users)
 
 # Load inactive users
 def load_inactive_users() -> List[Dict[str, Any]]:
-    return _load_json(INACTIVE_FILE)
+    return [_copy_user(u) for u in _user_file(INACTIVE_FILE).users]
 # Save inactive users
 def save_inactive_users(users: List[Dict[str, Any]]):
     _save_json(INACTIVE_FILE, users)
@@ -62,9 +357,9 @@ def save_inactive_users(users: List[Dict[str, Any]]):
 
 # Check username/email uniqueness
 def user_exists(username: str, email: str) -> tuple[bool, Optional[str]]:
-    users = load_all_users()
-    username_taken = any(u['username'] == username for u in users)
-    email_taken = any(u['email'] == email for u in users)
+    files = [_user_file(ACTIVE_FILE), _user_file(INACTIVE_FILE)]
+    username_taken = any(username in f.by_username for f in files)
+    email_taken = any(email in f.by_email for f in files)
     if username_taken and email_taken:
         return True, "Username and Email already taken"
     elif username_taken:
@@ -91,17 +386,15 @@ def add_user(user: Dict[str, Any], active: bool = True):
 
 # Get user by ID (search active + inactive)
 def get_user_by_id(user_id: str) -> Optional[Dict[str, Any]]:
-    for user in load_all_users():
-        if user['user_id'] == user_id:
-            return user
-    return None
+    return _find_user('by_id', user_id)
 
 # Get user by username (search active + inactive)
 def get_user_by_username(username: str) -> Optional[Dict[str, Any]]:
-    for user in load_all_users():
-        if user['username'] == username:
-            return user
-    return None
+    return _find_user('by_username', username)
+
+# Get user by email (search active + inactive)
+def get_user_by_email(email: str) -> Optional[Dict[str, Any]]:
+    return _find_user('by_email', email)
 
 
 # Update user status (move between files)
@@ -125,25 +418,447 @@ def update_user_status(user_id: str, status: schemas.UserStatus) -> bool:
 
     save_active_users(active_users)
     save_inactive_users(inactive_users)
+    bump_token_generation(user_id)  # tokens carry the old status
     return True
 
 
 
 
 
+# ────────────────────────────────
+# Revoked tokens
+# ────────────────────────────────
+# Revocations are held in memory as {sha256(token): exp} plus a min-heap of
+# (exp, hash), so expired entries are pruned in O(log n) each. They are
+# persisted to an append-only log next to REVOKED_TOKENS_FILE (one
+# [hash, exp] line per revocation), which is rewritten with only the live
+# entries once it is mostly expired. REVOKED_TOKENS_FILE itself is the legacy
+# JSON list of raw tokens: it is still read on load so tokens revoked before
+# the log existed stay revoked.
+#
+# Every worker process maps a shared Bloom filter (bloom.py) over the same
+# hashes. A check that misses the filter (the common "not revoked" case)
+# costs a few memory reads; a hit consults the exact store, which first
+# reads the log lines other workers appended if the filter's generation moved.
+#
+# The same log carries per-user token generations (["gen", user_id, n]
+# lines). Access tokens embed the user's generation when issued; bumping it
+# (password reset, deactivation, suspension) invalidates all of that user's
+# outstanding tokens with one log line. Bumps also move the shared filter
+# generation, so checking a token's generation is a dict lookup unless
+# another worker changed something since the last sync.
+
+REVOCATION_LOG_COMPACT_AT = 1000  # log lines before expired ones are dropped
+REVOKED_BLOOM_CAPACITY = int(os.getenv("REVOKED_BLOOM_CAPACITY", "1000000"))
+REVOKED_BLOOM_ERROR_RATE = float(os.getenv("REVOKED_BLOOM_ERROR_RATE", "0.001"))
+
+
+def _revocation_log_path() -> str:
+    return os.path.splitext(REVOKED_TOKENS_FILE)[0] + ".log"
+
+
+def _revocation_bloom_path() -> str:
+    return os.path.splitext(REVOKED_TOKENS_FILE)[0] + ".bloom"
+
+
+@contextmanager
+def _revocation_lock(log_path: str):
+    """Exclusive lock shared by all processes writing the log and filter."""
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    with open(log_path + ".lock", "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+class _AppendOnlyLog(ABC):
+    """
+    In-memory state rebuilt from an NDJSON log that several processes append
+    to (under _revocation_lock). Subclasses apply entries and list their live
+    state for compaction.
+    """
+
+    def __init__(self, log_path: str):
+        self.log_path = log_path
+        self._lock = threading.RLock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.log_lines = 0
+        self.log_offset = 0
+        self.log_inode: Optional[int] = None
+
+    def _reload(self) -> None:
+        self._reset()
+
+    @abstractmethod
+    def _apply(self, entry: list) -> None:
+        """Fold one log entry into the in-memory state."""
+
+    @abstractmethod
+    def _live(self) -> List[list]:
+        """Entries that reproduce the current state (what a compacted log holds)."""
+
+    def _live_count(self) -> int:
+        return len(self._live())
+
+    def _read_log(self) -> None:
+        """Apply log lines appended since the last read (everything after a compaction)."""
+        try:
+            st = os.stat(self.log_path)
+        except FileNotFoundError:
+            return
+        if self.log_inode is not None and (st.st_ino != self.log_inode or st.st_size < self.log_offset):
+            # Compacted by another worker: start over from the rewritten log
+            self._reload()
+        self.log_inode = st.st_ino
+        with open(self.log_path, "rb") as f:
+            f.seek(self.log_offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # a line still being written: read it next time
+                self.log_offset += len(line)
+                try:
+                    self._apply(json.loads(line))
+                except (json.JSONDecodeError, ValueError, TypeError, IndexError):
+                    print(f"[WARNING] Skipping unreadable entry in {os.path.basename(self.log_path)}.")
+                    continue
+                self.log_lines += 1
+
+    def _append(self, entry: list) -> None:
+        """Write one log line; caller holds _revocation_lock and self._lock."""
+        os.makedirs(os.path.dirname(self.log_path), exist_ok=True)
+        with open(self.log_path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+            self.log_offset = f.tell()
+        self.log_lines += 1
+        self.log_inode = self.log_inode or os.stat(self.log_path).st_ino
+
+    def _should_compact(self, compact_at: int) -> bool:
+        return self.log_lines >= compact_at and self.log_lines > 2 * self._live_count()
+
+    def _rewrite(self) -> None:
+        """Replace the log with only the live entries; caller holds both locks."""
+        entries = self._live()
+        tmp_fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.log_path))
+        os.close(tmp_fd)
+        try:
+            with open(tmp_path, "w") as f:
+                for entry in entries:
+                    f.write(json.dumps(entry) + "\n")
+            shutil.move(tmp_path, self.log_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        st = os.stat(self.log_path)
+        self.log_inode, self.log_offset, self.log_lines = st.st_ino, st.st_size, len(entries)
+
+
+class _RevocationStore(_AppendOnlyLog):
+    def __init__(self, log_path: str, bloom_path: str):
+        self.bloom_path = bloom_path
+        self.bloom: Optional[bloom.BloomFilter] = None
+        self.generation = -1  # filter generation the exact store is synced to
+        super().__init__(log_path)
+
+    def _reset(self) -> None:
+        super()._reset()
+        self.expiries: Dict[str, int] = {}
+        self.heap: List[Tuple[int, str]] = []
+        self.user_generations: Dict[str, int] = {}
+
+    def _reload(self) -> None:
+        self._reset()
+        self._read_legacy()
+
+    def _live(self) -> List[list]:
+        return ([[token_hash, exp] for token_hash, exp in self.expiries.items()]
+                + [["gen", user_id, generation] for user_id, generation in self.user_generations.items()])
+
+    def _live_count(self) -> int:
+        return len(self.expiries) + len(self.user_generations)
+
+    def _add(self, token_hash: str, exp: int) -> None:
+        if exp > self.expiries.get(token_hash, 0):
+            self.expiries[token_hash] = exp
+            heapq.heappush(self.heap, (exp, token_hash))
+
+    def _apply(self, entry: list) -> None:
+        if len(entry) == 3 and entry[0] == "gen":
+            user_id, generation = entry[1], int(entry[2])
+            if generation > self.user_generations.get(user_id, 0):
+                self.user_generations[user_id] = generation
+        else:
+            token_hash, exp = entry
+            self._add(token_hash, int(exp))
+
+    def _read_legacy(self) -> None:
+        for token in load_revoked_tokens():
+            try:
+                exp = jwt.decode(token, options={"verify_signature": False}).get("exp")
+            except jwt.PyJWTError:
+                continue
+            if isinstance(exp, (int, float)):
+                self._add(hash_token(token), int(exp))
+
+    def _sync(self, now: int) -> None:
+        """Catch up with other workers (filter rebuilt, log appended); caller holds self._lock."""
+        if self.bloom is None or self.bloom.replaced():
+            # The old mapping is left to the GC: concurrent readers may still hold it
+            self.bloom = bloom.BloomFilter.open(self.bloom_path, REVOKED_BLOOM_CAPACITY, REVOKED_BLOOM_ERROR_RATE)
+        generation = self.bloom.generation
+        self._read_log()
+        self.generation = generation
+        self.prune(now)
+
+    def load(self, now: int) -> None:
+        with _revocation_lock(self.log_path), self._lock:
+            self._read_legacy()
+            self._sync(now)
+            # The filter may predate legacy entries (or be new): make sure it covers them
+            if any([self.bloom.add(h) for h in self.expiries]):
+                self.generation = self.bloom.bump()
+
+    def prune(self, now: int) -> None:
+        while self.heap and self.heap[0][0] <= now:
+            exp, token_hash = heapq.heappop(self.heap)
+            if self.expiries.get(token_hash) == exp:
+                del self.expiries[token_hash]
+
+    def _refresh(self, now: int) -> None:
+        if self.bloom.generation != self.generation:
+            with self._lock:
+                self._sync(now)
+
+    def contains(self, token_hash: str, now: int) -> bool:
+        if not self.bloom.might_contain(token_hash):
+            return False
+        self._refresh(now)
+        exp = self.expiries.get(token_hash)
+        return exp is not None and exp > now
+
+    def user_generation(self, user_id: str, now: int) -> int:
+        self._refresh(now)
+        return self.user_generations.get(user_id, 0)
+
+    def add(self, token_hash: str, exp: int, now: int) -> None:
+        with _revocation_lock(self.log_path), self._lock:
+            self._sync(now)
+            if self.contains(token_hash, now) and self.expiries[token_hash] >= exp:
+                return
+            self._add(token_hash, exp)
+            self._append([token_hash, exp])
+            # Bump before setting bits: a worker that sees the bits also sees the new generation
+            self.generation = self.bloom.bump()
+            self.bloom.add(token_hash)
+            if self._should_compact(REVOCATION_LOG_COMPACT_AT):
+                self._compact()
+
+    def bump_user(self, user_id: str, now: int) -> int:
+        with _revocation_lock(self.log_path), self._lock:
+            self._sync(now)
+            generation = self.user_generations.get(user_id, 0) + 1
+            self.user_generations[user_id] = generation
+            self._append(["gen", user_id, generation])
+            self.generation = self.bloom.bump()
+            return generation
+
+    def _compact(self) -> None:
+        """Rewrite the log and rebuild the filter with only live entries; caller holds both locks."""
+        self._rewrite()
+        old = self.bloom
+        bloom.write(self.bloom_path, old.num_bits, old.num_hashes, self.expiries, generation=old.generation + 1)
+        old.bump()  # workers still mapping the retired file notice and remap
+        self.bloom = bloom.BloomFilter(self.bloom_path)
+        self.generation = self.bloom.generation
+
+
+_revocations: Optional[_RevocationStore] = None
+_revocations_lock = threading.Lock()
+
+
+def _revocation_store(now: int) -> _RevocationStore:
+    """The process's store, loaded on first use (and again if the file location changes)."""
+    global _revocations
+    store = _revocations
+    if store is None or store.log_path != _revocation_log_path():
+        with _revocations_lock:
+            store = _revocations
+            if store is None or store.log_path != _revocation_log_path():
+                store = _RevocationStore(_revocation_log_path(), _revocation_bloom_path())
+                store.load(now)
+                _revocations = store
+    return store
+
+
+def revoke_token_hash(token_hash: str, exp: int, now: int) -> None:
+    """Record a revocation until `exp` (unix seconds); appends one log line."""
+    _revocation_store(now).add(token_hash, exp, now)
+
+
+def is_token_hash_revoked(token_hash: str, now: int) -> bool:
+    """Filter lookup in shared memory; the exact store is consulted only on a hit."""
+    return _revocation_store(now).contains(token_hash, now)
+
+
+def get_token_generation(user_id: str, now: Optional[int] = None) -> int:
+    """Current token generation of a user (0 until first bumped)."""
+    now = _now() if now is None else now
+    return _revocation_store(now).user_generation(user_id, now)
+
+
+def bump_token_generation(user_id: str, now: Optional[int] = None) -> int:
+    """Invalidate every token issued to `user_id` so far (one log line)."""
+    now = _now() if now is None else now
+    return _revocation_store(now).bump_user(user_id, now)
+
+
+# ────────────────────────────────
+# Refresh tokens
+# ────────────────────────────────
+# Refresh tokens are opaque "<family>.<secret>" strings. Each login starts a
+# family (one session); only the sha256 of the family's current token is kept,
+# indexed by family id, so the store holds one small entry per live session.
+# Every refresh rotates the token. Presenting anything other than the current
+# token of a family (a replayed, already-rotated token) is treated as theft and
+# ends the whole session. Families are also dropped when the user's token
+# generation has moved since they were issued, and when they expire.
+#
+# Persisted like the revocation log (refresh_tokens.log next to
+# REVOKED_TOKENS_FILE, appended under the same lock, compacted when mostly dead):
+#   ["issue", family, user_id, token_hash, exp, generation]
+#   ["revoke", family]
+
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
+REFRESH_LOG_COMPACT_AT = 1000
+
+
+def _refresh_log_path() -> str:
+    return os.path.join(os.path.dirname(REVOKED_TOKENS_FILE), "refresh_tokens.log")
+
+
+class _RefreshStore(_AppendOnlyLog):
+    def _reset(self) -> None:
+        super()._reset()
+        # family -> (user_id, current token hash, exp, user token generation at issue)
+        self.families: Dict[str, Tuple[str, str, int, int]] = {}
+
+    def _apply(self, entry: list) -> None:
+        if entry[0] == "issue":
+            _, family, user_id, token_hash, exp, generation = entry
+            self.families[family] = (user_id, token_hash, int(exp), int(generation))
+        elif entry[0] == "revoke":
+            self.families.pop(entry[1], None)
+        else:
+            raise ValueError(entry[0])
+
+    def _live(self) -> List[list]:
+        return [["issue", family, *record] for family, record in self.families.items()]
+
+    def _live_count(self) -> int:
+        return len(self.families)
+
+    def _prune(self, now: int) -> None:
+        for family in [f for f, record in self.families.items() if record[2] <= now]:
+            del self.families[family]
+
+    def issue(self, user_id: str, generation: int, now: int, family: Optional[str] = None) -> str:
+        """New token for a new session (or the next one of `family`); caller holds both locks."""
+        family = family or secrets.token_urlsafe(16)
+        token = f"{family}.{secrets.token_urlsafe(32)}"
+        exp = now + REFRESH_TOKEN_EXPIRE_DAYS * 86400
+        self.families[family] = (user_id, hash_token(token), exp, generation)
+        self._append(["issue", family, user_id, hash_token(token), exp, generation])
+        if self._should_compact(REFRESH_LOG_COMPACT_AT):
+            self._prune(now)
+            self._rewrite()
+        return token
+
+    def revoke(self, family: str) -> None:
+        if self.families.pop(family, None) is not None:
+            self._append(["revoke", family])
+
+    def lookup(self, token: str, now: int) -> Tuple[Optional[str], Optional[Tuple[str, str, int, int]]]:
+        """(family, record) for a token; record is None if the family is unknown or expired."""
+        family = token.split(".", 1)[0]
+        record = self.families.get(family)
+        if record is not None and record[2] <= now:
+            record = None
+        return family, record
+
+
+_refresh_store: Optional[_RefreshStore] = None
+
+
+def _refresh_tokens() -> _RefreshStore:
+    global _refresh_store
+    if _refresh_store is None or _refresh_store.log_path != _refresh_log_path():
+        _refresh_store = _RefreshStore(_refresh_log_path())
+    return _refresh_store
+
+
+def _now() -> int:
+    return int(datetime.now().timestamp())
+
+
+def issue_refresh_token(user_id: str) -> str:
+    """Start a new session (login) and return its first refresh token."""
+    store, now = _refresh_tokens(), _now()
+    generation = get_token_generation(user_id, now)
+    with _revocation_lock(store.log_path), store._lock:
+        store._read_log()
+        return store.issue(user_id, generation, now)
+
+
+def rotate_refresh_token(token: str) -> Optional[Tuple[str, str]]:
+    """
+    Exchange a refresh token for (user_id, next refresh token).
+    None if it is unknown, expired or from before the user's last generation
+    bump; a replayed old token also revokes its whole session.
+    """
+    store, now = _refresh_tokens(), _now()
+    with _revocation_lock(store.log_path), store._lock:
+        store._read_log()
+        family, record = store.lookup(token, now)
+        if record is None:
+            return None
+        user_id, current_hash, _, generation = record
+        if not secrets.compare_digest(hash_token(token), current_hash):
+            print(f"[WARNING] Refresh token reuse detected for user {user_id}: session revoked.")
+            store.revoke(family)
+            return None
+        if generation != get_token_generation(user_id, now):
+            store.revoke(family)
+            return None
+        return user_id, store.issue(user_id, generation, now, family=family)
+
+
+def revoke_refresh_token(token: str) -> None:
+    """End the session a refresh token belongs to (logout)."""
+    store, now = _refresh_tokens(), _now()
+    with _revocation_lock(store.log_path), store._lock:
+        store._read_log()
+        family, record = store.lookup(token, now)
+        if record is not None and secrets.compare_digest(hash_token(token), record[1]):
+            store.revoke(family)
+
+
 def load_revoked_tokens() -> list[str]:
-    """Load revoked tokens safely."""
+    """Load the legacy list of revoked raw tokens safely."""
     if not os.path.exists(REVOKED_TOKENS_FILE):
         return []
     with open(REVOKED_TOKENS_FILE, "r") as f:
         try:
             content = f.read().strip()
-            return json.loads(content) if content else []
+            tokens = json.loads(content) if content else []
+            return tokens if isinstance(tokens, list) else []
         except json.JSONDecodeError:
             return []
-
-
-def save_revoked_tokens(tokens: list[str]):
-    os.makedirs(os.path.dirname(REVOKED_TOKENS_FILE), exist_ok=True)
-    with open(REVOKED_TOKENS_FILE, "w") as f:
-        json.dump(tokens, f, indent=4)
\ No newline at end of file
@@ -2,12 +2,14 @@
 # 🔧 Updated for cleaner admin logic, improved type consistency, and better file handling.
 
 from fastapi import APIRouter, Depends, HTTPException, Query, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import FileResponse
 from typing import List, Optional
 from backend.authentication.security import get_current_user
 from backend.movies import utils, schemas
-import os, json, tempfile
+import os, json, tempfile, asyncio
 from backend.penalties import utils as penalty_utils
+from backend.reviews import utils as review_utils
 
 router = APIRouter(prefix="/movies", tags=["Movies"])
 
@@ -121,5 +123,33 @@ def get_movie(movie_id: str, current_user: schemas.UserToken = Depends(get_curre
     return movie
 
 
+@router.get("/{movie_id}/full", response_model=schemas.MovieFull)
+async def get_movie_full(
+    movie_id: str,
+    sort_by: str = Query("date", description="Review sort: date, rating, helpful, total_votes, wilson"),
+    order: str = Query("desc", description="Order: asc or desc"),
+    limit: int = Query(20, ge=1, le=100, description="Reviews in the first page"),
+    current_user: schemas.UserToken = Depends(get_current_user)
+):
+    """
+    Movie, review statistics and first page of reviews in one call
+    (replaces GET /movies/{id} + GET /reviews/{id} + GET /reviews/{id}/stats).
+    """
+    if sort_by not in review_utils.SORT_KEYS:
+        raise HTTPException(status_code=400, detail=f"Invalid sort_by. Must be one of: {', '.join(review_utils.SORT_KEYS)}.")
+    if not utils.movie_exists(movie_id):
+        raise HTTPException(status_code=404, detail="Movie not found")
+
+    # The movie file and the review overview are read concurrently on the request threadpool
+    movie, (review_stats, reviews) = await asyncio.gather(
+        run_in_threadpool(utils.get_movie, movie_id),
+        run_in_threadpool(review_utils.review_overview, movie_id, sort_by, order, limit),
+    )
+    if not movie:
+        raise HTTPException(status_code=404, detail="Movie not found")
+    next_cursor = review_utils.encode_cursor(reviews[-1], sort_by) if len(reviews) == limit else None
+    return {"movie": movie, "review_stats": review_stats, "reviews": reviews, "next_cursor": next_cursor}
+
+
 # Suggestions
 # 
\ No newline at end of file
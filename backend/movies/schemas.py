@@ -3,6 +3,7 @@
 
 from pydantic import BaseModel
 from typing import List, Optional, Literal
+from backend.reviews import schemas as review_schemas
 
 
 class Movie(BaseModel):
@@ -22,6 +23,14 @@ class Movie(BaseModel):
     source_folder: Optional[str] = None
 
 
+class MovieFull(BaseModel):
+    """Movie page payload: the movie, its review statistics and first review page."""
+    movie: Movie
+    review_stats: review_schemas.ReviewStats
+    reviews: List[review_schemas.Review]
+    next_cursor: Optional[str] = None  # pass as `cursor` to GET /reviews/{movie_id}
+
+
 class MovieSearchParams(BaseModel):
     query: Optional[str] = None
     genre: Optional[str] = None
@@ -4,10 +4,9 @@
 import os, json, glob
 from typing import List, Dict, Optional
 from datetime import datetime
-from backend.authentication.utils import _load_json, _save_json
+from backend.authentication.utils import _load_json, load_active_users, save_active_users, get_user_by_id
 
 MOVIES_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "movies")
-USERS_ACTIVE_FILE = os.path.join(os.path.dirname(__file__), "..", "data", "users", "users_active.json")
 
 
 # ---------- MOVIE OPERATIONS ----------
@@ -33,6 +32,11 @@ def get_movie(movie_id: str) -> Optional[Dict]:
     return _load_json(path)
 
 
+def movie_exists(movie_id: str) -> bool:
+    """True if the movie store has this movie (without loading it)."""
+    return os.path.exists(os.path.join(MOVIES_DIR, f"{movie_id}.json"))
+
+
 def _parse_year(date_str: Optional[str]) -> Optional[int]:
     """Extract year from YYYY-MM-DD string."""
     if not date_str:
@@ -100,21 +104,8 @@ def paginate_movies(movies: List[Dict], page: int, limit: int) -> List[Dict]:
 
 
 # ---------- WATCH LATER ----------
-def _load_users() -> list:
-    return _load_json(USERS_ACTIVE_FILE)
-
-def _save_users(data: list) -> None:
-    _save_json(USERS_ACTIVE_FILE, data)
-
-def _find_user(user_id: str, users: list) -> Optional[Dict]:
-    for u in users:
-        if u["user_id"] == user_id:
-            return u
-    return None
-
 def get_watch_later(user_id: str) -> List[Dict]:
-    users = _load_users()
-    user = _find_user(user_id, users)
+    user = get_user_by_id(user_id)
     if not user:
         return []
     movie_ids = user.get("watch_later", [])
@@ -122,8 +113,8 @@ def get_watch_later(user_id: str) -> List[Dict]:
     return [m for m in all_movies if m["movie_id"] in movie_ids]
 
 def update_watch_later(user_id: str, movie_id: str, action: str) -> None:
-    users = _load_users()
-    user = _find_user(user_id, users)
+    users = load_active_users()
+    user = next((u for u in users if u["user_id"] == user_id), None)
     if not user:
         return
     wl = user.get("watch_later", [])
@@ -132,4 +123,4 @@ def update_watch_later(user_id: str, movie_id: str, action: str) -> None:
     elif action == "remove" and movie_id in wl:
         wl.remove(movie_id)
     user["watch_later"] = wl
-    _save_users(users)
+    save_active_users(users)
@@ -46,6 +46,10 @@ def add_penalty(penalty: schemas.Penalty) -> schemas.Penalty:
             user_utils.save_active_users(users)
             break
 
+    if penalty.type == "suspension":
+        # 🔒 Sign the user out everywhere: outstanding tokens stop working
+        user_utils.bump_token_generation(penalty.user_id)
+
     return penalty
 
 
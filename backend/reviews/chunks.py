@@ -0,0 +1,199 @@
+"""
+chunks.py – Chunked on-disk layout for movies with many reviews.
+
+Instead of one {movie_id}_reviews.json array, a large movie is stored as
+
+    data/reviews/{movie_id}/manifest.json
+    data/reviews/{movie_id}/chunk_00000_<crc>.json   (CHUNK_SIZE reviews each)
+    data/reviews/{movie_id}/ids_<crc>.json           (review_id -> chunk number)
+
+Reviews are ordered by (date, review_id) across chunks. The manifest lists,
+per chunk, its file, review count, and min/max (date, review_id) keys, so a
+date-sorted page (with or without a cursor) loads only the chunks that hold
+its rows, and a single review is found through the id map.
+
+File names carry a CRC of their content: a save writes only chunks whose
+content changed, switches the manifest atomically, and then deletes files the
+new manifest no longer references. save() also returns where each review sits
+(chunk, byte offset, length) for the column sidecar (see columns.py).
+"""
+
+import os, json, zlib, tempfile, shutil
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterator, List, Optional
+
+from backend.reviews import codec, columns
+from backend.reviews.index import SORT_KEYS, Entry
+
+CHUNK_SIZE = int(os.getenv("REVIEW_CHUNK_SIZE", "500"))
+MANIFEST = "manifest.json"
+
+
+def _entry(review: Dict) -> Entry:
+    return SORT_KEYS["date"](review), review["review_id"]
+
+
+# ────────────────────────────────
+# File helpers
+# ────────────────────────────────
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp_fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    os.close(tmp_fd)
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        shutil.move(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _read_json(path: str):
+    return codec.load(path)
+
+
+def manifest_path(movie_dir: str) -> str:
+    return os.path.join(movie_dir, MANIFEST)
+
+
+def is_chunked(movie_dir: str) -> bool:
+    return os.path.exists(manifest_path(movie_dir))
+
+
+def load_manifest(movie_dir: str) -> Dict:
+    return _read_json(manifest_path(movie_dir))
+
+
+def load_chunk(movie_dir: str, manifest: Dict, number: int) -> List[Dict]:
+    return _read_json(os.path.join(movie_dir, manifest["chunks"][number]["file"]))
+
+
+# ────────────────────────────────
+# Writing
+# ────────────────────────────────
+def save(movie_dir: str, reviews: List[Dict]) -> List[columns.Placement]:
+    """Write `reviews` in chunked layout, rewriting only chunks that changed."""
+    os.makedirs(movie_dir, exist_ok=True)
+    ordered = sorted(reviews, key=_entry)
+    old_files = set()
+    if is_chunked(movie_dir):
+        old = load_manifest(movie_dir)
+        old_files = {c["file"] for c in old["chunks"]} | {old["ids"]}
+
+    chunks, ids, placements = [], {}, []
+    for number, start in enumerate(range(0, len(ordered), CHUNK_SIZE)):
+        part = ordered[start:start + CHUNK_SIZE]
+        data, spans = codec.encode(part)
+        name = f"chunk_{number:05d}_{zlib.crc32(data):08x}.json"
+        if name not in old_files:
+            _write_atomic(os.path.join(movie_dir, name), data)
+        chunks.append({
+            "file": name,
+            "count": len(part),
+            "min": list(_entry(part[0])),
+            "max": list(_entry(part[-1])),
+        })
+        for review, (offset, length) in zip(part, spans):
+            ids[review["review_id"]] = number
+            placements.append((review, number, offset, length))
+
+    ids_data = codec.encode_value(ids)
+    ids_name = f"ids_{zlib.crc32(ids_data):08x}.json"
+    if ids_name not in old_files:
+        _write_atomic(os.path.join(movie_dir, ids_name), ids_data)
+
+    manifest = {
+        "sort_key": "date",
+        "chunk_size": CHUNK_SIZE,
+        "count": len(ordered),
+        "ids": ids_name,
+        "chunks": chunks,
+    }
+    _write_atomic(manifest_path(movie_dir), json.dumps(manifest, indent=2).encode())
+
+    live = {c["file"] for c in chunks} | {ids_name}
+    for name in old_files - live:
+        try:
+            os.remove(os.path.join(movie_dir, name))
+        except FileNotFoundError:
+            pass
+    return placements
+
+
+# ────────────────────────────────
+# Reading
+# ────────────────────────────────
+def iter_reviews(movie_dir: str, manifest: Optional[Dict] = None) -> Iterator[Dict]:
+    """Yield every review, one chunk in memory at a time, in (date, review_id) order."""
+    manifest = manifest or load_manifest(movie_dir)
+    for number in range(len(manifest["chunks"])):
+        yield from load_chunk(movie_dir, manifest, number)
+
+
+def load_all(movie_dir: str) -> List[Dict]:
+    return list(iter_reviews(movie_dir))
+
+
+def find(movie_dir: str, review_id: str) -> Optional[Dict]:
+    """Fetch one review by id, reading only the id map and its chunk."""
+    manifest = load_manifest(movie_dir)
+    number = _read_json(os.path.join(movie_dir, manifest["ids"])).get(review_id)
+    if number is None:
+        return None
+    return next((r for r in load_chunk(movie_dir, manifest, number) if r["review_id"] == review_id), None)
+
+
+def _offsets(manifest: Dict) -> List[int]:
+    offsets, total = [], 0
+    for chunk in manifest["chunks"]:
+        offsets.append(total)
+        total += chunk["count"]
+    return offsets
+
+
+def _read_range(movie_dir: str, manifest: Dict, start: int, stop: int, loaded: Dict[int, List[Dict]]) -> List[Dict]:
+    """Reviews at global positions [start, stop), loading only overlapping chunks."""
+    rows = []
+    offsets = _offsets(manifest)
+    for number, chunk in enumerate(manifest["chunks"]):
+        lo, hi = offsets[number], offsets[number] + chunk["count"]
+        if hi <= start or lo >= stop:
+            continue
+        if number not in loaded:
+            loaded[number] = load_chunk(movie_dir, manifest, number)
+        rows.extend(loaded[number][max(start - lo, 0):stop - lo])
+    return rows
+
+
+def _position(movie_dir: str, manifest: Dict, after: Entry, right: bool, loaded: Dict[int, List[Dict]]) -> int:
+    """Global insertion position of `after`, found via chunk min/max keys."""
+    key = list(after)
+    chunks = manifest["chunks"]
+    # First chunk whose max is >= after (> after when bisecting right)
+    maxes = [c["max"] for c in chunks]
+    number = (bisect_right if right else bisect_left)(maxes, key)
+    if number == len(chunks):
+        return manifest["count"]
+    if number not in loaded:
+        loaded[number] = load_chunk(movie_dir, manifest, number)
+    entries = [list(_entry(r)) for r in loaded[number]]
+    inner = (bisect_right if right else bisect_left)(entries, key)
+    return _offsets(manifest)[number] + inner
+
+
+def read_date_page(
+    movie_dir: str,
+    order: str = "desc",
+    skip: int = 0,
+    limit: int = 20,
+    after: Optional[Entry] = None,
+) -> List[Dict]:
+    """Date-sorted page (same ordering as ReviewCollection.page) from the chunks it spans."""
+    manifest = load_manifest(movie_dir)
+    loaded: Dict[int, List[Dict]] = {}
+    if order.lower() == "desc":
+        end = manifest["count"] if after is None else _position(movie_dir, manifest, after, False, loaded)
+        stop = max(end - skip, 0)
+        return list(reversed(_read_range(movie_dir, manifest, max(stop - limit, 0), stop, loaded)))
+    begin = 0 if after is None else _position(movie_dir, manifest, after, True, loaded)
+    return _read_range(movie_dir, manifest, begin + skip, begin + skip + limit, loaded)
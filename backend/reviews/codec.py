@@ -0,0 +1,175 @@
+"""
+codec.py – On-disk encoding of review files (single files and chunks).
+
+REVIEW_STORAGE_CODEC selects how new files are written:
+- "json" → pretty-printed JSON array (indent=2), the historical format
+- "zlib" → compact JSON, zlib-compressed
+- "gzip" → compact JSON, gzip-compressed (readable with zcat)
+
+Reads never depend on the setting: the format is detected from the first
+bytes of each file, so stores written with different codecs (or converted
+one file at a time by later saves) keep working.
+
+Offsets returned by encode() (used by the column sidecar) always refer to the
+decoded JSON text.
+"""
+
+import io, os, json, gzip, zlib
+from typing import BinaryIO, Dict, List, Optional, Sequence, Tuple
+
+CODECS = ("json", "zlib", "gzip")
+CODEC = os.getenv("REVIEW_STORAGE_CODEC", "json")
+LEVEL = int(os.getenv("REVIEW_STORAGE_LEVEL", "6"))
+
+# Raised when reading a damaged file in any codec
+DECODE_ERRORS = (json.JSONDecodeError, UnicodeDecodeError, zlib.error, EOFError, gzip.BadGzipFile)
+
+_GZIP_MAGIC = b"\x1f\x8b"
+# zlib header: CMF 0x78 (deflate, 32K window) + a FLG byte for each level
+_ZLIB_MAGIC = {b"\x78\x01", b"\x78\x5e", b"\x78\x9c", b"\x78\xda"}
+
+
+def detect(head: bytes) -> str:
+    """Codec of a file from its first two bytes."""
+    if head[:2] == _GZIP_MAGIC:
+        return "gzip"
+    if head[:2] in _ZLIB_MAGIC:
+        return "zlib"
+    return "json"
+
+
+def _compact(items: Sequence[Dict]) -> Tuple[bytes, List[Tuple[int, int]]]:
+    parts, spans, pos = [b"["], [], 1
+    for i, item in enumerate(items):
+        if i:
+            parts.append(b",")
+            pos += 1
+        encoded = json.dumps(item, separators=(",", ":")).encode()
+        spans.append((pos, len(encoded)))
+        parts.append(encoded)
+        pos += len(encoded)
+    parts.append(b"]")
+    return b"".join(parts), spans
+
+
+def _pretty(items: Sequence[Dict]) -> Tuple[bytes, List[Tuple[int, int]]]:
+    # Same bytes as json.dumps(items, indent=2)
+    if not items:
+        return b"[]", []
+    parts, spans, pos = [b"[\n"], [], 2
+    for i, item in enumerate(items):
+        if i:
+            parts.append(b",\n")
+            pos += 2
+        encoded = ("  " + json.dumps(item, indent=2).replace("\n", "\n  ")).encode()
+        spans.append((pos + 2, len(encoded) - 2))
+        parts.append(encoded)
+        pos += len(encoded)
+    parts.append(b"\n]")
+    return b"".join(parts), spans
+
+
+def _resolve(codec: Optional[str]) -> str:
+    codec = codec or CODEC
+    if codec not in CODECS:
+        raise ValueError(f"Unknown review storage codec {codec!r}. Must be one of: {', '.join(CODECS)}.")
+    return codec
+
+
+def encode(items: Sequence[Dict], codec: Optional[str] = None) -> Tuple[bytes, List[Tuple[int, int]]]:
+    """
+    File bytes for a JSON array of `items` in `codec` (default CODEC), plus the
+    (offset, length) of every element in the decoded text.
+    """
+    codec = _resolve(codec)
+    if codec == "json":
+        return _pretty(items)
+    text, spans = _compact(items)
+    if codec == "gzip":
+        return gzip.compress(text, compresslevel=LEVEL, mtime=0), spans
+    return zlib.compress(text, LEVEL), spans
+
+
+def encode_value(value, codec: Optional[str] = None) -> bytes:
+    """File bytes for any JSON value (compact) in `codec` (default CODEC)."""
+    codec = _resolve(codec)
+    text = json.dumps(value, separators=(", ", ": ") if codec == "json" else (",", ":")).encode()
+    if codec == "gzip":
+        return gzip.compress(text, compresslevel=LEVEL, mtime=0)
+    if codec == "zlib":
+        return zlib.compress(text, LEVEL)
+    return text
+
+
+def decode(data: bytes) -> bytes:
+    """JSON text of file bytes in any codec."""
+    codec = detect(data)
+    if codec == "gzip":
+        return gzip.decompress(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    return data
+
+
+def read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return decode(f.read())
+
+
+def load(path: str):
+    """Parse a JSON file in any codec."""
+    return json.loads(read(path))
+
+
+class _ZlibReader(io.RawIOBase):
+    """Incremental zlib decompression of a binary file."""
+
+    def __init__(self, raw: BinaryIO, read_size: int = 64 * 1024):
+        self._raw = raw
+        self._read_size = read_size
+        self._inflate = zlib.decompressobj()
+        self._buffer = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._buffer:
+            if self._inflate.eof:
+                return 0
+            data = self._raw.read(self._read_size)
+            self._buffer = self._inflate.decompress(data) if data else self._inflate.flush()
+            if not data and not self._buffer:
+                return 0
+        n = min(len(b), len(self._buffer))
+        b[:n] = self._buffer[:n]
+        self._buffer = self._buffer[n:]
+        return n
+
+    def close(self) -> None:
+        self._raw.close()
+        super().close()
+
+
+def open_text(path: str) -> io.TextIOBase:
+    """Text stream of the decoded JSON, decompressing incrementally."""
+    with open(path, "rb") as f:
+        codec = detect(f.read(2))
+    if codec == "gzip":
+        return gzip.open(path, "rt", encoding="utf-8")
+    if codec == "zlib":
+        return io.TextIOWrapper(io.BufferedReader(_ZlibReader(open(path, "rb"))), encoding="utf-8")
+    return open(path, "r", encoding="utf-8")
+
+
+def open_payload(path: str) -> BinaryIO:
+    """
+    Seekable binary view of the decoded JSON: the file itself when stored as
+    plain JSON (reads touch only the requested bytes), otherwise the file
+    decompressed into memory.
+    """
+    f = open(path, "rb")
+    if detect(f.peek(2)[:2]) == "json":
+        return f
+    with f:
+        return io.BytesIO(decode(f.read()))
@@ -0,0 +1,240 @@
+"""
+columns.py – Memory-mapped numeric columns for a movie's reviews.
+
+Next to each movie's review storage sits {movie_id}_reviews.cols: a 32-byte
+header followed by one fixed-width little-endian record per review:
+
+    rating       int8     1–10
+    date         int32    proleptic Gregorian ordinal (0 = no date)
+    helpful      int32
+    total_votes  int32
+    chunk        int32    chunk number (0 for single-file storage)
+    offset       int64    byte offset of the review's JSON object in the
+                          file's decoded JSON text (see codec.py)
+    length       int32    byte length of that object
+    review_id    S36      tie-breaker, matches ReviewCollection ordering
+
+The header stores the version (mtime_ns, size) of the storage file it was
+written for, so a sidecar left behind by an external edit is ignored.
+
+Sorting, filtering and statistics read only these columns through
+numpy.memmap; the full review (with its text) is loaded from its offset only
+for rows that are actually returned.
+"""
+
+import os, json, struct, tempfile, shutil
+from datetime import date
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from backend.reviews import codec
+from backend.reviews.index import WILSON_Z
+
+MAGIC = b"RVCOLS01"
+HEADER = struct.Struct("<8sqqq")  # magic, storage mtime_ns, storage size, rows
+ID_WIDTH = 36
+
+DTYPE = np.dtype([
+    ("rating", "<i1"),
+    ("date", "<i4"),
+    ("helpful", "<i4"),
+    ("total_votes", "<i4"),
+    ("chunk", "<i4"),
+    ("offset", "<i8"),
+    ("length", "<i4"),
+    ("review_id", f"S{ID_WIDTH}"),
+])
+
+# A review placed in storage: (review, chunk number, byte offset, byte length)
+Placement = Tuple[Dict, int, int, int]
+
+
+def _date_ordinal(value: Optional[str]) -> Optional[int]:
+    if not value:
+        return 0
+    try:
+        return date.fromisoformat(value).toordinal()
+    except ValueError:
+        return None
+
+
+# ────────────────────────────────
+# Writing
+# ────────────────────────────────
+def _fits(field: str, value) -> bool:
+    info = np.iinfo(DTYPE[field])
+    return info.min <= value <= info.max
+
+
+def _clamped(field: str, value) -> int:
+    info = np.iinfo(DTYPE[field])
+    return min(max(value, info.min), info.max)
+
+
+def build(placements: Sequence[Placement], strict: bool = True) -> Optional[np.ndarray]:
+    """
+    Column records for `placements`, or None when a review cannot be
+    represented faithfully (non-ISO date, over-long id, a number outside its
+    column's range), in which case callers fall back to the JSON storage.
+    With strict=False such values are kept approximately instead (no date,
+    truncated id, clamped numbers), which is enough for statistics.
+    """
+    records = np.zeros(len(placements), dtype=DTYPE)
+    for row, (review, chunk, offset, length) in enumerate(placements):
+        ordinal = _date_ordinal(review.get("date"))
+        encoded_id = review["review_id"].encode()
+        usefulness = review.get("usefulness") or {}
+        numbers = {
+            "rating": review.get("rating") or 0,
+            "helpful": usefulness.get("helpful", 0),
+            "total_votes": usefulness.get("total_votes", 0),
+        }
+        if ordinal is None or len(encoded_id) > ID_WIDTH or not all(_fits(f, v) for f, v in numbers.items()):
+            if strict:
+                return None
+            ordinal, encoded_id = ordinal or 0, encoded_id[:ID_WIDTH]
+            numbers = {f: _clamped(f, v) for f, v in numbers.items()}
+        records[row] = (
+            numbers["rating"],
+            ordinal,
+            numbers["helpful"],
+            numbers["total_votes"],
+            chunk,
+            offset,
+            length,
+            encoded_id,
+        )
+    return records
+
+
+def write(path: str, placements: Sequence[Placement], stamp: Tuple[int, int]) -> bool:
+    """Write the sidecar atomically; removes a stale one if columns can't be built."""
+    records = build(placements)
+    if records is None:
+        remove(path)
+        return False
+    tmp_fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    os.close(tmp_fd)
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, stamp[0], stamp[1], len(records)))
+            f.write(records.tobytes())
+        shutil.move(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    _mapped.pop(path, None)
+    return True
+
+
+def remove(path: str) -> None:
+    _mapped.pop(path, None)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+# ────────────────────────────────
+# Reading
+# ────────────────────────────────
+_mapped: Dict[str, Tuple[Tuple[int, int], np.ndarray]] = {}
+
+
+def open_columns(path: str, stamp: Optional[Tuple[int, int]]) -> Optional[np.ndarray]:
+    """Memory-mapped records, or None if the sidecar is missing or not for `stamp`."""
+    if stamp is None:
+        return None
+    cached = _mapped.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    try:
+        with open(path, "rb") as f:
+            magic, mtime_ns, size, rows = HEADER.unpack(f.read(HEADER.size))
+    except (FileNotFoundError, struct.error):
+        return None
+    if magic != MAGIC or (mtime_ns, size) != tuple(stamp):
+        return None
+    if rows:
+        records = np.memmap(path, dtype=DTYPE, mode="r", offset=HEADER.size, shape=(rows,))
+    else:
+        records = np.zeros(0, dtype=DTYPE)
+    _mapped[path] = (tuple(stamp), records)
+    return records
+
+
+def sort_keys(records: np.ndarray, sort_by: str) -> np.ndarray:
+    """Column equivalent of index.SORT_KEYS[sort_by] (same ordering and values)."""
+    if sort_by == "date":
+        return records["date"]
+    if sort_by == "rating":
+        return records["rating"]
+    if sort_by in ("helpful", "total_votes"):
+        return records[sort_by]
+    if sort_by == "wilson":
+        return wilson_lower_bounds(records["helpful"], records["total_votes"])
+    raise ValueError(f"Unknown sort key {sort_by}")
+
+
+def wilson_lower_bounds(helpful: np.ndarray, total_votes: np.ndarray, z: float = WILSON_Z) -> np.ndarray:
+    """Vectorised index.wilson_lower_bound (same operation order, same float results)."""
+    n = total_votes.astype(np.float64)
+    safe_n = np.where(n > 0, n, 1.0)
+    p = np.clip(helpful / safe_n, 0.0, 1.0)
+    z2 = z * z
+    centre = p + z2 / (2 * safe_n)
+    margin = z * np.sqrt((p * (1 - p) + z2 / (4 * safe_n)) / safe_n)
+    return np.where(n > 0, (centre - margin) / (1 + z2 / safe_n), 0.0)
+
+
+def cursor_key(sort_by: str, key) -> object:
+    """Translate a cursor's sort key (as in SORT_KEYS) to the column's representation."""
+    if sort_by == "date":
+        return _date_ordinal(key) or 0
+    return key
+
+
+def page_rows(
+    records: np.ndarray,
+    sort_by: str,
+    order: str = "desc",
+    rating: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 20,
+    after: Optional[Tuple] = None,
+) -> np.ndarray:
+    """Row numbers of one page, ordered like ReviewCollection.page."""
+    keys = sort_keys(records, sort_by)
+    ids = records["review_id"]
+    mask = np.ones(len(records), dtype=bool)
+    if rating is not None:
+        mask &= records["rating"] == rating
+    desc = order.lower() == "desc"
+    if after is not None:
+        key, review_id = cursor_key(sort_by, after[0]), after[1].encode()
+        if desc:
+            mask &= (keys < key) | ((keys == key) & (ids < review_id))
+        else:
+            mask &= (keys > key) | ((keys == key) & (ids > review_id))
+    rows = np.flatnonzero(mask)
+    ordered = rows[np.lexsort((ids[rows], keys[rows]))]
+    if desc:
+        ordered = ordered[::-1]
+    return ordered[skip: skip + limit]
+
+
+def load_rows(records: np.ndarray, rows: Sequence[int], file_for_chunk: Callable[[int], str]) -> List[Dict]:
+    """Read only the given reviews from storage, using their offsets."""
+    reviews, handles = [], {}
+    try:
+        for row in rows:
+            record = records[row]
+            chunk = int(record["chunk"])
+            if chunk not in handles:
+                handles[chunk] = codec.open_payload(file_for_chunk(chunk))
+            f = handles[chunk]
+            f.seek(int(record["offset"]))
+            reviews.append(json.loads(f.read(int(record["length"]))))
+    finally:
+        for f in handles.values():
+            f.close()
+    return reviews
@@ -0,0 +1,209 @@
+"""
+index.py – In-memory sorted index over a single movie's reviews.
+
+A ReviewCollection keeps the reviews of one movie together with lazily built,
+presorted (sort key, review_id) lists, one per sort option and rating filter.
+List pages seek into those lists with bisect instead of re-sorting the whole
+file per request, and writes keep the lists up to date incrementally.
+
+Cursors encode the sort key and review_id of the last row of a page, so the
+next page starts right after that row even if reviews were added, deleted or
+voted on in the meantime.
+"""
+
+import base64, json, math, threading
+from datetime import date
+from bisect import bisect_left, bisect_right, insort
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+# ────────────────────────────────
+# Sort keys
+# ────────────────────────────────
+def _usefulness(review: Dict, field: str) -> int:
+    return (review.get("usefulness") or {}).get(field, 0)
+
+
+# z-score for a 95% confidence interval
+WILSON_Z = 1.96
+
+
+def wilson_lower_bound(helpful: int, total_votes: int, z: float = WILSON_Z) -> float:
+    """
+    Lower bound of the Wilson score interval for the helpful ratio.
+    Few votes give a wide interval and a low bound, so 9/10 ranks above 1/1
+    and 90/100 ranks above both.
+    """
+    if total_votes <= 0:
+        return 0.0
+    p = min(max(helpful / total_votes, 0.0), 1.0)
+    z2 = z * z
+    centre = p + z2 / (2 * total_votes)
+    margin = z * math.sqrt((p * (1 - p) + z2 / (4 * total_votes)) / total_votes)
+    return (centre - margin) / (1 + z2 / total_votes)
+
+
+SORT_KEYS: Dict[str, Callable[[Dict], Any]] = {
+    "date": lambda r: r.get("date") or "",
+    "rating": lambda r: r.get("rating") or 0,
+    "helpful": lambda r: _usefulness(r, "helpful"),
+    "total_votes": lambda r: _usefulness(r, "total_votes"),
+    "wilson": lambda r: wilson_lower_bound(_usefulness(r, "helpful"), _usefulness(r, "total_votes")),
+}
+
+Entry = Tuple[Any, str]
+
+
+# ────────────────────────────────
+# Cursors
+# ────────────────────────────────
+def encode_cursor(review: Dict, sort_by: str) -> str:
+    """Opaque cursor pointing just after `review` in the `sort_by` ordering."""
+    raw = json.dumps([sort_by, SORT_KEYS[sort_by](review), review["review_id"]])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str) -> Entry:
+    """Return the (sort key, review_id) entry encoded in `cursor`."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, key, review_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor.")
+    if cursor_sort != sort_by:
+        raise ValueError(f"Cursor was issued for sort_by={cursor_sort}, not {sort_by}.")
+    if not isinstance(review_id, str) or not _valid_key(sort_by, key):
+        raise ValueError("Invalid cursor.")
+    return key, review_id
+
+
+def _valid_key(sort_by: str, key: Any) -> bool:
+    """True if `key` has the type SORT_KEYS[sort_by] produces (ISO date string or number)."""
+    if sort_by == "date":
+        if not isinstance(key, str):
+            return False
+        if not key:
+            return True  # reviews without a date
+        try:
+            date.fromisoformat(key)
+        except ValueError:
+            return False
+        return True
+    return isinstance(key, (int, float)) and not isinstance(key, bool) and math.isfinite(key)
+
+
+# ────────────────────────────────
+# Collection
+# ────────────────────────────────
+class ReviewCollection:
+    """Reviews of one movie plus their sorted indexes."""
+
+    def __init__(self, movie_id: str, reviews: List[Dict], stamp: Any = None):
+        self.movie_id = movie_id
+        self.reviews = reviews
+        self.by_id = {r["review_id"]: r for r in reviews}
+        self.stamp = stamp  # storage version this collection was loaded from
+        self.lock = threading.RLock()
+        self._sorted: Dict[Tuple[str, Optional[int]], List[Entry]] = {}
+        self._reviewers: Optional[Dict[str, int]] = None  # user_id -> review count, built on first use
+
+    def __len__(self) -> int:
+        return len(self.reviews)
+
+    # --- Index maintenance ---
+    def sorted_entries(self, sort_by: str, rating: Optional[int] = None) -> List[Entry]:
+        """Ascending (sort key, review_id) entries, built on first use."""
+        with self.lock:
+            entries = self._sorted.get((sort_by, rating))
+            if entries is None:
+                key_fn = SORT_KEYS[sort_by]
+                entries = sorted(
+                    (key_fn(r), r["review_id"])
+                    for r in self.reviews
+                    if rating is None or r.get("rating") == rating
+                )
+                self._sorted[(sort_by, rating)] = entries
+            return entries
+
+    def _link(self, review: Dict) -> None:
+        for (sort_by, rating), entries in self._sorted.items():
+            if rating is None or review.get("rating") == rating:
+                insort(entries, (SORT_KEYS[sort_by](review), review["review_id"]))
+
+    def _unlink(self, review: Dict) -> None:
+        for (sort_by, rating), entries in self._sorted.items():
+            if rating is None or review.get("rating") == rating:
+                entry = (SORT_KEYS[sort_by](review), review["review_id"])
+                i = bisect_left(entries, entry)
+                if i < len(entries) and entries[i] == entry:
+                    del entries[i]
+
+    def has_reviewer(self, user_id: str) -> bool:
+        """True if `user_id` wrote one of these reviews."""
+        with self.lock:
+            if self._reviewers is None:
+                self._reviewers = {}
+                for review in self.reviews:
+                    self._count_reviewer(review, 1)
+            return user_id in self._reviewers
+
+    def _count_reviewer(self, review: Dict, delta: int) -> None:
+        user_id = review.get("user_id")
+        count = self._reviewers.get(user_id, 0) + delta
+        if count > 0:
+            self._reviewers[user_id] = count
+        else:
+            self._reviewers.pop(user_id, None)
+
+    # --- Mutations ---
+    def add(self, review: Dict) -> None:
+        with self.lock:
+            self.reviews.append(review)
+            self.by_id[review["review_id"]] = review
+            self._link(review)
+            if self._reviewers is not None:
+                self._count_reviewer(review, 1)
+
+    def remove(self, review_id: str) -> Optional[Dict]:
+        with self.lock:
+            review = self.by_id.pop(review_id, None)
+            if review is None:
+                return None
+            self._unlink(review)
+            self.reviews.remove(review)
+            if self._reviewers is not None:
+                self._count_reviewer(review, -1)
+            return review
+
+    def modify(self, review_id: str, mutate: Callable[[Dict], None]) -> Optional[Dict]:
+        """Apply `mutate` to a review in place and re-key it in every index."""
+        with self.lock:
+            review = self.by_id.get(review_id)
+            if review is None:
+                return None
+            self._unlink(review)
+            mutate(review)
+            self._link(review)
+            return review
+
+    # --- Reads ---
+    def page(
+        self,
+        sort_by: str,
+        order: str = "desc",
+        rating: Optional[int] = None,
+        skip: int = 0,
+        limit: int = 20,
+        after: Optional[Entry] = None,
+    ) -> List[Dict]:
+        """Return one page, optionally starting right after the `after` entry."""
+        with self.lock:
+            entries = self.sorted_entries(sort_by, rating)
+            if order.lower() == "desc":
+                end = len(entries) if after is None else bisect_left(entries, after)
+                stop = max(end - skip, 0)
+                window = reversed(entries[max(stop - limit, 0):stop])
+            else:
+                begin = 0 if after is None else bisect_right(entries, after)
+                window = entries[begin + skip: begin + skip + limit]
+            return [self.by_id[review_id] for _, review_id in window]
@@ -0,0 +1,315 @@
+"""
+journaled.py – In-memory indexes persisted as a snapshot plus a journal and
+shared by every worker process.
+
+Each index module (search, similarity, user_index) owns one JournaledIndex
+over its files:
+- snapshot        → the whole index as of the last build or compaction
+- snapshot.meta   → which snapshot and journal prefix that snapshot folded
+- journal         → NDJSON entries written since the snapshot
+- journal.lock    → flock taken for every read and write of the above
+- journal.build.lock → flock held while a process writes a whole new snapshot
+
+Every process keeps the index in memory. Before using it, a process catches
+up with the files: it applies only the journal bytes appended since its last
+look, and reloads the snapshot only when another process replaced it with
+something other than a compaction of what it already holds.
+
+Nothing expensive runs on the request path:
+- without a snapshot the index starts from the journal and the corpus is
+  scanned on a background thread (one process at a time), after which the
+  journal written meanwhile is replayed onto the result;
+- once the journal holds compact_at entries, a background thread folds it
+  into a new snapshot read from the files, taking the flock only to swap.
+
+Journal entries must set state rather than change it ("add" replaces, "del"
+removes), so replaying a journal prefix onto a newer state is harmless.
+"""
+
+import os, json, threading, tempfile, shutil
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development only
+    fcntl = None
+
+Stamp = Tuple[int, int, int]
+
+
+def _stamp(path: str) -> Optional[Stamp]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def _size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return 0
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp_fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    os.close(tmp_fd)
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        shutil.move(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class JournaledIndex:
+    """
+    One index module's files plus this process's copy of the index.
+
+    `load(path)` reads a snapshot and `dump(index, path)` writes one, returning
+    the index to keep using (search keeps the compacted copy it wrote).
+    `apply(index, entry)` replays a journal entry and `scan()` builds the whole
+    index from the stored reviews. Paths and compact_at are callables so tests
+    and scripts can repoint the owning module's settings.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        snapshot_path: Callable[[], str],
+        journal_path: Callable[[], str],
+        empty: Callable[[], Any],
+        load: Callable[[str], Any],
+        dump: Callable[[Any, str], Any],
+        apply: Callable[[Any, list], Any],
+        scan: Callable[[], Any],
+        compact_at: Callable[[], int],
+    ):
+        self.name = name
+        self.snapshot_path, self.journal_path = snapshot_path, journal_path
+        self.empty, self.load, self.dump, self.apply, self.scan = empty, load, dump, apply, scan
+        self.compact_at = compact_at
+        self.index: Any = None
+        self._snapshot_stamp: Optional[Stamp] = None  # snapshot file self.index started from
+        self._journal_offset = 0  # journal bytes already applied to self.index
+        self._journal_entries = 0
+        self._lock = threading.RLock()
+        self._depth = 0  # nesting of locked() in the thread holding _lock
+        self._lock_file = None
+        self._build_mutex = threading.Lock()
+        self._builder: Optional[threading.Thread] = None
+        self._compactor: Optional[threading.Thread] = None
+        self._build_failed = False
+
+    def fresh(self) -> "JournaledIndex":
+        """A new copy over the same files, as a freshly started process has."""
+        return JournaledIndex(self.name, self.snapshot_path, self.journal_path, self.empty,
+                              self.load, self.dump, self.apply, self.scan, self.compact_at)
+
+    def _meta_path(self) -> str:
+        return self.snapshot_path() + ".meta"
+
+    # --- Locking ---
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        """This process's lock plus the flock shared by all processes (re-entrant)."""
+        with self._lock:
+            if self._depth == 0:
+                path = self.journal_path() + ".lock"
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                self._lock_file = open(path, "a")
+                if fcntl is not None:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    if fcntl is not None:
+                        fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+                    self._lock_file.close()
+                    self._lock_file = None
+
+    @contextmanager
+    def _building(self, wait: bool = True) -> Iterator[bool]:
+        """Exclusive right to write a whole new snapshot; yields False if busy and not waiting."""
+        if not self._build_mutex.acquire(blocking=wait):
+            yield False
+            return
+        try:
+            path = self.journal_path() + ".build.lock"
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "a") as f:
+                acquired = True
+                if fcntl is not None:
+                    try:
+                        fcntl.flock(f, fcntl.LOCK_EX | (0 if wait else fcntl.LOCK_NB))
+                    except BlockingIOError:
+                        acquired = False
+                try:
+                    yield acquired
+                finally:
+                    if acquired and fcntl is not None:
+                        fcntl.flock(f, fcntl.LOCK_UN)
+        finally:
+            self._build_mutex.release()
+
+    # --- Reading the files ---
+    def _replay(self, index: Any, start: int = 0, end: Optional[int] = None) -> Tuple[int, int]:
+        """Apply journal lines from byte `start` (up to `end`); returns (offset reached, entries applied)."""
+        offset, applied = start, 0
+        try:
+            f = open(self.journal_path(), "rb")
+        except FileNotFoundError:
+            return start, 0
+        with f:
+            f.seek(start)
+            for line in f:
+                if end is not None and offset + len(line) > end:
+                    break
+                offset += len(line)
+                try:
+                    self.apply(index, json.loads(line))
+                except (ValueError, TypeError, IndexError):
+                    print(f"[WARNING] Skipping unreadable {self.name} journal entry.")
+                    continue
+                applied += 1
+        return offset, applied
+
+    def _follow(self, stamp: Stamp) -> bool:
+        """
+        Keep the in-memory index across another process's compaction when it
+        already holds everything that compaction folded.
+        """
+        try:
+            with open(self._meta_path(), "r") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if (meta.get("prev") is None or self._snapshot_stamp is None
+                or tuple(meta["snapshot"]) != stamp or tuple(meta["prev"]) != self._snapshot_stamp
+                or self._journal_offset < meta["cut"]):
+            return False
+        self._journal_offset -= meta["cut"]
+        self._journal_entries = max(self._journal_entries - meta["entries"], 0)
+        return True
+
+    def _sync(self) -> Any:
+        """Bring the in-memory index up to date with the files; caller holds locked()."""
+        stamp = _stamp(self.snapshot_path())
+        if stamp is None:
+            if self.index is None or self._snapshot_stamp is not None:
+                # Never built: serve what the journal holds while the corpus is scanned
+                self.index, self._snapshot_stamp = self.empty(), None
+                self._journal_offset = self._journal_entries = 0
+            if not self._build_failed:
+                self._start("_builder", self._build_in_background)
+        elif self.index is None or stamp != self._snapshot_stamp:
+            if self.index is None or not self._follow(stamp):
+                self.index = self.load(self.snapshot_path())
+                self._journal_offset = self._journal_entries = 0
+            self._snapshot_stamp = stamp
+        self._journal_offset, applied = self._replay(self.index, self._journal_offset)
+        self._journal_entries += applied
+        return self.index
+
+    def current(self) -> Any:
+        """The index, current with every process's writes."""
+        with self.locked():
+            return self._sync()
+
+    # --- Writing ---
+    def record(self, entry: list) -> None:
+        """Apply `entry` to the index and journal it."""
+        with self.locked():
+            self.apply(self._sync(), entry)
+            with open(self.journal_path(), "ab") as f:
+                f.write((json.dumps(entry) + "\n").encode())
+                self._journal_offset = f.tell()
+            self._journal_entries += 1
+            if self._snapshot_stamp is not None and self._journal_entries >= self.compact_at():
+                self._start("_compactor", self._compact_in_background)
+
+    def _fold(self, base: Callable[[], Any], expected: Optional[Stamp], follow: bool) -> Any:
+        """
+        Write base() plus the journal as the new snapshot and drop the folded
+        journal prefix. Only the swap runs under the flock; the caller holds
+        _building(), so the snapshot is still `expected` by then. With
+        `follow`, processes that already applied the prefix keep their index.
+        """
+        index = base()
+        with self.locked():
+            cut = _size(self.journal_path())
+        _, folded = self._replay(index, 0, cut)
+        tmp_fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.snapshot_path()))
+        os.close(tmp_fd)
+        try:
+            index = self.dump(index, tmp_path)
+            with self.locked():
+                meta = {"snapshot": _stamp(tmp_path), "prev": expected if follow else None,
+                        "cut": cut, "entries": folded}
+                _write_atomic(self._meta_path(), json.dumps(meta).encode())
+                shutil.move(tmp_path, self.snapshot_path())
+                try:
+                    with open(self.journal_path(), "rb") as f:
+                        f.seek(cut)
+                        tail = f.read()
+                except FileNotFoundError:
+                    tail = b""
+                _write_atomic(self.journal_path(), tail)
+                self.index, self._snapshot_stamp = index, _stamp(self.snapshot_path())
+                self._journal_offset = self._journal_entries = 0
+                return self._sync()
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def rebuild(self, scan: Optional[Callable[[], Any]] = None) -> Any:
+        """Replace the snapshot with a full scan (scan jobs); waits for a build or compaction in progress."""
+        with self._building():
+            with self.locked():
+                expected = _stamp(self.snapshot_path())
+            return self._fold(scan or self.scan, expected, follow=False)
+
+    # --- Background work ---
+    def _start(self, attr: str, target: Callable[[], None]) -> None:
+        thread = getattr(self, attr)
+        if thread is None or not thread.is_alive():
+            thread = threading.Thread(target=target, name=f"{self.name} {attr[1:]}", daemon=True)
+            setattr(self, attr, thread)
+            thread.start()
+
+    def _build_in_background(self) -> None:
+        try:
+            with self._building():
+                with self.locked():
+                    if _stamp(self.snapshot_path()) is not None:
+                        return  # another process built it while this one waited
+                self._fold(self.scan, None, follow=False)
+        except Exception as e:
+            self._build_failed = True
+            print(f"[WARNING] {self.name} build failed: {e}")
+
+    def _compact_in_background(self) -> None:
+        try:
+            with self._building(wait=False) as free:
+                if not free:
+                    return  # a build, rebuild or compaction is already replacing the snapshot
+                with self.locked():
+                    self._sync()
+                    expected = self._snapshot_stamp
+                    if expected is None or self._journal_entries < self.compact_at():
+                        return
+                self._fold(lambda: self.load(self.snapshot_path()), expected, follow=True)
+        except Exception as e:
+            print(f"[WARNING] {self.name} compaction failed: {e}")
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """Join the background build and compaction, if any (tests, scripts)."""
+        for thread in (self._builder, self._compactor):
+            if thread is not None:
+                thread.join(timeout)
@@ -0,0 +1,78 @@
+"""
+reader.py – Incremental reader for JSON array files.
+
+iter_json_array() yields the elements of a top-level JSON array one by one,
+decoding them with json.JSONDecoder.raw_decode over a buffer that is refilled
+READ_SIZE characters at a time. Callers that only need the first rows (a date
+page of a date-ordered file, a lookup by id) stop early without reading or
+parsing the rest of the file, and memory stays at roughly one buffer plus the
+rows kept. Compressed files (see codec.py) are decompressed as they are read.
+"""
+
+import json
+from typing import Any, Iterator
+
+from backend.reviews import codec
+
+READ_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+def iter_json_array(path: str, read_size: int = READ_SIZE) -> Iterator[Any]:
+    """Yield each element of the JSON array stored at `path`."""
+    with codec.open_text(path) as f:
+        buf, pos, eof = "", 0, False
+
+        def fill() -> bool:
+            nonlocal buf, pos, eof
+            chunk = f.read(read_size)
+            if not chunk:
+                eof = True
+                return False
+            buf = buf[pos:] + chunk
+            pos = 0
+            return True
+
+        def skip(chars: str) -> None:
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in chars:
+                    pos += 1
+                if pos < len(buf) or not fill():
+                    return
+
+        skip(_WHITESPACE)
+        if pos >= len(buf):
+            return  # empty file
+        if buf[pos] != "[":
+            raise json.JSONDecodeError("Expected a JSON array", buf, pos)
+        pos += 1
+
+        while True:
+            skip(_WHITESPACE + ",")
+            if pos >= len(buf):
+                raise json.JSONDecodeError("Unterminated JSON array", buf, pos)
+            if buf[pos] == "]":
+                return
+            while True:
+                try:
+                    item, end = _decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if eof or not fill():
+                        raise
+                    continue
+                # A number cut at the buffer edge ("3." of "3.5") decodes "successfully":
+                # only accept an element once the delimiter after it is in the buffer.
+                after = end
+                while after < len(buf) and buf[after] in _WHITESPACE:
+                    after += 1
+                if after < len(buf) and buf[after] in ",]":
+                    break
+                if eof or not fill():
+                    if after < len(buf):
+                        raise json.JSONDecodeError("Expecting ',' delimiter", buf, after)
+                    break
+            pos = end
+            yield item
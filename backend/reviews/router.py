@@ -1,4 +1,7 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+import time
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from typing import List, Optional
 from backend.reviews import utils, schemas
 from backend.authentication import schemas as auth_schemas
@@ -9,25 +12,167 @@ from backend.penalties import utils as penalty_utils
 router = APIRouter(prefix="/reviews", tags=["Reviews"])
 
 
+@router.get("/search", response_model=List[schemas.ReviewSearchHit])
+def search_reviews(
+    q: str = Query(..., min_length=1, description='Search terms; wrap exact phrases in "quotes"'),
+    movie_id: Optional[str] = Query(None, description="Only search this movie's reviews"),
+    limit: int = Query(20, ge=1, le=100),
+    current_user=Depends(get_current_user)
+):
+    """Full-text search over review titles and bodies, ranked with BM25."""
+    return utils.search_reviews(q, movie_id=movie_id, limit=limit)
+
+
+@router.get("/sample", response_model=List[schemas.Review])
+def sample_reviews(
+    n: int = Query(20, ge=1, le=1000, description="Sample size"),
+    movie_id: Optional[str] = Query(None, description="Only sample this movie's reviews"),
+    rating: Optional[int] = Query(None, ge=1, le=10, description="Only sample reviews with this rating"),
+    seed: Optional[int] = Query(None, description="Seed for a reproducible sample"),
+    current_user=Depends(get_current_user)
+):
+    """Uniform random sample of reviews without replacement, in random order."""
+    return utils.sample_reviews(n, movie_id=movie_id, rating=rating, seed=seed)
+
+
+def _export_response(movie_ids: List[str], filename: str, gzip: bool) -> StreamingResponse:
+    if gzip:
+        filename += ".gz"
+    return StreamingResponse(
+        utils.export_ndjson(movie_ids, compress=gzip),
+        media_type="application/gzip" if gzip else "application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/export")
+def export_all_reviews(
+    start_after: Optional[str] = Query(None, description="Resume after this movie id"),
+    gzip: bool = Query(False, description="gzip-compress the stream"),
+    current_user=Depends(get_current_user)
+):
+    """Admin: stream every review as NDJSON, movie by movie in movie id order."""
+    if current_user.role != "administrator":
+        raise HTTPException(status_code=403, detail="Not authorized.")
+    return _export_response(utils.export_movie_ids(start_after), "reviews.ndjson", gzip)
+
+
+@router.get("/{movie_id}/export")
+def export_movie_reviews(
+    movie_id: str,
+    gzip: bool = Query(False, description="gzip-compress the stream"),
+    current_user=Depends(get_current_user)
+):
+    """Stream all reviews of one movie as NDJSON."""
+    return _export_response([movie_id], f"{movie_id}_reviews.ndjson", gzip)
+
+
+# NDJSON rows validated and written per batch
+BULK_BATCH_SIZE = 1000
+
+
+@router.post("/bulk", response_model=schemas.ImportResult)
+async def bulk_import_reviews(request: Request, current_user=Depends(get_current_user)):
+    """
+    Admin: import reviews from an NDJSON body (one ReviewImport object per line).
+    Rows are applied in batches of BULK_BATCH_SIZE with one write per movie;
+    invalid or duplicate rows are reported by line number and skipped.
+    """
+    if current_user.role != "administrator":
+        raise HTTPException(status_code=403, detail="Not authorized.")
+
+    started = time.perf_counter()
+    received, imported, errors = 0, 0, []
+    batch, pending, line = [], b"", 0
+
+    async def flush():
+        nonlocal imported, batch
+        if batch:
+            result = await run_in_threadpool(utils.import_reviews_batch, batch)
+            imported += result["imported"]
+            errors.extend(result["errors"])
+            batch = []
+
+    async for chunk in request.stream():
+        pending += chunk
+        *complete, pending = pending.split(b"\n")
+        for raw in complete:
+            line += 1
+            if raw.strip():
+                received += 1
+                batch.append((line, raw.decode("utf-8", errors="replace")))
+        if len(batch) >= BULK_BATCH_SIZE:
+            await flush()
+    if pending.strip():
+        received += 1
+        batch.append((line + 1, pending.decode("utf-8", errors="replace")))
+    await flush()
+
+    seconds = time.perf_counter() - started
+    return {
+        "received": received,
+        "imported": imported,
+        "failed": len(errors),
+        "errors": errors,
+        "seconds": round(seconds, 3),
+        "rows_per_second": round(received / seconds, 1) if seconds else 0.0,
+    }
+
+
+# Largest accepted POST /reviews/votes:batch body
+MAX_BATCH_VOTES = 1000
+
+
+@router.post("/votes:batch", response_model=List[schemas.BatchVoteResult])
+def vote_reviews_batch(votes: List[schemas.BatchVote], current_user=Depends(get_current_user)):
+    """
+    Apply queued helpful/not-helpful votes in one request (e.g. replayed by an
+    offline client). Each movie is written once; results follow input order.
+    """
+    if len(votes) > MAX_BATCH_VOTES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_VOTES} votes per batch.")
+    return utils.add_votes(votes)
+
+
+@router.get("/{movie_id}/stats", response_model=schemas.ReviewStats)
+def review_stats(movie_id: str, current_user=Depends(get_current_user)):
+    """Rating distribution, helpful-ratio quantiles and reviews per month for a movie."""
+    return utils.review_stats(movie_id)
+
+
 @router.get("/{movie_id}", response_model=List[schemas.Review])
 def list_reviews(
     movie_id: str,
+    response: Response,
     rating: Optional[int] = Query(None, description="Filter by rating (1–10)"),
-    sort_by: str = Query("date", description="Sort by date, rating, helpful, total_votes"),
+    sort_by: str = Query("date", description="Sort by date, rating, helpful, total_votes, wilson (confidence-adjusted helpful ratio)"),
     order: str = Query("desc", description="Order: asc or desc"),
     skip: int = Query(0, ge=0),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
     current_user=Depends(get_current_user)
 ):
-    """List reviews with optional filtering, sorting, and pagination."""
-    return utils.filter_sort_reviews(
-        movie_id=movie_id,
-        rating=rating,
-        sort_by=sort_by,
-        order=order,
-        skip=skip,
-        limit=limit
-    )
+    """
+    List reviews with optional filtering, sorting, and pagination.
+    Full pages carry an X-Next-Cursor header; pass it back as `cursor`
+    to get the next page without duplicates or gaps.
+    """
+    try:
+        reviews = utils.filter_sort_reviews(
+            movie_id=movie_id,
+            rating=rating,
+            sort_by=sort_by,
+            order=order,
+            skip=skip,
+            limit=limit,
+            cursor=cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if len(reviews) == limit:
+        response.headers["X-Next-Cursor"] = utils.encode_cursor(reviews[-1], sort_by)
+    return reviews
 
 
 @router.get("/{movie_id}/{review_id}", response_model=schemas.Review)
@@ -1,6 +1,7 @@
-from pydantic import BaseModel, Field
-from typing import Optional
-from datetime import datetime
+from pydantic import BaseModel, Field, validator
+from typing import Dict, List, Optional
+from datetime import datetime, date as Date
+import re
 import uuid
 
 
@@ -20,17 +21,83 @@ class Review(BaseModel):
     usefulness: Usefulness = Field(default_factory=Usefulness)
 
 
+class ReviewSearchHit(Review):
+    score: float
+
+
+class MonthCount(BaseModel):
+    month: str  # YYYY-MM
+    count: int
+
+
+class ReviewStats(BaseModel):
+    movie_id: str
+    count: int
+    mean: Optional[float] = None
+    median: Optional[float] = None
+    std_dev: Optional[float] = None  # population standard deviation of ratings
+    histogram: Dict[int, int]  # rating (1–10) -> number of reviews
+    helpful_ratio_quantiles: Dict[str, Optional[float]]  # over reviews with votes
+    reviews_per_month: List[MonthCount]
+
+
 class ReviewCreate(BaseModel):
     title: str
-    rating: int
+    rating: int = Field(..., ge=1, le=10)
     text: str
 
 
+class ReviewImport(BaseModel):
+    """One NDJSON row of a bulk import; omitted fields get the usual defaults."""
+    movie_id: str
+    user_id: str
+    title: str
+    rating: int = Field(..., ge=1, le=10)
+    text: str
+    review_id: Optional[str] = None
+    date: Optional[Date] = None  # stored as an ISO string like every other review date
+    usefulness: Optional[Usefulness] = None
+
+    @validator('movie_id')
+    def validate_movie_id(cls, v):
+        # Used in file names: no path separators or dots
+        if not re.match(r'^[A-Za-z0-9_-]+$', v):
+            raise ValueError('movie_id can only contain letters, numbers, hyphens and underscores')
+        return v
+
+
+class ImportRowError(BaseModel):
+    line: int
+    error: str
+
+
+class ImportResult(BaseModel):
+    received: int
+    imported: int
+    failed: int
+    errors: List[ImportRowError]
+    seconds: float
+    rows_per_second: float
+
+
 class ReviewUpdate(BaseModel):
     title: Optional[str] = None
-    rating: Optional[int] = None
+    rating: Optional[int] = Field(None, ge=1, le=10)
     text: Optional[str] = None
 
 
 class Vote(BaseModel):
     vote: bool  # True = helpful, False = not helpful
+
+
+class BatchVote(Vote):
+    movie_id: str
+    review_id: str
+
+
+class BatchVoteResult(BaseModel):
+    movie_id: str
+    review_id: str
+    ok: bool
+    error: Optional[str] = None
+    usefulness: Optional[Usefulness] = None  # counts after this vote
@@ -0,0 +1,337 @@
+"""
+search.py – Full-text search over review titles and bodies.
+
+An inverted index maps each term to a posting list of the reviews containing
+it. Posting lists are byte arrays of varints: for every document the gap to
+the previous document id, the term frequency, then the gaps between term
+positions. Positions make phrase queries ("..." in the query) possible and
+the frequencies feed BM25 ranking.
+
+The index lives in memory and is persisted under data/search/:
+- index.bin      → compacted snapshot (deleted reviews dropped)
+- journal.ndjson → review writes applied since the snapshot
+
+Review writes in backend.reviews.utils call index_review / unindex_review,
+which update memory and append to the journal. Once the journal grows past
+JOURNAL_COMPACT_AT entries a background thread folds it into a fresh snapshot.
+
+The files are shared by all worker processes through journaled.JournaledIndex.
+Without a snapshot the index starts from the journal alone and the corpus is
+indexed on a background thread (or by scripts/rebuild_search_index.py), so no
+request pays for a full build; searches meanwhile only see recent writes.
+"""
+
+import os, re, json, math, threading
+from array import array
+from collections import defaultdict
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from backend.reviews.journaled import JournaledIndex
+
+INDEX_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "search")
+SNAPSHOT_MAGIC = b"RVSEARCH1\n"
+JOURNAL_COMPACT_AT = 5000
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+_PHRASE_RE = re.compile(r'"([^"]*)"')
+
+
+def tokenize(text: str) -> List[str]:
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+def review_tokens(review: Dict) -> List[str]:
+    """Title and body tokens; a gap keeps phrases from spanning the two."""
+    return tokenize(review.get("title", "")) + [""] + tokenize(review.get("text", ""))
+
+
+# ────────────────────────────────
+# Varint helpers
+# ────────────────────────────────
+def _put_varint(buf: bytearray, value: int) -> None:
+    while value >= 0x80:
+        buf.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buf.append(value)
+
+
+def _get_varint(buf, pos: int) -> Tuple[int, int]:
+    result = shift = 0
+    while True:
+        byte = buf[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def _iter_postings(buf) -> Iterator[Tuple[int, List[int]]]:
+    """Yield (doc_id, positions) from an encoded posting list."""
+    pos, doc = 0, -1
+    end = len(buf)
+    while pos < end:
+        gap, pos = _get_varint(buf, pos)
+        doc += gap
+        tf, pos = _get_varint(buf, pos)
+        positions, last = [], -1
+        for _ in range(tf):
+            delta, pos = _get_varint(buf, pos)
+            last += delta
+            positions.append(last)
+        yield doc, positions
+
+
+# ────────────────────────────────
+# Index
+# ────────────────────────────────
+class SearchIndex:
+    def __init__(self):
+        self.docs: List[Optional[Tuple[str, str]]] = []  # doc_id -> (movie_id, review_id)
+        self.doc_len = array("I")
+        self.doc_ids: Dict[Tuple[str, str], int] = {}
+        self.postings: Dict[str, bytearray] = {}
+        self.last_doc: Dict[str, int] = {}
+        self.total_len = 0
+        self.lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def add(self, movie_id: str, review_id: str, tokens: List[str]) -> None:
+        with self.lock:
+            self.remove(movie_id, review_id)
+            doc = len(self.docs)
+            self.docs.append((movie_id, review_id))
+            self.doc_ids[(movie_id, review_id)] = doc
+            self.doc_len.append(len(tokens))
+            self.total_len += len(tokens)
+
+            positions: Dict[str, List[int]] = defaultdict(list)
+            for i, term in enumerate(tokens):
+                if term:
+                    positions[term].append(i)
+            for term, term_positions in positions.items():
+                self._append(term, doc, term_positions)
+
+    def _append(self, term: str, doc: int, positions: List[int]) -> None:
+        buf = self.postings.get(term)
+        if buf is None:
+            buf = self.postings[term] = bytearray()
+        _put_varint(buf, doc - self.last_doc.get(term, -1))
+        _put_varint(buf, len(positions))
+        last = -1
+        for p in positions:
+            _put_varint(buf, p - last)
+            last = p
+        self.last_doc[term] = doc
+
+    def remove(self, movie_id: str, review_id: str) -> bool:
+        """Tombstone a review; its postings are dropped at the next compaction."""
+        with self.lock:
+            doc = self.doc_ids.pop((movie_id, review_id), None)
+            if doc is None:
+                return False
+            self.docs[doc] = None
+            self.total_len -= self.doc_len[doc]
+            return True
+
+    def compacted(self) -> "SearchIndex":
+        """Copy of this index without tombstoned documents."""
+        with self.lock:
+            fresh = SearchIndex()
+            remap = array("i", [-1]) * len(self.docs)
+            for doc, key in enumerate(self.docs):
+                if key is not None:
+                    remap[doc] = len(fresh.docs)
+                    fresh.docs.append(key)
+                    fresh.doc_ids[key] = remap[doc]
+                    fresh.doc_len.append(self.doc_len[doc])
+            fresh.total_len = self.total_len
+            for term, buf in self.postings.items():
+                for doc, positions in _iter_postings(buf):
+                    if remap[doc] >= 0:
+                        fresh._append(term, remap[doc], positions)
+            return fresh
+
+    # --- Querying ---
+    def search(self, query: str, movie_id: Optional[str] = None, limit: int = 20) -> List[Tuple[float, str, str]]:
+        """
+        Rank reviews for `query` with BM25. Quoted parts of the query are
+        phrases that a review must contain word for word.
+        Returns (score, movie_id, review_id) tuples, best first.
+        """
+        phrases = [tokenize(p) for p in _PHRASE_RE.findall(query)]
+        phrases = [p for p in phrases if p]
+        terms = set(tokenize(_PHRASE_RE.sub(" ", query)))
+        for phrase in phrases:
+            terms.update(phrase)
+        if not terms:
+            return []
+
+        with self.lock:
+            n_docs = len(self.doc_ids)
+            if not n_docs:
+                return []
+            avg_len = self.total_len / n_docs
+
+            # doc_id -> {term: positions}
+            matches: Dict[int, Dict[str, List[int]]] = defaultdict(dict)
+            doc_freq: Dict[str, int] = {}
+            for term in terms:
+                buf = self.postings.get(term)
+                if buf is None:
+                    if any(term in phrase for phrase in phrases):
+                        return []  # a required phrase cannot match
+                    continue
+                df = 0
+                for doc, positions in _iter_postings(buf):
+                    key = self.docs[doc]
+                    if key is None:
+                        continue
+                    df += 1
+                    if movie_id is None or key[0] == movie_id:
+                        matches[doc][term] = positions
+                doc_freq[term] = df
+
+            results = []
+            for doc, found in matches.items():
+                if phrases and not all(_has_phrase(found, phrase) for phrase in phrases):
+                    continue
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len[doc] / avg_len)
+                score = 0.0
+                for term, positions in found.items():
+                    df = doc_freq[term]
+                    idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                    tf = len(positions)
+                    score += idf * tf * (BM25_K1 + 1) / (tf + norm)
+                movie, review = self.docs[doc]
+                results.append((score, movie, review))
+
+        results.sort(key=lambda hit: (-hit[0], hit[1], hit[2]))
+        return results[:limit]
+
+    # --- Persistence ---
+    def write_snapshot(self, path: str) -> "SearchIndex":
+        """Write a compacted copy of the index to `path` and return that copy."""
+        snapshot = self.compacted()
+        header = json.dumps({"docs": snapshot.docs, "doc_len": snapshot.doc_len.tolist()})
+        with open(path, "wb") as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(header.encode() + b"\n")
+            for term, buf in snapshot.postings.items():
+                meta = bytearray()
+                encoded = term.encode()
+                _put_varint(meta, len(encoded))
+                meta += encoded
+                _put_varint(meta, snapshot.last_doc[term])
+                _put_varint(meta, len(buf))
+                f.write(meta)
+                f.write(buf)
+        return snapshot
+
+    @classmethod
+    def read_snapshot(cls, path: str) -> "SearchIndex":
+        index = cls()
+        with open(path, "rb") as f:
+            if f.readline() != SNAPSHOT_MAGIC:
+                raise ValueError("Not a review search snapshot")
+            header = json.loads(f.readline())
+            data = f.read()
+
+        index.docs = [tuple(d) for d in header["docs"]]
+        index.doc_ids = {key: doc for doc, key in enumerate(index.docs)}
+        index.doc_len = array("I", header["doc_len"])
+        index.total_len = sum(index.doc_len)
+        pos = 0
+        while pos < len(data):
+            size, pos = _get_varint(data, pos)
+            term = data[pos:pos + size].decode()
+            pos += size
+            index.last_doc[term], pos = _get_varint(data, pos)
+            size, pos = _get_varint(data, pos)
+            index.postings[term] = bytearray(data[pos:pos + size])
+            pos += size
+        return index
+
+
+def _has_phrase(found: Dict[str, List[int]], phrase: List[str]) -> bool:
+    if any(term not in found for term in phrase):
+        return False
+    starts = set(found[phrase[0]])
+    for offset, term in enumerate(phrase[1:], start=1):
+        starts &= {p - offset for p in found[term]}
+        if not starts:
+            return False
+    return True
+
+
+# ────────────────────────────────
+# Module-level index (shared by worker processes)
+# ────────────────────────────────
+def _snapshot_path() -> str:
+    return os.path.join(INDEX_DIR, "index.bin")
+
+
+def _journal_path() -> str:
+    return os.path.join(INDEX_DIR, "journal.ndjson")
+
+
+def _apply(index: SearchIndex, entry: list) -> None:
+    if entry[0] == "add":
+        _, movie_id, review_id, title, text = entry
+        index.add(movie_id, review_id, review_tokens({"title": title, "text": text}))
+    elif entry[0] == "del":
+        index.remove(entry[1], entry[2])
+
+
+def _all_reviews() -> Iterator[Dict]:
+    # Imported here: backend.reviews.utils imports this module for its write hooks
+    from backend.reviews import utils
+    for movie_id in utils.list_movie_ids():
+        yield from utils.load_reviews(movie_id)
+
+
+def _scan() -> SearchIndex:
+    index = SearchIndex()
+    for review in _all_reviews():
+        index.add(review["movie_id"], review["review_id"], review_tokens(review))
+    return index
+
+
+_store = JournaledIndex(
+    "search index", _snapshot_path, _journal_path,
+    empty=SearchIndex,
+    load=SearchIndex.read_snapshot,
+    dump=lambda index, path: index.write_snapshot(path),
+    apply=_apply,
+    scan=_scan,
+    compact_at=lambda: JOURNAL_COMPACT_AT,
+)
+
+
+def get_index() -> SearchIndex:
+    """The index, current with every worker's writes; a missing one is built in the background."""
+    return _store.current()
+
+
+def rebuild() -> int:
+    """Re-index every stored review (scan job). Returns the number indexed."""
+    return len(_store.rebuild())
+
+
+def index_review(review: Dict) -> None:
+    """Add or re-index a review after it was created or edited."""
+    _store.record(["add", review["movie_id"], review["review_id"], review.get("title", ""), review.get("text", "")])
+
+
+def unindex_review(movie_id: str, review_id: str) -> None:
+    _store.record(["del", movie_id, review_id])
+
+
+def search(query: str, movie_id: Optional[str] = None, limit: int = 20) -> List[Tuple[float, str, str]]:
+    return get_index().search(query, movie_id=movie_id, limit=limit)
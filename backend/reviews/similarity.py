@@ -0,0 +1,244 @@
+"""
+similarity.py – Near-duplicate review detection with MinHash and LSH banding.
+
+Every review text is reduced to its set of word 3-gram shingles and signed
+with NUM_PERM min-hashes; the fraction of equal positions in two signatures
+estimates the Jaccard similarity of their shingle sets. Signatures are split
+into BANDS bands of ROWS values and each band is hashed into a bucket, so a
+new review is only compared against reviews sharing at least one bucket
+instead of the whole corpus. With 32 bands of 4 rows, pairs above ~0.6
+similarity almost always share a bucket and pairs below ~0.2 rarely do.
+
+Signatures are kept in memory and persisted under data/indexes/:
+- minhash.json    → snapshot [[movie_id, review_id, base64 signature], ...]
+- minhash.ndjson  → add/del entries applied since the snapshot
+
+add_review / update_review / delete_review in backend.reviews.utils keep it
+current; rebuild() (scripts/sign_reviews.py) signs the whole corpus, one
+movie per worker process. The files are shared by all worker processes
+through journaled.JournaledIndex, which also signs a missing index on a
+background thread; until that finishes only recent reviews are compared.
+"""
+
+import os, json, base64, zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from backend.reviews.journaled import JournaledIndex
+from backend.reviews.search import tokenize
+
+INDEX_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "indexes")
+JOURNAL_COMPACT_AT = 5000
+
+NUM_PERM = 128
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+# Texts shorter than this are too generic ("Great movie!") to call copies
+MIN_TOKENS = 8
+DUPLICATE_THRESHOLD = float(os.getenv("REVIEW_DUPLICATE_THRESHOLD", "0.8"))
+
+# Universal hashing h(x) = (a*x + b) mod p over 32-bit shingle hashes;
+# a, b < 2^31 keep a*x + b inside uint64.
+_PRIME = np.uint64((1 << 61) - 1)
+_rng = np.random.default_rng(20240101)
+_A = _rng.integers(1, 1 << 31, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, 1 << 31, size=NUM_PERM, dtype=np.uint64)
+
+Key = Tuple[str, str]  # (movie_id, review_id)
+
+
+def signature(text: str) -> Optional[np.ndarray]:
+    """MinHash signature (NUM_PERM uint32 values) of a text, or None if it is too short."""
+    tokens = tokenize(text)
+    if len(tokens) < MIN_TOKENS:
+        return None
+    shingles = {" ".join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+    hashes = np.fromiter((zlib.crc32(s.encode()) for s in shingles), dtype=np.uint64, count=len(shingles))
+    permuted = (_A[:, None] * hashes[None, :] + _B[:, None]) % _PRIME
+    return (permuted.min(axis=1) & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+def _bands(sig: np.ndarray) -> List[Tuple[int, bytes]]:
+    return [(band, sig[band * ROWS:(band + 1) * ROWS].tobytes()) for band in range(BANDS)]
+
+
+def _encode(sig: np.ndarray) -> str:
+    return base64.b64encode(sig.astype("<u4").tobytes()).decode()
+
+
+def _decode(data: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(data), dtype="<u4").astype(np.uint32)
+
+
+class MinHashIndex:
+    def __init__(self):
+        self.signatures: Dict[Key, np.ndarray] = {}
+        self.buckets: Dict[Tuple[int, bytes], Set[Key]] = {}
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def add(self, key: Key, sig: np.ndarray) -> None:
+        self.remove(key)
+        self.signatures[key] = sig
+        for band in _bands(sig):
+            self.buckets.setdefault(band, set()).add(key)
+
+    def remove(self, key: Key) -> bool:
+        sig = self.signatures.pop(key, None)
+        if sig is None:
+            return False
+        for band in _bands(sig):
+            bucket = self.buckets.get(band)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self.buckets[band]
+        return True
+
+    def near_duplicates(self, sig: np.ndarray, threshold: float, exclude: Optional[Key] = None) -> List[Tuple[float, str, str]]:
+        """(similarity, movie_id, review_id) of indexed reviews at or above `threshold`, most similar first."""
+        candidates: Set[Key] = set()
+        for band in _bands(sig):
+            candidates |= self.buckets.get(band, set())
+        candidates.discard(exclude)
+        matches = []
+        for key in candidates:
+            score = similarity(sig, self.signatures[key])
+            if score >= threshold:
+                matches.append((score, key[0], key[1]))
+        matches.sort(key=lambda m: (-m[0], m[1], m[2]))
+        return matches
+
+    def to_json(self) -> List[List[str]]:
+        return [[movie_id, review_id, _encode(sig)] for (movie_id, review_id), sig in self.signatures.items()]
+
+    @classmethod
+    def from_json(cls, data: List[List[str]]) -> "MinHashIndex":
+        index = cls()
+        for movie_id, review_id, encoded in data:
+            index.add((movie_id, review_id), _decode(encoded))
+        return index
+
+
+# ────────────────────────────────
+# Module-level index (shared by worker processes)
+# ────────────────────────────────
+def _snapshot_path() -> str:
+    return os.path.join(INDEX_DIR, "minhash.json")
+
+
+def _journal_path() -> str:
+    return os.path.join(INDEX_DIR, "minhash.ndjson")
+
+
+def _load(path: str) -> MinHashIndex:
+    with open(path, "r") as f:
+        return MinHashIndex.from_json(json.load(f))
+
+
+def _dump(index: MinHashIndex, path: str) -> MinHashIndex:
+    with open(path, "w") as f:
+        json.dump(index.to_json(), f)
+    return index
+
+
+def _apply(index: MinHashIndex, entry: list) -> None:
+    if entry[0] == "add":
+        index.add((entry[1], entry[2]), _decode(entry[3]))
+    else:
+        index.remove((entry[1], entry[2]))
+
+
+def sign_movie(movie_id: str) -> List[List[str]]:
+    """Snapshot entries for one movie's reviews (runs in batch worker processes)."""
+    # Imported here: backend.reviews.utils imports this module for its write hooks
+    from backend.reviews import utils
+    entries = []
+    for review in utils.iter_reviews(movie_id):
+        sig = signature(review.get("text", ""))
+        if sig is not None:
+            entries.append([review["movie_id"], review["review_id"], _encode(sig)])
+    return entries
+
+
+def _sign(movie_ids: Iterable[str], workers: Optional[int] = None) -> MinHashIndex:
+    """Index every review of `movie_ids`, one movie per worker process unless workers == 1."""
+    index = MinHashIndex()
+    movie_ids = list(movie_ids)
+
+    def collect(results: Iterable[List[List[str]]]) -> None:
+        for entries in results:
+            for movie_id, review_id, encoded in entries:
+                index.add((movie_id, review_id), _decode(encoded))
+
+    if workers == 1 or len(movie_ids) < 2:
+        collect(map(sign_movie, movie_ids))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            collect(executor.map(sign_movie, movie_ids, chunksize=4))
+    return index
+
+
+def _all_movie_ids() -> List[str]:
+    from backend.reviews import utils
+    return utils.list_movie_ids()
+
+
+def _scan() -> MinHashIndex:
+    # Background builds share the process with requests: sign in this thread only
+    return _sign(_all_movie_ids(), workers=1)
+
+
+_store = JournaledIndex(
+    "MinHash index", _snapshot_path, _journal_path,
+    empty=MinHashIndex,
+    load=_load,
+    dump=_dump,
+    apply=_apply,
+    scan=_scan,
+    compact_at=lambda: JOURNAL_COMPACT_AT,
+)
+
+
+def get_index() -> MinHashIndex:
+    """The index, current with every worker's writes; a missing one is signed in the background."""
+    return _store.current()
+
+
+def rebuild(workers: Optional[int] = None) -> int:
+    """Re-sign every stored review, one movie per worker process (batch job)."""
+    return len(_store.rebuild(lambda: _sign(_all_movie_ids(), workers)))
+
+
+def check_and_record(review: Dict, threshold: Optional[float] = None) -> List[Tuple[float, str, str]]:
+    """
+    Sign a new or edited review, return the existing reviews it nearly
+    duplicates (most similar first), then index it.
+    """
+    threshold = DUPLICATE_THRESHOLD if threshold is None else threshold
+    key = (review["movie_id"], review["review_id"])
+    sig = signature(review.get("text", ""))
+    with _store.locked():
+        index = _store.current()
+        if sig is None:
+            if key in index.signatures:
+                _store.record(["del", key[0], key[1]])
+            return []
+        matches = index.near_duplicates(sig, threshold, exclude=key)
+        _store.record(["add", key[0], key[1], _encode(sig)])
+    return matches
+
+
+def forget_review(movie_id: str, review_id: str) -> None:
+    with _store.locked():
+        if (movie_id, review_id) in _store.current().signatures:
+            _store.record(["del", movie_id, review_id])
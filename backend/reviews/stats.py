@@ -0,0 +1,51 @@
+"""
+stats.py – Per-movie review statistics computed with NumPy over column records.
+
+compute() takes the structured array from columns.py (memory-mapped sidecar,
+or records built in memory when there is none) and never touches review text.
+"""
+
+from typing import Dict
+
+import numpy as np
+
+HELPFUL_QUANTILES = {"p25": 0.25, "p50": 0.5, "p75": 0.75, "p90": 0.9}
+
+# Ordinal of 1970-01-01: column dates are proleptic Gregorian ordinals
+_EPOCH_ORDINAL = 719163
+
+
+def _round(value) -> float:
+    return round(float(value), 4)
+
+
+def compute(records: np.ndarray) -> Dict:
+    """Count, mean/median/std of ratings, 1–10 histogram, helpful-ratio quantiles, reviews per month."""
+    ratings = records["rating"].astype(np.int64)
+    count = int(len(ratings))
+    in_range = ratings[(ratings >= 1) & (ratings <= 10)]
+    histogram = np.bincount(in_range, minlength=11)[1:]
+
+    total_votes = records["total_votes"]
+    voted = total_votes > 0
+    ratios = records["helpful"][voted] / total_votes[voted]
+    quantiles = {name: None for name in HELPFUL_QUANTILES}
+    if len(ratios):
+        values = np.quantile(np.clip(ratios, 0.0, 1.0), list(HELPFUL_QUANTILES.values()))
+        quantiles = {name: _round(v) for name, v in zip(HELPFUL_QUANTILES, values)}
+
+    dates = records["date"][records["date"] > 0].astype(np.int64)
+    months = (dates - _EPOCH_ORDINAL).astype("datetime64[D]").astype("datetime64[M]")
+    month_values, month_counts = np.unique(months, return_counts=True)
+
+    return {
+        "count": count,
+        "mean": _round(ratings.mean()) if count else None,
+        "median": _round(np.median(ratings)) if count else None,
+        "std_dev": _round(ratings.std()) if count else None,
+        "histogram": {rating: int(n) for rating, n in enumerate(histogram, start=1)},
+        "helpful_ratio_quantiles": quantiles,
+        "reviews_per_month": [
+            {"month": str(month), "count": int(n)} for month, n in zip(month_values, month_counts)
+        ],
+    }
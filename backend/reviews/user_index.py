@@ -0,0 +1,139 @@
+"""
+user_index.py – Global user_id → [(movie_id, review_id)] index.
+
+Answers "which reviews did this user write?" without opening any review
+file.
+
+Persisted under data/indexes/:
+- user_reviews.json    → snapshot {user_id: [[movie_id, review_id], ...]}
+- user_reviews.ndjson  → add/del entries applied since the snapshot
+
+add_review / delete_review in backend.reviews.utils keep it current; rebuild()
+(scripts/rebuild_user_review_index.py) regenerates it by scanning every review
+file. The files are shared by all worker processes through
+journaled.JournaledIndex. Without a snapshot the index starts from the journal
+and the corpus is scanned on a background thread, so reviews_of() only lists
+recent reviews until that finishes.
+"""
+
+import os, json
+from typing import Dict, Iterable, List, Tuple
+
+from backend.reviews.journaled import JournaledIndex
+
+INDEX_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "indexes")
+JOURNAL_COMPACT_AT = 5000
+
+
+class UserReviewIndex:
+    def __init__(self):
+        # user_id -> {(movie_id, review_id): None}, an insertion-ordered set
+        self.by_user: Dict[str, Dict[Tuple[str, str], None]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self.by_user.values())
+
+    def add(self, user_id: str, movie_id: str, review_id: str) -> None:
+        self.by_user.setdefault(user_id, {})[(movie_id, review_id)] = None
+
+    def remove(self, user_id: str, movie_id: str, review_id: str) -> bool:
+        entries = self.by_user.get(user_id, {})
+        if (movie_id, review_id) not in entries:
+            return False
+        del entries[(movie_id, review_id)]
+        if not entries:
+            del self.by_user[user_id]
+        return True
+
+    def reviews_of(self, user_id: str) -> List[Tuple[str, str]]:
+        return list(self.by_user.get(user_id, ()))
+
+    def to_json(self) -> Dict[str, List[List[str]]]:
+        return {user_id: [list(e) for e in entries] for user_id, entries in self.by_user.items()}
+
+    @classmethod
+    def from_json(cls, data: Dict[str, List[List[str]]]) -> "UserReviewIndex":
+        index = cls()
+        for user_id, entries in data.items():
+            for movie_id, review_id in entries:
+                index.add(user_id, movie_id, review_id)
+        return index
+
+
+# ────────────────────────────────
+# Module-level index (shared by worker processes)
+# ────────────────────────────────
+def _snapshot_path() -> str:
+    return os.path.join(INDEX_DIR, "user_reviews.json")
+
+
+def _journal_path() -> str:
+    return os.path.join(INDEX_DIR, "user_reviews.ndjson")
+
+
+def _load(path: str) -> UserReviewIndex:
+    with open(path, "r") as f:
+        return UserReviewIndex.from_json(json.load(f))
+
+
+def _dump(index: UserReviewIndex, path: str) -> UserReviewIndex:
+    with open(path, "w") as f:
+        json.dump(index.to_json(), f)
+    return index
+
+
+def _apply(index: UserReviewIndex, entry: list) -> None:
+    op, user_id, movie_id, review_id = entry
+    if op == "add":
+        index.add(user_id, movie_id, review_id)
+    else:
+        index.remove(user_id, movie_id, review_id)
+
+
+def _all_reviews() -> Iterable[Dict]:
+    # Imported here: backend.reviews.utils imports this module for its write hooks
+    from backend.reviews import utils
+    for movie_id in utils.list_movie_ids():
+        yield from utils.load_reviews(movie_id)
+
+
+def _scan() -> UserReviewIndex:
+    index = UserReviewIndex()
+    for review in _all_reviews():
+        index.add(review["user_id"], review["movie_id"], review["review_id"])
+    return index
+
+
+_store = JournaledIndex(
+    "user review index", _snapshot_path, _journal_path,
+    empty=UserReviewIndex,
+    load=_load,
+    dump=_dump,
+    apply=_apply,
+    scan=_scan,
+    compact_at=lambda: JOURNAL_COMPACT_AT,
+)
+
+
+def get_index() -> UserReviewIndex:
+    """The index, current with every worker's writes; a missing one is built in the background."""
+    return _store.current()
+
+
+def rebuild() -> int:
+    """Regenerate the index from every stored review (scan job)."""
+    return len(_store.rebuild())
+
+
+def record_review(review: Dict) -> None:
+    _store.record(["add", review["user_id"], review["movie_id"], review["review_id"]])
+
+
+def forget_review(review: Dict) -> None:
+    _store.record(["del", review["user_id"], review["movie_id"], review["review_id"]])
+
+
+def reviews_of(user_id: str) -> List[Tuple[str, str]]:
+    """(movie_id, review_id) pairs written by a user, oldest first."""
+    with _store.locked():
+        return _store.current().reviews_of(user_id)
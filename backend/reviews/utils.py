@@ -1,131 +1,526 @@
-import os, json, tempfile, shutil
-from typing import List, Dict, Optional
+import os, json, random, tempfile, shutil, zlib
+from collections import OrderedDict
+from itertools import chain
+from typing import Callable, List, Dict, Iterator, Optional, Tuple
 from datetime import datetime
-from backend.reviews import schemas
+import numpy as np
+from pydantic import ValidationError
+from backend.reviews import schemas, search, user_index, chunks, reader, codec, columns, stats, similarity
+from backend.reviews.index import ReviewCollection, SORT_KEYS, decode_cursor, encode_cursor
 from backend.authentication.utils import _convert_datetime_to_string, load_active_users, save_active_users
+from backend.reports import utils as report_utils, schemas as report_schemas
+from backend.movies import utils as movie_utils
 
 # Base directory for review JSON files
 BASE_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "reviews")
 
+# Movies with more reviews than this are stored in chunks (see chunks.py)
+CHUNK_THRESHOLD = int(os.getenv("REVIEW_CHUNK_THRESHOLD", "1000"))
+
+# Number of movies whose reviews (and sorted indexes) are kept in memory
+MAX_CACHED_MOVIES = int(os.getenv("REVIEW_CACHE_MOVIES", "32"))
+_collections: "OrderedDict[str, ReviewCollection]" = OrderedDict()
+
+# reporter_id on reports filed automatically (near-duplicate detection)
+SYSTEM_REPORTER_ID = "system"
+
+# Number of movies whose statistics are kept in memory (small dicts, so many more than collections)
+MAX_CACHED_STATS = int(os.getenv("REVIEW_STATS_CACHE_MOVIES", "1024"))
+# movie_id -> (storage stamp, statistics); see review_stats()
+_stats_cache: "OrderedDict[str, Tuple]" = OrderedDict()
+
 
 def _get_review_path(movie_id: str) -> str:
     os.makedirs(BASE_DIR, exist_ok=True)
     return os.path.join(BASE_DIR, f"{movie_id}_reviews.json")
 
 
+def _get_meta_path(movie_id: str) -> str:
+    return os.path.join(BASE_DIR, f"{movie_id}_reviews.meta.json")
+
+
+def _get_columns_path(movie_id: str) -> str:
+    return os.path.join(BASE_DIR, f"{movie_id}_reviews.cols")
+
+
+def _get_chunk_dir(movie_id: str) -> str:
+    return os.path.join(BASE_DIR, movie_id)
+
+
+def is_chunked(movie_id: str) -> bool:
+    return chunks.is_chunked(_get_chunk_dir(movie_id))
+
+
+def list_movie_ids() -> List[str]:
+    """Ids of all movies that have review storage (single file or chunked), in sorted order."""
+    if not os.path.isdir(BASE_DIR):
+        return []
+    suffix = "_reviews.json"
+    ids = set()
+    for name in os.listdir(BASE_DIR):
+        if name.endswith(suffix):
+            ids.add(name[:-len(suffix)])
+        elif chunks.is_chunked(os.path.join(BASE_DIR, name)):
+            ids.add(name)
+    return sorted(ids)
+
+
 def load_reviews(movie_id: str) -> List[Dict]:
+    if is_chunked(movie_id):
+        return chunks.load_all(_get_chunk_dir(movie_id))
+
     path = _get_review_path(movie_id)
     if not os.path.exists(path):
         return []
 
     try:
-        with open(path, "r") as f:
-            content = f.read().strip()
-            if not content:
-                return []
-            return json.loads(content)
-    except json.JSONDecodeError:
+        content = codec.read(path).strip()
+        if not content:
+            return []
+        return json.loads(content)
+    except codec.DECODE_ERRORS:
         print(f"[WARNING] Corrupted review file for movie {movie_id}. Resetting...")
         with open(path, "w") as f:
             json.dump([], f)
         return []
 
 
+def iter_reviews(movie_id: str) -> Iterator[Dict]:
+    """Yield a movie's stored reviews without loading them all (one chunk or read buffer at a time)."""
+    if is_chunked(movie_id):
+        yield from chunks.iter_reviews(_get_chunk_dir(movie_id))
+    elif os.path.exists(_get_review_path(movie_id)):
+        yield from reader.iter_json_array(_get_review_path(movie_id))
+
+
+def _file_stamp(path: str) -> Optional[List[int]]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def is_date_ordered(movie_id: str) -> bool:
+    """True if the single review file is known to be stored newest first (see save_reviews)."""
+    try:
+        with open(_get_meta_path(movie_id), "r") as f:
+            meta = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return False
+    return meta.get("order") == "date_desc" and meta.get("stamp") == _file_stamp(_get_review_path(movie_id))
+
+
 def save_reviews(movie_id: str, reviews: List[Dict]) -> None:
-    """Safely write reviews to disk (atomic write)."""
+    """
+    Safely write reviews to disk (atomic write).
+    Movies already chunked, or growing past CHUNK_THRESHOLD, use the chunked layout.
+    Single files are written newest first, and a small meta file records that
+    order so date pages can stop reading early.
+    Files are encoded with the configured REVIEW_STORAGE_CODEC (see codec.py).
+    Both layouts refresh the numeric column sidecar (see columns.py).
+    """
     path = _get_review_path(movie_id)
+    reviews = _convert_datetime_to_string(reviews)
+    if is_chunked(movie_id) or len(reviews) > CHUNK_THRESHOLD:
+        _save_chunked(movie_id, reviews)
+        return
+
+    date_key = SORT_KEYS["date"]
+    ordered = sorted(reviews, key=lambda r: (date_key(r), r["review_id"]), reverse=True)
+    data, spans = codec.encode(ordered)
     tmp_fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
     os.close(tmp_fd)
 
     try:
-        with open(tmp_path, "w") as f:
-            json.dump(_convert_datetime_to_string(reviews), f, indent=2)
+        with open(tmp_path, "wb") as f:
+            f.write(data)
         shutil.move(tmp_path, path)
     finally:
         if os.path.exists(tmp_path):
             os.remove(tmp_path)
 
+    stamp = _file_stamp(path)
+    with open(_get_meta_path(movie_id), "w") as f:
+        json.dump({"order": "date_desc", "stamp": stamp}, f)
+    placements = [(review, 0, offset, length) for review, (offset, length) in zip(ordered, spans)]
+    columns.write(_get_columns_path(movie_id), placements, stamp)
+
+
+def _save_chunked(movie_id: str, reviews: List[Dict]) -> None:
+    chunk_dir = _get_chunk_dir(movie_id)
+    placements = chunks.save(chunk_dir, reviews)
+    for stale in (_get_review_path(movie_id), _get_meta_path(movie_id)):
+        if os.path.exists(stale):
+            os.remove(stale)
+    columns.write(_get_columns_path(movie_id), placements, _file_stamp(chunks.manifest_path(chunk_dir)))
+
+
+def convert_to_chunks(movie_id: str) -> bool:
+    """Move a single-file movie to the chunked layout. Returns False if already chunked."""
+    if is_chunked(movie_id):
+        return False
+    _save_chunked(movie_id, load_reviews(movie_id))
+    _collections.pop(movie_id, None)
+    return True
+
+
+def _store_stamp(movie_id: str):
+    """Cheap version stamp of a movie's review storage (None if missing)."""
+    path = chunks.manifest_path(_get_chunk_dir(movie_id))
+    if not os.path.exists(path):
+        path = _get_review_path(movie_id)
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return path, st.st_mtime_ns, st.st_size
+
+
+def get_columns(movie_id: str):
+    """Memory-mapped numeric columns of a movie (None if missing or out of date)."""
+    stamp = _store_stamp(movie_id)
+    return columns.open_columns(_get_columns_path(movie_id), stamp and stamp[1:])
+
+
+def _column_file_resolver(movie_id: str):
+    """Map a column record's chunk number to the file holding the review."""
+    if not is_chunked(movie_id):
+        path = _get_review_path(movie_id)
+        return lambda number: path
+    chunk_dir = _get_chunk_dir(movie_id)
+    manifest = chunks.load_manifest(chunk_dir)
+    return lambda number: os.path.join(chunk_dir, manifest["chunks"][number]["file"])
+
+
+def _cached_collection(movie_id: str) -> Optional[ReviewCollection]:
+    """The in-memory collection, only if it is still current with storage."""
+    collection = _collections.get(movie_id)
+    if collection is not None and collection.stamp == _store_stamp(movie_id):
+        return collection
+    return None
+
+
+def get_collection(movie_id: str) -> ReviewCollection:
+    """Return the cached review collection for a movie, reloading it if the file changed."""
+    stamp = _store_stamp(movie_id)
+    collection = _collections.get(movie_id)
+    if collection is None or collection.stamp != stamp:
+        collection = ReviewCollection(movie_id, load_reviews(movie_id), stamp)
+    _remember(_collections, movie_id, collection, MAX_CACHED_MOVIES)
+    return collection
+
+
+def _remember(cache: OrderedDict, movie_id: str, value, limit: int) -> None:
+    """Store `value` as the most recently used entry, evicting the least recently used past `limit`."""
+    cache[movie_id] = value
+    cache.move_to_end(movie_id)
+    while len(cache) > limit:
+        cache.popitem(last=False)
+
+
+def _persist(collection: ReviewCollection) -> None:
+    """Write a collection back to disk and remember the new storage version."""
+    save_reviews(collection.movie_id, collection.reviews)
+    collection.stamp = _store_stamp(collection.movie_id)
+
 
 def user_already_reviewed(movie_id: str, user_id: str) -> bool:
-    """Return True if user already reviewed this movie (using movies_reviewed list)."""
-    users = load_active_users()
-    for user in users:
-        if user["user_id"] == user_id:
-            return movie_id in user.get("movies_reviewed", [])
-    return False
+    """Return True if user already reviewed this movie (checked against the movie's own reviews)."""
+    return get_collection(movie_id).has_reviewer(user_id)
 
 
 def add_review(movie_id: str, review_data: schemas.ReviewCreate, user_id: str) -> schemas.Review:
-    reviews = load_reviews(movie_id)
+    collection = get_collection(movie_id)
+
+    with collection.lock:
+        # Restrict one review per user per movie
+        if collection.has_reviewer(user_id):
+            raise ValueError("User already has a review for this movie.")
 
-    # Restrict one review per user per movie
-    if any(r["user_id"] == user_id for r in reviews):
-        raise ValueError("User already has a review for this movie.")
+        new_review = schemas.Review(
+            movie_id=movie_id,
+            user_id=user_id,
+            title=review_data.title,
+            rating=review_data.rating,
+            text=review_data.text,
+        ).dict()
 
-    new_review = schemas.Review(
-        movie_id=movie_id,
-        user_id=user_id,
-        title=review_data.title,
-        rating=review_data.rating,
-        text=review_data.text,
-    ).dict()
+        # ✅ Save the review
+        collection.add(new_review)
+        _persist(collection)
+        user_index.record_review(new_review)
+    search.index_review(new_review)
+    _check_near_duplicates(new_review)
+
+    _record_movies_reviewed([(user_id, movie_id)])
+    return new_review
 
-    # ✅ Save the review
-    reviews.append(new_review)
-    save_reviews(movie_id, reviews)
 
-    # ✅ Update user's movies_reviewed (store movie_id, not review_id)
+def _record_movies_reviewed(pairs: List[Tuple[str, str]]) -> None:
+    """✅ Update users' movies_reviewed (store movie_id, not review_id) in one users file write."""
+    by_user: Dict[str, List[str]] = {}
+    for user_id, movie_id in pairs:
+        by_user.setdefault(user_id, []).append(movie_id)
     users = load_active_users()
     for user in users:
-        if user["user_id"] == user_id:
+        for movie_id in by_user.get(user["user_id"], ()):
             user.setdefault("movies_reviewed", [])
             if movie_id not in user["movies_reviewed"]:
                 user["movies_reviewed"].append(movie_id)
-            break
     save_active_users(users)
 
-    return new_review
+
+def _row_error(line: int, error: str) -> Dict:
+    return {"line": line, "error": error}
+
+
+def _validation_message(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors())
+
+
+def import_reviews_batch(lines: List[Tuple[int, str]]) -> Dict:
+    """
+    Import one batch of NDJSON review rows given as (line number, text).
+    Rows are validated first, then grouped by movie: each movie gets a single
+    store write and the users file a single write for the whole batch.
+    Returns {"imported": count, "errors": [{"line", "error"}, ...]}.
+    """
+    errors, by_movie = [], {}
+    for line, text in lines:
+        try:
+            row = schemas.ReviewImport(**json.loads(text))
+        except json.JSONDecodeError as e:
+            errors.append(_row_error(line, f"Invalid JSON: {e.msg}"))
+            continue
+        except TypeError:
+            errors.append(_row_error(line, "Row must be a JSON object."))
+            continue
+        except ValidationError as e:
+            errors.append(_row_error(line, _validation_message(e)))
+            continue
+        by_movie.setdefault(row.movie_id, []).append((line, row))
+
+    imported = []
+    for movie_id, rows in by_movie.items():
+        if not movie_utils.movie_exists(movie_id):
+            errors.extend(_row_error(line, "Movie not found.") for line, _ in rows)
+            continue
+        collection = get_collection(movie_id)
+        with collection.lock:
+            added = []
+            for line, row in rows:
+                if collection.has_reviewer(row.user_id):
+                    errors.append(_row_error(line, "User already has a review for this movie."))
+                    continue
+                fields = row.dict(exclude_none=True)
+                if "date" in fields:
+                    fields["date"] = fields["date"].isoformat()
+                review = schemas.Review(**fields).dict()
+                if review["review_id"] in collection.by_id:
+                    errors.append(_row_error(line, "Duplicate review_id."))
+                    continue
+                collection.add(review)
+                added.append(review)
+            if added:
+                _persist(collection)
+                for review in added:
+                    user_index.record_review(review)
+        imported.extend(added)
+
+    for review in imported:
+        search.index_review(review)
+        _check_near_duplicates(review)
+    if imported:
+        _record_movies_reviewed([(r["user_id"], r["movie_id"]) for r in imported])
+    errors.sort(key=lambda e: e["line"])
+    return {"imported": len(imported), "errors": errors}
+
+
+def _check_near_duplicates(review: Dict) -> None:
+    """🚩 Index the review's MinHash signature and report it if it copies an existing review."""
+    matches = similarity.check_and_record(review)
+    if not matches:
+        return
+    score, movie_id, review_id = matches[0]
+    report_utils.create_report(
+        reporter_id=SYSTEM_REPORTER_ID,
+        reported_id=review["review_id"],
+        type=report_schemas.ReportType.review,
+        reason=f"Possible duplicate/spam: {score:.0%} similar to review {review_id} (movie {movie_id}).",
+    )
 
 
 def get_review(movie_id: str, review_id: str) -> Optional[Dict]:
-    reviews = load_reviews(movie_id)
-    for r in reviews:
-        if r["review_id"] == review_id:
-            return r
-    return None
+    collection = _cached_collection(movie_id)
+    if collection is None:
+        # Cold read: id map + one chunk, or parse the file only up to the review
+        try:
+            if is_chunked(movie_id):
+                return chunks.find(_get_chunk_dir(movie_id), review_id)
+            return next((r for r in iter_reviews(movie_id) if r["review_id"] == review_id), None)
+        except (OSError, KeyError, IndexError, *codec.DECODE_ERRORS):
+            pass  # rewritten while reading, or corrupted: the full load below reports and resets it
+    return get_collection(movie_id).by_id.get(review_id)
 
 
 def update_review(movie_id: str, review_id: str, updates: schemas.ReviewUpdate) -> Optional[Dict]:
-    reviews = load_reviews(movie_id)
-    for review in reviews:
-        if review["review_id"] == review_id:
-            for key, value in updates.dict(exclude_unset=True).items():
-                review[key] = value
-            review["date"] = datetime.utcnow().date().isoformat()
-            save_reviews(movie_id, reviews)
-            return review
-    return None
+    changes = updates.dict(exclude_unset=True)
+
+    def apply(review: Dict) -> None:
+        review.update(changes)
+        review["date"] = datetime.utcnow().date().isoformat()
+
+    collection = get_collection(movie_id)
+    with collection.lock:
+        review = collection.modify(review_id, apply)
+        if review is not None:
+            _persist(collection)
+    if review is not None and {"title", "text"} & changes.keys():
+        search.index_review(review)
+    if review is not None and "text" in changes:
+        _check_near_duplicates(review)
+    return review
 
 
 def delete_review(movie_id: str, review_id: str) -> bool:
-    reviews = load_reviews(movie_id)
-    updated = [r for r in reviews if r["review_id"] != review_id]
-    if len(updated) == len(reviews):
-        return False
-    save_reviews(movie_id, updated)
+    collection = get_collection(movie_id)
+    with collection.lock:
+        removed = collection.remove(review_id)
+        if removed is None:
+            return False
+        _persist(collection)
+        user_index.forget_review(removed)
+    search.unindex_review(movie_id, review_id)
+    similarity.forget_review(movie_id, review_id)
     return True
 
 
 def add_vote(movie_id: str, review_id: str, vote: schemas.Vote) -> Optional[Dict]:
-    reviews = load_reviews(movie_id)
-    for review in reviews:
-        if review["review_id"] == review_id:
-            review["usefulness"]["total_votes"] += 1
-            if vote.vote:
-                review["usefulness"]["helpful"] += 1
-            save_reviews(movie_id, reviews)
-            return review
-    return None
+    def apply(review: Dict) -> None:
+        review["usefulness"]["total_votes"] += 1
+        if vote.vote:
+            review["usefulness"]["helpful"] += 1
+
+    collection = get_collection(movie_id)
+    with collection.lock:
+        review = collection.modify(review_id, apply)
+        if review is not None:
+            _persist(collection)
+    return review
+
+
+def add_votes(votes: List[schemas.BatchVote]) -> List[Dict]:
+    """
+    Apply many votes, grouped per movie so each movie is written once.
+    Returns one result per vote, in input order.
+    """
+    results: List[Optional[Dict]] = [None] * len(votes)
+    by_movie: Dict[str, List[int]] = {}
+    for i, vote in enumerate(votes):
+        by_movie.setdefault(vote.movie_id, []).append(i)
+
+    for movie_id, positions in by_movie.items():
+        if _store_stamp(movie_id) is None:
+            # No reviews stored: don't let unknown ids load empty collections into the cache
+            for i in positions:
+                results[i] = {"movie_id": movie_id, "review_id": votes[i].review_id, "ok": False, "error": "Movie not found"}
+            continue
+        collection = get_collection(movie_id)
+        with collection.lock:
+            changed = False
+            for i in positions:
+                vote = votes[i]
+
+                def apply(review: Dict) -> None:
+                    review["usefulness"]["total_votes"] += 1
+                    if vote.vote:
+                        review["usefulness"]["helpful"] += 1
+
+                review = collection.modify(vote.review_id, apply)
+                result = {"movie_id": movie_id, "review_id": vote.review_id, "ok": review is not None}
+                if review is None:
+                    result["error"] = "Review not found"
+                else:
+                    result["usefulness"] = dict(review["usefulness"])
+                    changed = True
+                results[i] = result
+            if changed:
+                _persist(collection)
+    return results
+
+
+def get_user_reviews(user_id: str, skip: int = 0, limit: int = 20) -> Tuple[int, List[Dict]]:
+    """Return (total, page) of a user's reviews, most recently written first."""
+    entries = user_index.reviews_of(user_id)
+    entries.reverse()
+    page = []
+    for movie_id, review_id in entries[skip: skip + limit]:
+        review = get_review(movie_id, review_id)
+        if review is not None:
+            page.append(review)
+    return len(entries), page
+
+
+def search_reviews(query: str, movie_id: Optional[str] = None, limit: int = 20) -> List[Dict]:
+    """Full-text search; returns the matching reviews best first, each with its `score`."""
+    results = []
+    for score, hit_movie_id, review_id in search.search(query, movie_id=movie_id, limit=limit):
+        review = get_review(hit_movie_id, review_id)
+        if review is not None:
+            results.append({**review, "score": score})
+    return results
+
+
+def review_stats(movie_id: str) -> Dict:
+    """
+    Rating and usefulness statistics for a movie, computed over the numeric
+    columns only. Cached per storage version: repeat calls are free until the
+    next write to the movie.
+    """
+    def records():
+        found = get_columns(movie_id)
+        if found is None:
+            found = columns.build([(r, 0, 0, 0) for r in iter_reviews(movie_id)], strict=False)
+        return found
+    return _cached_stats(movie_id, _store_stamp(movie_id), records)
+
+
+def _cached_stats(movie_id: str, stamp, records: Callable[[], np.ndarray]) -> Dict:
+    cached = _stats_cache.get(movie_id)
+    if cached is not None and cached[0] == stamp:
+        _stats_cache.move_to_end(movie_id)
+        return cached[1]
+    result = {"movie_id": movie_id, **stats.compute(records())}
+    _remember(_stats_cache, movie_id, (stamp, result), MAX_CACHED_STATS)
+    return result
+
+
+def review_overview(movie_id: str, sort_by: str = "date", order: str = "desc", limit: int = 20) -> Tuple[Dict, List[Dict]]:
+    """
+    (stats, first page) for a movie from a single store access: the column
+    sidecar serves both when the movie isn't cached, otherwise the cached
+    collection does.
+    """
+    if sort_by not in SORT_KEYS:
+        raise ValueError(f"Invalid sort_by. Must be one of: {', '.join(SORT_KEYS)}.")
+    if _cached_collection(movie_id) is None:
+        stamp = _store_stamp(movie_id)
+        records = get_columns(movie_id)
+        if records is not None:
+            page = _date_page(movie_id, order, 0, limit, None) if sort_by == "date" else None
+            if page is None:
+                page = _column_page(movie_id, sort_by, order, None, 0, limit, None)
+            if page is not None and _store_stamp(movie_id) == stamp:
+                return _cached_stats(movie_id, stamp, lambda: records), page
+
+    collection = get_collection(movie_id)
+    with collection.lock:
+        summary = _cached_stats(
+            movie_id, collection.stamp,
+            lambda: columns.build([(r, 0, 0, 0) for r in collection.reviews], strict=False),
+        )
+        return summary, collection.page(sort_by, order, limit=limit)
 
 
 def filter_sort_reviews(
@@ -135,21 +530,205 @@ def filter_sort_reviews(
     order: str = "desc",
     skip: int = 0,
     limit: int = 20,
+    cursor: Optional[str] = None,
 ) -> List[Dict]:
-    """Filter, sort, and paginate reviews for a given movie."""
-    reviews = load_reviews(movie_id)
-
-    # Filter by rating
-    if rating is not None:
-        reviews = [r for r in reviews if r.get("rating") == rating]
-
-    # Sorting
-    reverse = order.lower() == "desc"
-    if sort_by in {"date", "rating"}:
-        reviews.sort(key=lambda r: r.get(sort_by), reverse=reverse)
-    elif sort_by == "helpful":
-        reviews.sort(key=lambda r: r["usefulness"]["helpful"], reverse=reverse)
-    elif sort_by == "total_votes":
-        reviews.sort(key=lambda r: r["usefulness"]["total_votes"], reverse=reverse)
-
-    return reviews[skip: skip + limit]
+    """
+    Filter, sort, and paginate reviews for a given movie.
+    Pages are read from the collection's sorted index; `cursor` (from a previous
+    page) resumes right after that page's last row, `skip` is applied on top.
+    Pages of movies that are not cached avoid a full load: unfiltered date
+    pages of chunked movies read only the chunks holding their rows, newest-first
+    pages of date-ordered single files stop parsing after the last row, and any
+    other page is sorted over the memory-mapped columns and reads only the
+    reviews it returns.
+    """
+    if sort_by not in SORT_KEYS:
+        raise ValueError(f"Invalid sort_by. Must be one of: {', '.join(SORT_KEYS)}.")
+    after = decode_cursor(cursor, sort_by) if cursor else None
+
+    if _cached_collection(movie_id) is None:
+        page = _date_page(movie_id, order, skip, limit, after) if sort_by == "date" and rating is None else None
+        if page is None:
+            page = _column_page(movie_id, sort_by, order, rating, skip, limit, after)
+        if page is not None:
+            return page
+    return get_collection(movie_id).page(sort_by, order, rating, skip, limit, after)
+
+
+def _date_page(movie_id: str, order: str, skip: int, limit: int, after) -> Optional[List[Dict]]:
+    """
+    Unfiltered date page read without a full load, or None if the storage
+    layout has no shortcut or storage changed while reading.
+    """
+    stamp = _store_stamp(movie_id)
+    try:
+        if is_chunked(movie_id):
+            page = chunks.read_date_page(_get_chunk_dir(movie_id), order, skip, limit, after)
+        elif order.lower() == "desc" and is_date_ordered(movie_id):
+            page = _stream_newest_page(movie_id, skip, limit, after)
+        else:
+            return None
+    except (OSError, KeyError, IndexError, *codec.DECODE_ERRORS):
+        return None
+    return page if _store_stamp(movie_id) == stamp else None
+
+
+def _column_page(movie_id: str, sort_by: str, order: str, rating, skip: int, limit: int, after) -> Optional[List[Dict]]:
+    """Page from the column sidecar, or None if it is missing or storage changed while reading."""
+    stamp = _store_stamp(movie_id)
+    records = get_columns(movie_id)
+    if records is None:
+        return None
+    rows = columns.page_rows(records, sort_by, order, rating, skip, limit, after)
+    try:
+        page = columns.load_rows(records, rows, _column_file_resolver(movie_id))
+    except (OSError, KeyError, IndexError, *codec.DECODE_ERRORS):
+        return None
+    return page if _store_stamp(movie_id) == stamp else None
+
+
+def _stream_newest_page(movie_id: str, skip: int, limit: int, after) -> List[Dict]:
+    """Newest-first page read incrementally from a date-ordered review file."""
+    date_key = SORT_KEYS["date"]
+    rows = []
+    for review in iter_reviews(movie_id):
+        if after is not None and (date_key(review), review["review_id"]) >= tuple(after):
+            continue
+        if skip:
+            skip -= 1
+            continue
+        rows.append(review)
+        if len(rows) == limit:
+            break
+    return rows
+
+
+def _reservoir(reviews: Iterator[Dict], n: int, rating: Optional[int], rng: random.Random) -> Tuple[int, List[Dict]]:
+    """Uniform sample of at most n matching reviews from a stream (Algorithm R); returns (matches seen, sample)."""
+    seen, kept = 0, []
+    for review in reviews:
+        if rating is not None and review.get("rating") != rating:
+            continue
+        seen += 1
+        if len(kept) < n:
+            kept.append(review)
+        else:
+            slot = rng.randrange(seen)
+            if slot < n:
+                kept[slot] = review
+    return seen, kept
+
+
+def _indexed_source(movie_id: str, rating: Optional[int], rng: random.Random):
+    """
+    (population size, draw) for a movie that can be sampled by position
+    (column sidecar or cached collection), where draw(k) returns k distinct
+    uniformly chosen matching reviews; None if the movie has to be streamed.
+    """
+    stamp = _store_stamp(movie_id)
+    records = get_columns(movie_id)
+    if records is not None:
+        rows = np.flatnonzero(records["rating"] == rating) if rating is not None else np.arange(len(records))
+
+        def draw_rows(k: int) -> List[Dict]:
+            picked = sorted(rows[i] for i in rng.sample(range(len(rows)), k))
+            try:
+                drawn = columns.load_rows(records, picked, _column_file_resolver(movie_id))
+            except (OSError, KeyError, IndexError, *codec.DECODE_ERRORS):
+                drawn = None
+            if drawn is None or _store_stamp(movie_id) != stamp:
+                # Rewritten while drawing: sample the current reviews by streaming them
+                return _reservoir(iter_reviews(movie_id), k, rating, rng)[1]
+            return drawn
+        return len(rows), draw_rows
+
+    collection = _cached_collection(movie_id)
+    if collection is not None:
+        matching = [r for r in collection.reviews if rating is None or r.get("rating") == rating]
+        return len(matching), lambda k: rng.sample(matching, k)
+    return None
+
+
+def sample_reviews(
+    n: int,
+    movie_id: Optional[str] = None,
+    rating: Optional[int] = None,
+    seed: Optional[int] = None,
+) -> List[Dict]:
+    """
+    Uniform random sample (without replacement) of up to n reviews, from one
+    movie or from all movies, optionally only those with a given rating.
+    Movies with a column sidecar only read the reviews that are drawn; all
+    other movies are streamed once through a single reservoir, so memory
+    stays O(n).
+    """
+    rng = random.Random(seed)
+    movie_ids = [movie_id] if movie_id is not None else list_movie_ids()
+    sources: List[Tuple[int, Callable[[int], List[Dict]]]] = []
+    streamed = []
+    for mid in movie_ids:
+        source = _indexed_source(mid, rating, rng)
+        if source is None:
+            streamed.append(mid)
+        else:
+            sources.append(source)
+    if streamed:
+        seen, kept = _reservoir(chain.from_iterable(iter_reviews(mid) for mid in streamed), n, rating, rng)
+        sources.append((seen, lambda k: rng.sample(kept, k)))
+
+    # Choose global positions, then ask each source for its share
+    total = sum(size for size, _ in sources)
+    picks = sorted(rng.sample(range(total), min(n, total)))
+    sample, start, i = [], 0, 0
+    for size, draw in sources:
+        end, k = start + size, 0
+        while i < len(picks) and picks[i] < end:
+            k, i = k + 1, i + 1
+        if k:
+            sample.extend(draw(k))
+        start = end
+    rng.shuffle(sample)
+    return sample
+
+
+# Bytes buffered before an export block is yielded
+EXPORT_BLOCK_SIZE = 64 * 1024
+
+
+def export_ndjson(movie_ids: List[str], compress: bool = False) -> Iterator[bytes]:
+    """
+    Stream reviews of `movie_ids` (in that order) as NDJSON, one review per line,
+    optionally gzip-compressed. Output is produced in ~EXPORT_BLOCK_SIZE blocks.
+    """
+    gzip = zlib.compressobj(wbits=31) if compress else None
+    block = bytearray()
+    for movie_id in movie_ids:
+        for review in _export_reviews(movie_id):
+            block += json.dumps(review).encode() + b"\n"
+            if len(block) >= EXPORT_BLOCK_SIZE:
+                out = gzip.compress(bytes(block)) if gzip else bytes(block)
+                block.clear()
+                if out:
+                    yield out
+    tail = gzip.compress(bytes(block)) + gzip.flush() if gzip else bytes(block)
+    if tail:
+        yield tail
+
+
+def _export_reviews(movie_id: str) -> Iterator[Dict]:
+    """Stream a movie's reviews; if storage is rewritten mid-stream, finish from a full load."""
+    written = set()
+    try:
+        for review in iter_reviews(movie_id):
+            written.add(review["review_id"])
+            yield review
+    except (OSError, KeyError, IndexError, *codec.DECODE_ERRORS):
+        collection = get_collection(movie_id)
+        with collection.lock:
+            rest = [r for r in collection.reviews if r["review_id"] not in written]
+        yield from rest
+
+
+def export_movie_ids(start_after: Optional[str] = None) -> List[str]:
+    """Movie ids for a site-wide export in order, resuming after `start_after` if given."""
+    return [m for m in list_movie_ids() if start_after is None or m > start_after]
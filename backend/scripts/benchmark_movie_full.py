@@ -0,0 +1,74 @@
+"""
+Compare the movie page load through the API: the three-call sequence
+(GET /movies/{id}, GET /reviews/{id}, GET /reviews/{id}/stats) versus the
+compound GET /movies/{id}/full, for a movie that is not cached yet (cold)
+and one whose reviews are cached (warm).
+
+Requests go through the in-process test client, so there is no network round
+trip: with a real client every extra call also pays one, and the gap widens.
+The movie and its reviews are synthetic and live in a temporary directory,
+never in backend/data.
+
+Run from the repository root:
+    python -m backend.scripts.benchmark_movie_full                      # 5000 reviews
+    python -m backend.scripts.benchmark_movie_full --reviews 20000
+"""
+
+import os, sys, json, time, statistics, tempfile
+from fastapi.testclient import TestClient
+from backend.main import app
+from backend.authentication.security import get_current_user
+from backend.movies import utils as movie_utils, schemas
+from backend.reviews import utils as review_utils
+from backend.scripts.benchmark_review_storage import synthetic_reviews
+
+MOVIE_ID = "bench"
+REPEAT = 30
+
+
+def three_calls(client: TestClient) -> None:
+    for path in (f"/movies/{MOVIE_ID}", f"/reviews/{MOVIE_ID}", f"/reviews/{MOVIE_ID}/stats"):
+        assert client.get(path).status_code == 200
+
+
+def one_call(client: TestClient) -> None:
+    assert client.get(f"/movies/{MOVIE_ID}/full").status_code == 200
+
+
+def median_ms(fn, client: TestClient, cold: bool) -> float:
+    timings = []
+    for _ in range(REPEAT):
+        if cold:
+            review_utils._collections.clear()
+            review_utils._stats_cache.clear()
+        started = time.perf_counter()
+        fn(client)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings) * 1000
+
+
+def benchmark(count: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        movie_utils.MOVIES_DIR = os.path.join(tmp, "movies")
+        review_utils.BASE_DIR = os.path.join(tmp, "reviews")
+        os.makedirs(movie_utils.MOVIES_DIR)
+        with open(os.path.join(movie_utils.MOVIES_DIR, f"{MOVIE_ID}.json"), "w") as f:
+            json.dump({"movie_id": MOVIE_ID, "title": "Benchmark", "genres": ["Drama"],
+                       "directors": ["Someone"], "main_stars": ["Someone Else"]}, f)
+        review_utils.save_reviews(MOVIE_ID, synthetic_reviews(count))
+
+        app.dependency_overrides[get_current_user] = lambda: schemas.UserToken(
+            user_id="bench", username="bench", role="member")
+        client = TestClient(app)
+        print(f"{count} reviews, median of {REPEAT} page loads\n")
+        print(f"{'':<6} {'3 calls':>9} {'/full':>9}")
+        for label, cold in (("cold", True), ("warm", False)):
+            before = median_ms(three_calls, client, cold)
+            after = median_ms(one_call, client, cold)
+            print(f"{label:<6} {before:>7.1f}ms {after:>7.1f}ms  ({before / after:.1f}x)")
+        app.dependency_overrides.clear()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    benchmark(int(args[args.index("--reviews") + 1]) if "--reviews" in args else 5000)
@@ -0,0 +1,83 @@
+"""
+Compare the password-reset write path at scale: the previous full
+load / re-partition / rewrite of both user files versus update_user_fields,
+which rewrites only the file holding the user from cached record text.
+
+Users are synthetic and live in a temporary directory, never in backend/data.
+Mostly inactive, like a store holding migrated reviewers.
+
+Run from the repository root:
+    python -m backend.scripts.benchmark_password_reset                   # 500k users
+    python -m backend.scripts.benchmark_password_reset --users 100000
+"""
+
+import os, sys, json, time, random, tempfile, uuid
+from backend.authentication import utils
+
+ACTIVE_SHARE = 0.02
+
+
+def synthetic_users(count: int):
+    rng = random.Random(7)
+    users = []
+    for i in range(count):
+        active = rng.random() < ACTIVE_SHARE
+        users.append({
+            "user_id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "username": f"user_{i}",
+            "email": f"user_{i}@example.com",
+            "hashed_password": "$2b$12$" + "".join(rng.choices("abcdefghijklmnopqrstuvwxyz0123456789", k=53)),
+            "role": "member",
+            "status": "active" if active else "inactive",
+            "movies_reviewed": [],
+            "watch_later": [],
+            "penalties": [],
+        })
+    return users
+
+
+def full_rewrite(user_id: str, hashed_password: str) -> None:
+    # What /auth/password/reset did before
+    users = utils.load_all_users()
+    for user in users:
+        if user["user_id"] == user_id:
+            user["hashed_password"] = hashed_password
+            break
+    utils.save_active_users([u for u in users if u["status"] == "active"])
+    utils.save_inactive_users([u for u in users if u["status"] == "inactive"])
+
+
+def timed(fn, *args) -> float:
+    started = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - started) * 1000
+
+
+def benchmark(count: int, resets: int = 5) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        utils.ACTIVE_FILE = os.path.join(tmp, "users_active.json")
+        utils.INACTIVE_FILE = os.path.join(tmp, "users_inactive.json")
+        users = synthetic_users(count)
+        utils.save_active_users([u for u in users if u["status"] == "active"])
+        utils.save_inactive_users([u for u in users if u["status"] == "inactive"])
+        print(f"{count:,} users, {os.path.getsize(utils.INACTIVE_FILE) / 1e6:.0f} MB inactive file\n")
+
+        targets = random.Random(1).sample([u["user_id"] for u in users if u["status"] == "inactive"], resets + 1)
+        full_ms = min(timed(full_rewrite, user_id, "rewritten") for user_id in targets[:2])
+        first_ms = timed(utils.update_user_fields, targets[0], {"hashed_password": "targeted"})
+        steady_ms = sorted(timed(utils.update_user_fields, user_id, {"hashed_password": "targeted"})
+                           for user_id in targets[1:])[resets // 2]
+
+        with open(utils.INACTIVE_FILE) as f:
+            stored = {u["user_id"]: u["hashed_password"] for u in json.load(f)}
+        assert all(stored[user_id] == "targeted" for user_id in targets)
+
+        print(f"{'full load + rewrite both files':<34} {full_ms:>9.0f} ms")
+        print(f"{'targeted, first (encodes records)':<34} {first_ms:>9.0f} ms")
+        print(f"{'targeted, steady state (median)':<34} {steady_ms:>9.0f} ms  ({full_ms / steady_ms:.0f}x)")
+        print("✅ every reset persisted")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    benchmark(int(args[args.index("--users") + 1]) if "--users" in args else 500_000)
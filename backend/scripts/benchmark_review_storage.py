@@ -0,0 +1,79 @@
+"""
+Compare review storage codecs: bytes on disk, write latency and read latency
+(full load and streaming the first page) for plain JSON vs zlib vs gzip.
+
+Uses an existing movie's reviews, or synthetic ones when none is given.
+
+Run from the repository root:
+    python -m backend.scripts.benchmark_review_storage                  # 5000 synthetic reviews
+    python -m backend.scripts.benchmark_review_storage --count 20000
+    python -m backend.scripts.benchmark_review_storage --movie <movie_id>
+"""
+
+import os, sys, json, time, random, tempfile, uuid
+from backend.reviews import codec, reader, utils
+
+WORDS = ("the film plot acting great boring scene director music camera story "
+         "character ending twist slow beautiful cast dialogue sequel action drama").split()
+
+
+def synthetic_reviews(count: int):
+    rng = random.Random(42)
+    return [
+        {
+            "review_id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "movie_id": "bench",
+            "user_id": str(uuid.UUID(int=rng.getrandbits(128))),
+            "title": " ".join(rng.choices(WORDS, k=4)),
+            "rating": rng.randint(1, 10),
+            "date": f"20{rng.randint(10, 24)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "text": " ".join(rng.choices(WORDS, k=rng.randint(20, 200))),
+            "usefulness": {"helpful": rng.randint(0, 50), "total_votes": rng.randint(50, 100)},
+        }
+        for _ in range(count)
+    ]
+
+
+def best_of(fn, repeat: int = 5) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
+
+
+def benchmark(reviews) -> None:
+    print(f"{len(reviews)} reviews\n")
+    print(f"{'codec':<6} {'bytes':>12} {'ratio':>6} {'write ms':>9} {'load ms':>8} {'page ms':>8}")
+    baseline = None
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in codec.CODECS:
+            path = os.path.join(tmp, f"reviews.{name}")
+
+            def write():
+                data, _ = codec.encode(reviews, name)
+                with open(path, "wb") as f:
+                    f.write(data)
+
+            def load():
+                json.loads(codec.read(path))
+
+            def first_page():
+                for i, _ in enumerate(reader.iter_json_array(path)):
+                    if i == 19:
+                        break
+
+            write_ms = best_of(write)
+            size = os.path.getsize(path)
+            baseline = baseline or size
+            print(f"{name:<6} {size:>12,} {baseline / size:>5.1f}x {write_ms:>9.1f} "
+                  f"{best_of(load):>8.1f} {best_of(first_page):>8.2f}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if "--movie" in args:
+        benchmark(utils.load_reviews(args[args.index("--movie") + 1]))
+    else:
+        benchmark(synthetic_reviews(int(args[args.index("--count") + 1]) if "--count" in args else 5000))
@@ -0,0 +1,63 @@
+"""
+Compare bearer-token authentication with and without the verified-token cache:
+per-request cost of a full HS256 decode + TokenData versus a cache hit
+(which still runs the revocation check), for a pool of active sessions.
+
+Revocations are kept in a temporary directory, never in backend/data.
+
+Run from the repository root:
+    python -m backend.scripts.benchmark_token_cache                     # 100 sessions, 50 requests each
+    python -m backend.scripts.benchmark_token_cache --sessions 1000 --requests 20
+"""
+
+import os, sys, time, tempfile
+from backend.authentication import security, utils, schemas
+
+
+def per_request_us(fn, tokens, requests: int) -> float:
+    started = time.perf_counter()
+    for _ in range(requests):
+        for token in tokens:
+            fn(token)
+    return (time.perf_counter() - started) / (requests * len(tokens)) * 1e6
+
+
+def uncached(token: str) -> schemas.TokenData:
+    # What get_current_user did on every request before the cache
+    if utils.is_token_hash_revoked(utils.hash_token(token), security._now()):
+        return None
+    payload = security.verify_access_token(token)
+    return schemas.TokenData(user_id=payload["sub"], role=payload["role"], status=payload["status"])
+
+
+def cached(token: str) -> schemas.TokenData:
+    return security._authenticate(token)[1]
+
+
+def benchmark(sessions: int, requests: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        utils.REVOKED_TOKENS_FILE = os.path.join(tmp, "revoked_tokens.json")
+        tokens = [
+            security.create_access_token({"sub": f"user-{i}", "role": "member", "status": "active"})
+            for i in range(sessions)
+        ]
+        # A few revocations so the filter is not empty
+        for i in range(10):
+            security.revoke_token(security.create_access_token({"sub": f"gone-{i}", "role": "member", "status": "active"}))
+
+        print(f"{sessions} sessions × {requests} requests\n")
+        before = per_request_us(uncached, tokens, requests)
+        security._token_cache.clear()
+        after = per_request_us(cached, tokens, requests)
+        stats = security.token_cache_stats()
+        print(f"{'decode every request':<22} {before:>8.1f} µs")
+        print(f"{'verified-token cache':<22} {after:>8.1f} µs  ({before / after:.1f}x)")
+        print(f"✅ cache hits {stats['hits']:,}, misses {stats['misses']:,}")
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    benchmark(
+        int(args[args.index("--sessions") + 1]) if "--sessions" in args else 100,
+        int(args[args.index("--requests") + 1]) if "--requests" in args else 50,
+    )
@@ -0,0 +1,29 @@
+"""
+Write the numeric column sidecar ({movie_id}_reviews.cols) for every movie
+whose sidecar is missing or out of date, e.g. review files stored before the
+sidecar existed or edited by hand.
+
+Run from the repository root:
+    python -m backend.scripts.build_review_columns
+"""
+
+from backend.reviews import utils
+
+
+def build_all() -> None:
+    built = 0
+    for movie_id in utils.list_movie_ids():
+        if utils.get_columns(movie_id) is not None:
+            continue
+        reviews = utils.load_reviews(movie_id)
+        utils.save_reviews(movie_id, reviews)
+        if utils.get_columns(movie_id) is None:
+            print(f"⚠️ {movie_id}: reviews with non-ISO dates, no columns written")
+            continue
+        built += 1
+        print(f"✅ {movie_id}: columns for {len(reviews)} reviews")
+    print(f"\n🎉 Column build complete. Movies updated: {built}")
+
+
+if __name__ == "__main__":
+    build_all()
@@ -0,0 +1,29 @@
+"""
+Convert single-file review storage ({movie_id}_reviews.json) to the chunked
+layout for every movie above the size threshold.
+
+Run from the repository root:
+    python -m backend.scripts.chunk_reviews              # movies > REVIEW_CHUNK_THRESHOLD reviews
+    python -m backend.scripts.chunk_reviews --all        # every movie
+"""
+
+import sys
+from backend.reviews import utils
+
+
+def convert_all(threshold: int) -> None:
+    converted = 0
+    for movie_id in utils.list_movie_ids():
+        if utils.is_chunked(movie_id):
+            continue
+        count = len(utils.load_reviews(movie_id))
+        if count <= threshold:
+            continue
+        utils.convert_to_chunks(movie_id)
+        converted += 1
+        print(f"✅ {movie_id}: {count} reviews chunked")
+    print(f"\n🎉 Conversion complete. Movies converted: {converted}")
+
+
+if __name__ == "__main__":
+    convert_all(-1 if "--all" in sys.argv[1:] else utils.CHUNK_THRESHOLD)
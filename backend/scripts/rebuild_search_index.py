@@ -0,0 +1,15 @@
+"""
+Rebuild the review full-text search index from every stored review.
+
+Run from the repository root:
+    python -m backend.scripts.rebuild_search_index
+"""
+
+import time
+from backend.reviews import search
+
+
+if __name__ == "__main__":
+    started = time.perf_counter()
+    count = search.rebuild()
+    print(f"✅ Indexed {count} reviews in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,15 @@
+"""
+Rebuild the user → reviews index by scanning every stored review.
+
+Run from the repository root:
+    python -m backend.scripts.rebuild_user_review_index
+"""
+
+import time
+from backend.reviews import user_index
+
+
+if __name__ == "__main__":
+    started = time.perf_counter()
+    count = user_index.rebuild()
+    print(f"✅ Indexed {count} reviews in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,19 @@
+"""
+Sign every stored review for near-duplicate detection (MinHash + LSH index),
+one movie per worker process.
+
+Run from the repository root:
+    python -m backend.scripts.sign_reviews              # one worker per CPU
+    python -m backend.scripts.sign_reviews --workers 4
+"""
+
+import sys, time
+from backend.reviews import similarity
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    workers = int(args[args.index("--workers") + 1]) if "--workers" in args else None
+    started = time.perf_counter()
+    count = similarity.rebuild(workers=workers)
+    print(f"✅ Signed {count} reviews in {time.perf_counter() - started:.1f}s")
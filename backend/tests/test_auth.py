@@ -3,11 +3,17 @@ Tests for authentication endpoints: register, login, logout, refresh, whoami, an
 """
 
 import pytest
+import asyncio
+import threading
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
+from passlib.context import CryptContext
 from backend.main import app
-from backend.authentication import utils, schemas, security
+from backend.authentication import utils, schemas, security, throttle
 import json
 import os
+import time
+from datetime import timedelta
 
 client = TestClient(app)
 
@@ -29,6 +35,7 @@ def clear_user_data(tmp_path, monkeypatch):
     monkeypatch.setattr(utils, "ACTIVE_FILE", str(active))
     monkeypatch.setattr(utils, "INACTIVE_FILE", str(inactive))
     monkeypatch.setattr(utils, "REVOKED_TOKENS_FILE", str(revoked))
+    monkeypatch.setattr(throttle, "THROTTLE_FILE", str(users_dir / "login_throttle.bin"))
     yield
 
 
@@ -144,10 +151,16 @@ def test_refresh_token_success():
         data={"username": "emily", "password": "StrongPass2"},
         headers={"content-type": "application/x-www-form-urlencoded"}
     )
-    token = login.json()["access_token"]
-    refresh = client.post("/auth/refresh", headers={"Authorization": f"Bearer {token}"})
+    tokens = login.json()
+    assert tokens["expires_in"] == security.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+    refresh = client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
     assert refresh.status_code == 200
     assert "access_token" in refresh.json()
+    assert refresh.json()["refresh_token"] != tokens["refresh_token"]
+
+    # An access token alone can no longer mint new tokens
+    bearer = client.post("/auth/refresh", headers={"Authorization": f"Bearer {tokens['access_token']}"})
+    assert bearer.status_code == 422
 
 
 def test_password_reset_flow(monkeypatch):
@@ -178,4 +191,251 @@ def test_password_reset_flow(monkeypatch):
     assert "access_token" in login.json()
 
 
-# in backend: pytest -v tests/test_auth.py
\ No newline at end of file
+# in backend: pytest -v tests/test_auth.py
+
+def test_user_repository_indexes_and_invalidation():
+    """Lookups hit the index; saves and external edits are picked up, returned users are copies."""
+    user = {"user_id": "u1", "username": "ann", "email": "ann@example.com", "status": "active", "penalties": []}
+    utils.save_active_users([user])
+    utils.save_inactive_users([{**user, "user_id": "u2", "username": "bob", "email": "bob@example.com", "status": "inactive"}])
+
+    assert utils.get_user_by_id("u1")["username"] == "ann"
+    assert utils.get_user_by_username("bob")["user_id"] == "u2"
+    assert utils.get_user_by_email("bob@example.com")["user_id"] == "u2"
+    assert utils.user_exists("ann", "new@example.com") == (True, "Username already taken")
+    assert utils.get_user_by_id("nobody") is None
+
+    found = utils.get_user_by_id("u1")
+    found["penalties"].append("p1")
+    assert utils.get_user_by_id("u1")["penalties"] == []
+
+    # Written by another process: new mtime/size → re-read
+    with open(utils.ACTIVE_FILE, "w") as f:
+        json.dump([{**user, "username": "annie"}], f)
+    assert utils.get_user_by_username("annie")["user_id"] == "u1"
+    assert utils.get_user_by_username("ann") is None
+
+
+def test_revoked_tokens_in_memory_with_append_only_log(monkeypatch):
+    """Logout revokes by hash; checks read no files; the log survives a restart and expired entries are pruned."""
+    token = security.create_access_token({"sub": "u1", "role": "member", "status": "active"})
+    headers = {"Authorization": f"Bearer {token}"}
+    assert client.get("/auth/whoami", headers=headers).status_code == 200
+
+    assert client.post("/auth/logout", headers=headers).status_code == 200
+    log_path = utils._revocation_log_path()
+    with open(log_path) as f:
+        lines = [json.loads(line) for line in f]
+    assert lines == [[utils.hash_token(token), security.jwt.decode(token, options={"verify_signature": False})["exp"]]]
+
+    def no_disk(*args, **kwargs):
+        raise AssertionError("revocation check touched the disk")
+    with monkeypatch.context() as m:
+        m.setattr("builtins.open", no_disk)
+        assert client.get("/auth/whoami", headers=headers).status_code == 401
+
+    # Restart: the store is rebuilt from the log (and the legacy JSON list)
+    legacy = security.create_access_token({"sub": "u2", "role": "member", "status": "active"})
+    with open(utils.REVOKED_TOKENS_FILE, "w") as f:
+        json.dump([legacy], f)
+    utils._revocations = None
+    assert security.is_token_revoked(token)
+    assert security.is_token_revoked(legacy)
+
+    store = utils._revocation_store(security._now())
+    store.add(utils.hash_token("old"), 100, now=security._now())  # already expired
+    store.prune(security._now())
+    assert utils.hash_token("old") not in store.expiries
+
+
+def test_revocations_shared_between_workers_through_bloom_filter(monkeypatch):
+    """A second worker's store sees new revocations via the filter generation; compaction rebuilds the filter."""
+    now = security._now()
+    worker_a = utils._RevocationStore(utils._revocation_log_path(), utils._revocation_bloom_path())
+    worker_b = utils._RevocationStore(utils._revocation_log_path(), utils._revocation_bloom_path())
+    worker_a.load(now)
+    worker_b.load(now)
+
+    hashes = [utils.hash_token(f"token-{i}") for i in range(50)]
+    for h in hashes:
+        worker_a.add(h, now + 600, now)
+    assert all(worker_b.contains(h, now) for h in hashes)
+    assert not worker_b.contains(utils.hash_token("never-revoked"), now)
+
+    # Mostly expired log → rewritten, filter rebuilt; worker B remaps the new file
+    monkeypatch.setattr(utils, "REVOCATION_LOG_COMPACT_AT", 10)
+    old_inode = worker_a.bloom.inode
+    for i in range(150):
+        worker_a.add(utils.hash_token(f"short-{i}"), now + 1, now)
+    later = now + 5
+    worker_a.add(utils.hash_token("last"), later + 600, later)
+    assert worker_a.bloom.inode != old_inode
+    with open(utils._revocation_log_path()) as f:
+        assert len(f.readlines()) == 51
+    assert worker_b.contains(utils.hash_token("last"), later)
+    assert worker_b.bloom.inode == worker_a.bloom.inode
+    assert all(worker_b.contains(h, later) for h in hashes)
+
+
+def test_verified_token_cache_hits_and_revocation():
+    """Repeat requests with one token hit the cache; logout invalidates the entry."""
+    security._token_cache.clear()
+    token = security.create_access_token({"sub": "u1", "role": "member", "status": "active"})
+    headers = {"Authorization": f"Bearer {token}"}
+    for _ in range(3):
+        assert client.get("/auth/whoami", headers=headers).json()["user_id"] == "u1"
+    stats = security.token_cache_stats()
+    assert (stats["misses"], stats["hits"], stats["size"]) == (1, 2, 1)
+
+    client.post("/auth/logout", headers=headers)
+    assert security.token_cache_stats()["size"] == 0
+    assert client.get("/auth/whoami", headers=headers).status_code == 401
+
+    # Entries end at the token's exp
+    expired = security.create_access_token({"sub": "u2", "role": "member", "status": "active"}, timedelta(seconds=-1))
+    assert client.get("/auth/whoami", headers={"Authorization": f"Bearer {expired}"}).status_code == 401
+    assert security.token_cache_stats()["size"] == 0
+
+
+def test_password_hashing_runs_on_bounded_pool(monkeypatch):
+    """Hashing runs off the calling thread, is metered, and rejects work beyond the pending limit."""
+    monkeypatch.setattr(security, "pwd_context", CryptContext(schemes=["sha256_crypt"]))
+    threads = []
+    original = security._hash
+    monkeypatch.setattr(security, "_hash", lambda p: threads.append(threading.current_thread().name) or original(p))
+
+    before = security.password_pool_stats()
+    hashed = security.hash_password("Secret123")
+    assert security.verify_password("Secret123", hashed)
+    assert asyncio.run(security.verify_password_async("Secret123", hashed))
+    assert threads[0].startswith("password-hash")
+    after = security.password_pool_stats()
+    assert after["completed"] - before["completed"] == 3
+    assert after["pending"] == 0 and after["queue_seconds_max"] >= 0
+
+    monkeypatch.setattr(security, "_password_slots", threading.BoundedSemaphore(1))
+    release = threading.Event()
+    blocked = security._submit_password_op(release.wait)
+    with pytest.raises(HTTPException) as exc:
+        security.hash_password("Secret123")
+    assert exc.value.status_code == 503
+    release.set()
+    blocked.result()
+    assert security.password_pool_stats()["rejected"] == after["rejected"] + 1
+
+
+def test_login_throttled_per_username_and_ip(monkeypatch):
+    """Attempts beyond the bucket get 429 before the user lookup; buckets refill over time."""
+    lookups = []
+    monkeypatch.setattr(utils, "get_user_by_username", lambda name: lookups.append(name))
+    monkeypatch.setattr(throttle, "LOGIN_USERNAME_BURST", 3)
+    monkeypatch.setattr(throttle, "LOGIN_IP_BURST", 6)
+
+    def attempt(username):
+        return client.post(
+            "/auth/login",
+            data={"username": username, "password": "wrong"},
+            headers={"content-type": "application/x-www-form-urlencoded"},
+        )
+
+    assert [attempt("victim").status_code for _ in range(4)] == [401, 401, 401, 429]
+    assert len(lookups) == 3
+    response = attempt("Victim")  # same bucket regardless of case
+    assert response.status_code == 429 and int(response.headers["Retry-After"]) >= 1
+
+    # 5 attempts so far from this client
+    assert attempt("someone-else").status_code == 401
+    assert attempt("another").status_code == 429
+    counters = throttle.stats()
+    assert counters == {"rejected_ip": 1, "rejected_username": 2, "allowed": 4}
+
+    # Refill: a minute later the username bucket has tokens again
+    later = time.time() + 60
+    assert throttle.check_login("victim", None, now=later) is None
+
+
+def test_token_generation_bump_invalidates_all_user_tokens():
+    """Tokens carry the user's generation; a status change or bump rejects every older token, cached or not."""
+    security._token_cache.clear()
+    utils.save_active_users([{"user_id": "u1", "username": "ann", "email": "a@example.com", "status": "active"}])
+    first = security.create_access_token({"sub": "u1", "role": "member", "status": "active"})
+    second = security.create_access_token({"sub": "u1", "role": "member", "status": "active"})
+    other = security.create_access_token({"sub": "u2", "role": "member", "status": "active"})
+    for token in (first, second, other):
+        assert client.get("/auth/whoami", headers={"Authorization": f"Bearer {token}"}).status_code == 200
+
+    assert utils.update_user_status("u1", schemas.UserStatus.INACTIVE)
+    for token in (first, second):
+        assert client.get("/auth/whoami", headers={"Authorization": f"Bearer {token}"}).status_code == 401
+    assert client.get("/auth/whoami", headers={"Authorization": f"Bearer {other}"}).status_code == 200
+
+    fresh = security.create_access_token({"sub": "u1", "role": "member", "status": "active"})
+    assert security.jwt.decode(fresh, options={"verify_signature": False})["gen"] == 1
+    assert security.verify_access_token(fresh) is not None
+
+    # Persisted in the log and seen by a freshly loaded store (another worker / restart)
+    utils._revocations = None
+    assert utils.get_token_generation("u1") == 1
+    assert utils.bump_token_generation("u1") == 2
+    assert security.verify_access_token(fresh) is None
+
+
+def test_refresh_token_rotation_and_reuse_detection():
+    """Refresh tokens rotate on use; replaying a used one revokes the session; generation bumps end sessions."""
+    utils.save_active_users([{"user_id": "u1", "username": "ann", "email": "a@example.com",
+                              "role": "critic", "status": "active", "penalties": []}])
+    first = utils.issue_refresh_token("u1")
+
+    response = client.post("/auth/refresh", json={"refresh_token": first})
+    assert response.status_code == 200
+    second = response.json()["refresh_token"]
+    payload = security.verify_access_token(response.json()["access_token"])
+    assert (payload["sub"], payload["role"]) == ("u1", "critic")
+    assert payload["exp"] - security._now() <= security.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+
+    # Replaying the rotated token: rejected, and the current token of that session dies with it
+    assert client.post("/auth/refresh", json={"refresh_token": first}).status_code == 401
+    assert client.post("/auth/refresh", json={"refresh_token": second}).status_code == 401
+
+    # Store holds one entry per session, survives a reload, and honours generation bumps
+    third = utils.issue_refresh_token("u1")
+    other = utils.issue_refresh_token("u1")
+    utils._refresh_store = None
+    assert len(utils._refresh_tokens().families) == 0  # loaded lazily on the next operation
+    rotated = utils.rotate_refresh_token(third)
+    assert rotated and len(utils._refresh_tokens().families) == 2
+    utils.bump_token_generation("u1")
+    assert utils.rotate_refresh_token(other) is None
+
+    # Logout with the refresh token ends that session
+    session = utils.issue_refresh_token("u1")
+    access = security.create_access_token({"sub": "u1", "role": "critic", "status": "active"})
+    logout = client.post("/auth/logout", json={"refresh_token": session}, headers={"Authorization": f"Bearer {access}"})
+    assert logout.status_code == 200
+    assert utils.rotate_refresh_token(session) is None
+
+
+def test_update_user_fields_rewrites_only_the_owning_file():
+    """A targeted update writes the same bytes json.dump would, and leaves the other file untouched."""
+    active = [{"user_id": f"a{i}", "username": f"act{i}", "email": f"a{i}@x.com", "status": "active",
+               "hashed_password": "old", "penalties": [], "note": "é"} for i in range(3)]
+    inactive = [{"user_id": f"i{i}", "username": f"ina{i}", "email": f"i{i}@x.com", "status": "inactive",
+                 "hashed_password": "old", "watch_later": ["m1"]} for i in range(3)]
+    utils.save_active_users(active)
+    utils.save_inactive_users(inactive)
+    active_stamp = os.stat(utils.ACTIVE_FILE).st_mtime_ns
+
+    updated = utils.update_user_fields("i1", {"hashed_password": "new"})
+    assert updated["hashed_password"] == "new" and updated["watch_later"] == ["m1"]
+    inactive[1]["hashed_password"] = "new"
+    with open(utils.INACTIVE_FILE) as f:
+        assert f.read() == json.dumps(inactive, indent=4)
+    assert os.stat(utils.ACTIVE_FILE).st_mtime_ns == active_stamp
+
+    # Second update reuses the cached record text
+    utils.update_user_fields("i2", {"hashed_password": "newer"})
+    inactive[2]["hashed_password"] = "newer"
+    with open(utils.INACTIVE_FILE) as f:
+        assert json.load(f) == inactive
+    assert utils.get_user_by_id("i2")["hashed_password"] == "newer"
+    assert utils.update_user_fields("missing", {"hashed_password": "x"}) is None
@@ -121,6 +121,37 @@ def test_get_movie(monkeypatch, auth_user, fake_movies):
     assert not_found.status_code == 404
 
 
+def test_get_movie_full(monkeypatch, tmp_path, auth_user, fake_movies):
+    """GET /movies/{movie_id}/full → movie + review stats + first review page, without a full review load."""
+    from backend.reviews import utils as review_utils
+    auth_user("member")
+    monkeypatch.setattr("backend.movies.utils.get_movie", lambda mid: fake_movies[0] if mid == "m1" else None)
+    monkeypatch.setattr("backend.movies.utils.movie_exists", lambda mid: mid == "m1")
+    monkeypatch.setattr(review_utils, "BASE_DIR", str(tmp_path))
+    monkeypatch.setattr(review_utils, "_collections", type(review_utils._collections)())
+    monkeypatch.setattr(review_utils, "_stats_cache", type(review_utils._stats_cache)())
+    review_utils.save_reviews("m1", [
+        {"review_id": f"r{i}", "movie_id": "m1", "user_id": f"u{i}", "title": "t", "rating": i + 1,
+         "date": f"2024-02-0{i + 1}", "text": "x", "usefulness": {"helpful": i, "total_votes": 9}}
+        for i in range(5)
+    ])
+    def no_full_load(movie_id):
+        raise AssertionError("full load")
+    monkeypatch.setattr(review_utils, "load_reviews", no_full_load)
+
+    response = client.get("/movies/m1/full", params={"sort_by": "rating", "limit": 2})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["movie"]["title"] == "Inception"
+    assert body["review_stats"]["count"] == 5
+    assert [r["rating"] for r in body["reviews"]] == [5, 4]
+    assert body["next_cursor"]
+
+    assert client.get("/movies/xyz/full").status_code == 404
+    assert "xyz" not in review_utils._collections
+    assert client.get("/movies/m1/full", params={"sort_by": "title"}).status_code == 400
+
+
 # ---------------------------------------------------------------------
 # 🎬 DOWNLOAD ENDPOINT
 # ---------------------------------------------------------------------
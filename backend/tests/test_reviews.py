@@ -8,11 +8,31 @@ Covers:
 - Voting (not on own review, increments counts)
 """
 
+import os
+import base64
+import gzip
+import importlib.util
+import json
 import pytest
+import threading
+from pydantic import ValidationError
 from fastapi.testclient import TestClient
 from backend.main import app
 from backend.movies import schemas
 from backend.authentication.security import get_current_user
+from backend.reviews import utils as review_utils
+from backend.reviews import schemas as review_schemas
+from backend.reviews import search as review_search
+from backend.reviews import user_index as review_user_index
+from backend.reviews import chunks as review_chunks
+from backend.reviews import reader as review_reader
+from backend.reviews import columns as review_columns
+from backend.reviews import codec as review_codec
+from backend.reviews import stats as review_stats
+from backend.reviews import similarity as review_similarity
+from backend.reviews.index import wilson_lower_bound
+from backend.reports import utils as report_utils
+from backend.movies import utils as movie_utils
 
 client = TestClient(app)
 
@@ -34,6 +54,44 @@ def auth_user():
     # ✅ Important: remove overrides so tests don't leak state
     app.dependency_overrides.clear()
 
+
+@pytest.fixture
+def review_store(tmp_path, monkeypatch):
+    """
+    Point review storage at a temp folder and seed movie "m1".
+    Returns the seeded reviews.
+    """
+    monkeypatch.setattr(review_utils, "BASE_DIR", str(tmp_path / "reviews"))
+    monkeypatch.setattr(review_utils, "_collections", type(review_utils._collections)())
+    monkeypatch.setattr(review_utils, "_stats_cache", type(review_utils._stats_cache)())
+    monkeypatch.setattr(review_search, "INDEX_DIR", str(tmp_path / "search"))
+    monkeypatch.setattr(review_search, "_store", review_search._store.fresh())
+    monkeypatch.setattr(review_user_index, "INDEX_DIR", str(tmp_path / "indexes"))
+    monkeypatch.setattr(review_user_index, "_store", review_user_index._store.fresh())
+    monkeypatch.setattr(review_similarity, "INDEX_DIR", str(tmp_path / "indexes"))
+    monkeypatch.setattr(review_similarity, "_store", review_similarity._store.fresh())
+    monkeypatch.setattr(report_utils, "REPORTS_FILE", str(tmp_path / "reports.json"))
+    monkeypatch.setattr(movie_utils, "MOVIES_DIR", str(tmp_path / "movies"))
+    os.makedirs(movie_utils.MOVIES_DIR)
+    for movie_id in ("m0", "m1", "m2", "m3", "m7"):
+        with open(os.path.join(movie_utils.MOVIES_DIR, f"{movie_id}.json"), "w") as f:
+            json.dump({"movie_id": movie_id}, f)
+    monkeypatch.setattr(review_utils, "load_active_users", lambda: [])
+    monkeypatch.setattr(review_utils, "save_active_users", lambda users: None)
+    reviews = [
+        {"review_id": f"r{i:02d}", "movie_id": "m1", "user_id": f"u{i}", "title": f"T{i}",
+         "rating": i % 10 + 1, "date": f"2024-01-{i % 28 + 1:02d}", "text": f"text {i}",
+         "usefulness": {"helpful": min(i % 4, i % 7), "total_votes": i % 7}}
+        for i in range(25)
+    ]
+    review_utils.save_reviews("m1", reviews)
+    review_user_index.rebuild()
+    yield reviews
+    # Let background index builds finish before the storage paths are restored
+    review_search._store.wait(5)
+    review_user_index._store.wait(5)
+    review_similarity._store.wait(5)
+
 # -------------------------------------------------------------------
 # LIST + GET
 # -------------------------------------------------------------------
@@ -236,5 +294,878 @@ def test_vote_review_not_found(monkeypatch, auth_user):
 
 
 
+# -------------------------------------------------------------------
+# CURSOR PAGINATION
+# -------------------------------------------------------------------
+
+@pytest.mark.parametrize("sort_by", ["date", "rating", "helpful", "total_votes", "wilson"])
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_cursor_pages_cover_every_review_once(review_store, sort_by, order):
+    """Cursor pages visit each review exactly once, in sorted order."""
+    seen, cursor = [], None
+    while True:
+        page = review_utils.filter_sort_reviews("m1", sort_by=sort_by, order=order, limit=7, cursor=cursor)
+        seen.extend(page)
+        if len(page) < 7:
+            break
+        cursor = review_utils.encode_cursor(page[-1], sort_by)
+
+    assert sorted(r["review_id"] for r in seen) == sorted(r["review_id"] for r in review_store)
+    keys = [review_utils.SORT_KEYS[sort_by](r) for r in seen]
+    assert keys == sorted(keys, reverse=(order == "desc"))
+
+
+def test_cursor_survives_votes_between_pages(review_store):
+    """A vote that reorders earlier rows does not shift the next page."""
+    first = review_utils.filter_sort_reviews("m1", sort_by="helpful", limit=5)
+    cursor = review_utils.encode_cursor(first[-1], "helpful")
+    expected = review_utils.filter_sort_reviews("m1", sort_by="helpful", limit=5, cursor=cursor)
+
+    review_utils.add_vote("m1", first[0]["review_id"], review_schemas.Vote(vote=True))
+    after_vote = review_utils.filter_sort_reviews("m1", sort_by="helpful", limit=5, cursor=cursor)
+    assert [r["review_id"] for r in after_vote] == [r["review_id"] for r in expected]
+
+
+def test_list_reviews_next_cursor_header(review_store, auth_user):
+    """GET /reviews/{movie_id} → full pages expose X-Next-Cursor."""
+    auth_user("member")
+    first = client.get("/reviews/m1", params={"limit": 20})
+    assert first.status_code == 200
+    cursor = first.headers["X-Next-Cursor"]
+
+    second = client.get("/reviews/m1", params={"limit": 20, "cursor": cursor})
+    assert second.status_code == 200
+    assert len(second.json()) == 5
+    assert "X-Next-Cursor" not in second.headers
+
+
+def test_list_reviews_bad_cursor(review_store, auth_user):
+    """GET /reviews/{movie_id} → 400 for a malformed or mismatched cursor."""
+    auth_user("member")
+    cursor = client.get("/reviews/m1").headers["X-Next-Cursor"]
+    assert client.get("/reviews/m1", params={"cursor": "garbage"}).status_code == 400
+    assert client.get("/reviews/m1", params={"cursor": cursor, "sort_by": "rating"}).status_code == 400
+
+
+@pytest.mark.parametrize("sort_by,key,review_id", [
+    ("rating", "x", "r01"),
+    ("rating", True, "r01"),
+    ("wilson", None, "r01"),
+    ("date", 5, "r01"),
+    ("date", "yesterday", "r01"),
+    ("helpful", 2, 7),
+])
+def test_list_reviews_cursor_with_wrong_types(review_store, auth_user, sort_by, key, review_id):
+    """GET /reviews/{movie_id} → 400 (not 500) for a well-formed cursor holding wrongly typed values."""
+    auth_user("member")
+    raw = json.dumps([sort_by, key, review_id]).encode()
+    cursor = base64.urlsafe_b64encode(raw).decode().rstrip("=")
+    for cached in (False, True):
+        if cached:
+            review_utils.get_collection("m1")
+        response = client.get("/reviews/m1", params={"cursor": cursor, "sort_by": sort_by})
+        assert response.status_code == 400
+
+# -------------------------------------------------------------------
+# WILSON RANKING
+# -------------------------------------------------------------------
+
+def test_wilson_lower_bound_prefers_confident_ratios():
+    """Many mostly-helpful votes beat a single helpful vote; no votes scores 0."""
+    wilson = wilson_lower_bound
+    assert wilson(0, 0) == 0.0
+    assert wilson(90, 100) > wilson(9, 10) > wilson(1, 1)
+    assert wilson(500, 2000) < wilson(90, 100)
+
+
+def test_sort_by_wilson_tracks_votes(review_store):
+    """sort_by=wilson reflects new votes without rebuilding the index."""
+    top = review_utils.filter_sort_reviews("m1", sort_by="wilson", limit=1)[0]
+    bottom = review_utils.filter_sort_reviews("m1", sort_by="wilson", order="asc", limit=1)[0]
+    assert top["review_id"] != bottom["review_id"]
+
+    for _ in range(30):
+        review_utils.add_vote("m1", bottom["review_id"], review_schemas.Vote(vote=True))
+    assert review_utils.filter_sort_reviews("m1", sort_by="wilson", limit=1)[0]["review_id"] == bottom["review_id"]
+
+# -------------------------------------------------------------------
+# FULL-TEXT SEARCH
+# -------------------------------------------------------------------
+
+def test_search_index_ranks_and_matches_phrases():
+    """BM25 favours denser matches; quoted phrases must appear word for word."""
+    index = review_search.SearchIndex()
+    index.add("m1", "a", review_search.tokenize("Huge spoiler: the hero dies at the end"))
+    index.add("m1", "b", review_search.tokenize("spoiler spoiler spoiler alert"))
+    index.add("m2", "c", review_search.tokenize("the end of the hero was great"))
+
+    assert [hit[2] for hit in index.search("spoiler")] == ["b", "a"]
+    assert [hit[2] for hit in index.search('"hero dies"')] == ["a"]
+    assert [hit[2] for hit in index.search("hero", movie_id="m2")] == ["c"]
+    assert index.search('"dies hero"') == []
+
+    index.remove("m1", "b")
+    assert [hit[2] for hit in index.search("spoiler")] == ["a"]
+
+
+def test_search_index_persists_snapshot_and_journal(review_store, monkeypatch):
+    """Writes are journaled and replayed on top of the snapshot after a restart."""
+    assert review_search.rebuild() == 25
+    review_utils.add_vote("m1", "r01", review_schemas.Vote(vote=True))  # votes don't touch the index
+    assert [r["review_id"] for r in review_utils.search_reviews('"text 3"')] == ["r03"]
+
+    review_utils.update_review("m1", "r03", review_schemas.ReviewUpdate(text="now about popcorn"))
+    review_utils.delete_review("m1", "r04")
+
+    monkeypatch.setattr(review_search, "_store", review_search._store.fresh())  # simulate a restart
+    assert review_utils.search_reviews('"text 3"') == []
+    assert [r["review_id"] for r in review_utils.search_reviews("popcorn")] == ["r03"]
+    assert all(r["review_id"] != "r04" for r in review_utils.search_reviews("text", limit=100))
+
+    compacted = review_search.SearchIndex.read_snapshot(review_search._snapshot_path())
+    assert len(compacted) == 25
+
+
+def test_search_index_builds_in_background(review_store, monkeypatch):
+    """Without a snapshot, writes don't wait for a full build; writes made during it survive."""
+    release = threading.Event()
+    scan = review_search._all_reviews
+
+    def slow_scan():
+        release.wait(5)
+        yield from scan()
+    monkeypatch.setattr(review_search, "_all_reviews", slow_scan)
+
+    new = review_utils.add_review("m2", review_schemas.ReviewCreate(title="Popcorn", rating=7, text="salty popcorn"), "u1")
+    assert [r["review_id"] for r in review_utils.search_reviews("popcorn")] == [new["review_id"]]
+    assert review_utils.search_reviews('"text 3"') == []  # corpus not indexed yet
+    assert not os.path.exists(review_search._snapshot_path())
+
+    release.set()
+    review_search._store.wait(5)
+    assert [r["review_id"] for r in review_utils.search_reviews('"text 3"')] == ["r03"]
+    assert [r["review_id"] for r in review_utils.search_reviews("popcorn")] == [new["review_id"]]
+    assert len(review_search.SearchIndex.read_snapshot(review_search._snapshot_path())) == 26
+
+
+def test_search_index_shared_between_workers(review_store, monkeypatch):
+    """Workers see each other's writes, and one compacting the journal loses none of them."""
+    assert review_search.rebuild() == 25
+    other = review_search._store.fresh()  # another worker process over the same files
+    review_search.index_review({"movie_id": "m2", "review_id": "a", "title": "", "text": "popcorn"})
+    other.record(["add", "m2", "b", "", "popcorn nachos"])
+    assert {hit[2] for hit in other.current().search("popcorn")} == {"a", "b"}
+    other.record(["del", "m2", "b"])
+    index = review_search.get_index()
+    assert [hit[2] for hit in index.search("popcorn")] == ["a"]
+
+    monkeypatch.setattr(review_search, "JOURNAL_COMPACT_AT", 3)
+    other._compact_in_background()
+    assert os.path.getsize(review_search._journal_path()) == 0
+    assert len(review_search.SearchIndex.read_snapshot(review_search._snapshot_path())) == 26
+    assert review_search.get_index() is index  # already held every folded entry, so no reload
+
+    review_search.index_review({"movie_id": "m2", "review_id": "c", "title": "", "text": "nachos"})
+    assert {hit[2] for hit in other.current().search("popcorn nachos")} == {"a", "c"}
+    assert [r["review_id"] for r in review_utils.search_reviews('"text 3"')] == ["r03"]
+
+
+def test_search_reviews_route(monkeypatch, auth_user):
+    """GET /reviews/search → returns scored hits (not treated as a movie id)."""
+    auth_user("member")
+    hit = {"review_id": "r1", "movie_id": "m1", "user_id": "u1", "title": "Good", "rating": 8,
+           "date": "2025-01-01", "text": "Nice!", "usefulness": {"helpful": 2, "total_votes": 3}, "score": 1.5}
+    monkeypatch.setattr("backend.reviews.utils.search_reviews", lambda q, movie_id=None, limit=20: [hit])
+    response = client.get("/reviews/search", params={"q": "nice"})
+    assert response.status_code == 200
+    assert response.json()[0]["score"] == 1.5
+
+# -------------------------------------------------------------------
+# USER → REVIEWS INDEX
+# -------------------------------------------------------------------
+
+def test_user_index_tracks_add_and_delete(review_store):
+    """add_review/delete_review keep the user → reviews index in sync."""
+    new = review_schemas.ReviewCreate(title="Again", rating=7, text="second opinion")
+    with pytest.raises(ValueError):
+        review_utils.add_review("m1", new, "u3")  # u3 already reviewed m1 (seeded)
+
+    added = review_utils.add_review("m2", new, "u3")
+    total, page = review_utils.get_user_reviews("u3")
+    assert total == 2
+    assert [r["review_id"] for r in page] == [added["review_id"], "r03"]
+
+    review_utils.delete_review("m1", "r03")
+    assert not review_utils.user_already_reviewed("m1", "u3")
+    review_utils.add_review("m1", new, "u3")  # allowed again after deleting
+
+
+def test_user_index_reloads_from_disk(review_store, monkeypatch):
+    """The journal is replayed after a restart and rebuild() rescans review files."""
+    review_utils.delete_review("m1", "r05")
+    monkeypatch.setattr(review_user_index, "_store", review_user_index._store.fresh())
+    assert review_user_index.reviews_of("u5") == []
+    assert review_user_index.reviews_of("u6") == [("m1", "r06")]
+    assert review_user_index.rebuild() == 24
+
+
+def test_user_index_builds_in_background(review_store, monkeypatch):
+    """Without a snapshot, lookups serve the journal while the corpus is scanned off the request path."""
+    os.remove(review_user_index._snapshot_path())
+    monkeypatch.setattr(review_user_index, "_store", review_user_index._store.fresh())
+    release = threading.Event()
+    scan = review_user_index._all_reviews
+
+    def slow_scan():
+        release.wait(5)
+        yield from scan()
+    monkeypatch.setattr(review_user_index, "_all_reviews", slow_scan)
+
+    added = review_utils.add_review("m2", review_schemas.ReviewCreate(title="New", rating=7, text="x"), "u1")
+    assert review_user_index.reviews_of("u1") == [("m2", added["review_id"])]
+    assert not os.path.exists(review_user_index._snapshot_path())
+
+    release.set()
+    review_user_index._store.wait(5)
+    assert review_user_index.reviews_of("u1") == [("m1", "r01"), ("m2", added["review_id"])]
+    assert os.path.exists(review_user_index._snapshot_path())
+
+
+def _second_worker():
+    """An independent copy of the user index module, as another worker process has."""
+    spec = importlib.util.spec_from_file_location("user_index_worker", review_user_index.__file__)
+    worker = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(worker)
+    worker.INDEX_DIR = review_user_index.INDEX_DIR
+    return worker
+
+
+def test_user_index_shared_between_workers(review_store):
+    """Workers see each other's journal entries, and one worker's compaction keeps the other's entries."""
+    assert review_user_index.reviews_of("u1") == [("m1", "r01")]
+    worker = _second_worker()
+    worker.JOURNAL_COMPACT_AT = 2
+
+    review_user_index.record_review({"user_id": "w1", "movie_id": "m7", "review_id": "a"})
+    assert worker.reviews_of("w1") == [("m7", "a")]
+    worker.record_review({"user_id": "w2", "movie_id": "m7", "review_id": "b"})  # starts a compaction
+    worker._store.wait(5)
+    assert os.path.getsize(review_user_index._journal_path()) == 0
+
+    assert review_user_index.reviews_of("w1") == [("m7", "a")]
+    assert review_user_index.reviews_of("w2") == [("m7", "b")]
+    review_user_index.forget_review({"user_id": "w1", "movie_id": "m7", "review_id": "a"})
+    assert worker.reviews_of("w1") == []
+
+
+def test_duplicate_review_rejected_after_write_by_another_worker(review_store):
+    """The one-review-per-movie check reads the movie's current reviews, not a per-process index."""
+    review_utils.get_collection("m1")
+    review_user_index.reviews_of("u1")  # this worker's index is loaded before the other worker writes
+    review_utils.save_reviews("m1", review_store + [dict(review_store[0], review_id="r99", user_id="u99")])
+    with pytest.raises(ValueError):
+        review_utils.add_review("m1", review_schemas.ReviewCreate(title="Again", rating=7, text="x"), "u99")
+
+# -------------------------------------------------------------------
+# CHUNKED STORAGE
+# -------------------------------------------------------------------
+
+@pytest.fixture
+def chunked_store(review_store, monkeypatch):
+    """Seeded movie "m1" converted to 4-review chunks; counts chunk loads."""
+    monkeypatch.setattr(review_chunks, "CHUNK_SIZE", 4)
+    assert review_utils.convert_to_chunks("m1")
+    loads = []
+    real_load_chunk = review_chunks.load_chunk
+    def counting_load_chunk(movie_dir, manifest, number):
+        loads.append(number)
+        return real_load_chunk(movie_dir, manifest, number)
+    monkeypatch.setattr(review_chunks, "load_chunk", counting_load_chunk)
+    return loads
+
+
+def test_convert_to_chunks_keeps_all_reviews(review_store, chunked_store):
+    """Conversion replaces the single file and preserves every review."""
+    assert review_utils.is_chunked("m1")
+    assert not os.path.exists(review_utils._get_review_path("m1"))
+    assert review_utils.list_movie_ids() == ["m1"]
+    loaded = review_utils.load_reviews("m1")
+    assert sorted(r["review_id"] for r in loaded) == sorted(r["review_id"] for r in review_store)
+
+
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_chunked_date_pages_match_collection(review_store, chunked_store, order):
+    """Date pages (skip and cursor) read from chunks equal the in-memory index pages."""
+    collection = review_utils.ReviewCollection("m1", review_utils.load_reviews("m1"))
+    del chunked_store[:]
+
+    page = review_utils.filter_sort_reviews("m1", sort_by="date", order=order, skip=3, limit=5)
+    assert page == collection.page("date", order, skip=3, limit=5)
+    assert len(set(chunked_store)) <= 3  # 5 rows span at most 3 chunks of 4
+
+    after = (page[-1]["date"], page[-1]["review_id"])
+    cursor = review_utils.encode_cursor(page[-1], "date")
+    assert review_utils.filter_sort_reviews("m1", order=order, limit=5, cursor=cursor) == \
+        collection.page("date", order, limit=5, after=after)
+
+
+def test_chunked_single_review_and_writes(review_store, chunked_store):
+    """Single fetches read one chunk; a vote rewrites only the chunk it touches."""
+    assert review_utils.get_review("m1", "r10")["title"] == "T10"
+    assert len(chunked_store) == 1
+
+    movie_dir = review_utils._get_chunk_dir("m1")
+    before = {c["file"] for c in review_chunks.load_manifest(movie_dir)["chunks"]}
+    review_utils.add_vote("m1", "r10", review_schemas.Vote(vote=True))
+    after = {c["file"] for c in review_chunks.load_manifest(movie_dir)["chunks"]}
+    assert len(after - before) == 1
+    assert review_utils.get_review("m1", "r10")["usefulness"]["total_votes"] == 4
+
+
+def test_chunked_reads_survive_chunks_removed_mid_read(review_store, chunked_store, monkeypatch):
+    """Cold reads racing a save that deletes old chunk files fall back to a full load."""
+    collection = review_utils.ReviewCollection("m1", review_utils.load_reviews("m1"))
+    real_load_chunk = review_chunks.load_chunk
+    removed = []
+
+    def removed_once(movie_dir, manifest, number):
+        if not removed:
+            removed.append(number)
+            raise FileNotFoundError(number)
+        return real_load_chunk(movie_dir, manifest, number)
+    monkeypatch.setattr(review_chunks, "load_chunk", removed_once)
+
+    def cold(read):
+        removed.clear()
+        review_utils._collections.clear()
+        return read()
+
+    assert cold(lambda: review_utils.get_review("m1", "r10"))["title"] == "T10"
+    assert cold(lambda: review_utils.filter_sort_reviews("m1", sort_by="date", limit=5)) == \
+        collection.page("date", "desc", limit=5)
+    exported = cold(lambda: b"".join(review_utils.export_ndjson(["m1"]))).splitlines()
+    assert sorted(json.loads(line)["review_id"] for line in exported) == sorted(r["review_id"] for r in review_store)
+
+# -------------------------------------------------------------------
+# NDJSON EXPORT
+# -------------------------------------------------------------------
+
+def test_export_movie_reviews(review_store, auth_user):
+    """GET /reviews/{movie_id}/export → one JSON review per line, optionally gzipped."""
+    auth_user("member")
+    plain = client.get("/reviews/m1/export")
+    assert plain.status_code == 200
+    assert plain.headers["content-type"].startswith("application/x-ndjson")
+    lines = plain.content.decode().splitlines()
+    assert sorted(json.loads(line)["review_id"] for line in lines) == sorted(r["review_id"] for r in review_store)
+
+    packed = client.get("/reviews/m1/export", params={"gzip": True})
+    assert packed.headers["content-type"] == "application/gzip"
+    assert gzip.decompress(packed.content) == plain.content
+
+
+def test_export_all_reviews_resumes_after_movie(review_store, auth_user, monkeypatch):
+    """GET /reviews/export → admin only, walks movies in id order from start_after."""
+    monkeypatch.setattr(review_utils, "EXPORT_BLOCK_SIZE", 512)
+    review_utils.save_reviews("m0", [{**review_store[0], "movie_id": "m0", "review_id": "x"}])
+    review_utils.save_reviews("m2", [{**review_store[1], "movie_id": "m2", "review_id": "y"}])
+
+    auth_user("member")
+    assert client.get("/reviews/export").status_code == 403
+
+    auth_user("administrator")
+    movies = [json.loads(line)["movie_id"] for line in client.get("/reviews/export").content.decode().splitlines()]
+    assert movies == ["m0"] + ["m1"] * 25 + ["m2"]
+
+    resumed = client.get("/reviews/export", params={"start_after": "m1", "gzip": True})
+    assert [json.loads(line)["review_id"] for line in gzip.decompress(resumed.content).decode().splitlines()] == ["y"]
+
+# -------------------------------------------------------------------
+# INCREMENTAL READER
+# -------------------------------------------------------------------
+
+def test_iter_json_array_matches_json_load(tmp_path):
+    """Elements split across tiny read buffers decode exactly like json.load."""
+    data = [{"a": "x]\\\"{,", "n": 12345678901234}, 42, 3.5e10, "tail", None, [1, [2, {}]], True]
+    path = tmp_path / "array.json"
+    path.write_text(json.dumps(data, indent=2))
+    for read_size in (1, 3, 7, 1024):
+        assert list(review_reader.iter_json_array(str(path), read_size=read_size)) == data
+
+    path.write_text("  ")
+    assert list(review_reader.iter_json_array(str(path))) == []
+    path.write_text('[{"a": 1}, {"b": ')
+    with pytest.raises(json.JSONDecodeError):
+        list(review_reader.iter_json_array(str(path), read_size=4))
+
+
+def test_date_pages_stream_from_ordered_file(review_store, monkeypatch):
+    """Cold newest-first pages and id lookups stop parsing early."""
+    assert review_utils.is_date_ordered("m1")
+    collection = review_utils.ReviewCollection("m1", review_utils.load_reviews("m1"))
+
+    parsed = []
+    real_iter = review_reader.iter_json_array
+    def counting_iter(path, read_size=review_reader.READ_SIZE):
+        for item in real_iter(path, read_size):
+            parsed.append(item)
+            yield item
+    monkeypatch.setattr(review_reader, "iter_json_array", counting_iter)
+
+    page = review_utils.filter_sort_reviews("m1", sort_by="date", skip=2, limit=5)
+    assert page == collection.page("date", "desc", skip=2, limit=5)
+    assert len(parsed) == 7
+
+    cursor = review_utils.encode_cursor(page[-1], "date")
+    after = (page[-1]["date"], page[-1]["review_id"])
+    assert review_utils.filter_sort_reviews("m1", limit=5, cursor=cursor) == collection.page("date", limit=5, after=after)
+
+    del parsed[:]
+    newest = page[0]["review_id"]
+    assert review_utils.get_review("m1", newest)["review_id"] == newest
+    assert len(parsed) == 3
+
+
+def test_external_rewrite_clears_date_order(review_store):
+    """A file written outside save_reviews is no longer trusted as date-ordered."""
+    path = review_utils._get_review_path("m1")
+    with open(path, "w") as f:
+        json.dump(review_store, f)
+    assert not review_utils.is_date_ordered("m1")
+    page = review_utils.filter_sort_reviews("m1", sort_by="date", limit=3)
+    assert [r["date"] for r in page] == sorted((r["date"] for r in review_store), reverse=True)[:3]
+
+
+
+# -------------------------------------------------------------------
+# COLUMN SIDECAR
+# -------------------------------------------------------------------
+def test_encode_matches_json_dumps(review_store):
+    """Offsets returned by codec.encode point at each element of the standard output."""
+    data, spans = review_codec.encode(review_store[:5], "json")
+    assert data.decode() == json.dumps(review_store[:5], indent=2)
+    assert [json.loads(data[o:o + n]) for o, n in spans] == review_store[:5]
+    assert review_codec.encode([], "json") == (b"[]", [])
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+@pytest.mark.parametrize("sort_by,order,rating", [
+    ("rating", "desc", None), ("helpful", "asc", None), ("wilson", "desc", None),
+    ("total_votes", "desc", 3), ("date", "asc", None), ("date", "desc", 5),
+])
+def test_column_pages_match_collection(review_store, monkeypatch, chunked, sort_by, order, rating):
+    """Cold pages come from the mmapped columns, never a full load, and equal the index pages."""
+    if chunked:
+        monkeypatch.setattr(review_chunks, "CHUNK_SIZE", 4)
+        review_utils.convert_to_chunks("m1")
+    records = review_utils.get_columns("m1")
+    assert len(records) == 25
+    assert records.dtype.itemsize == 1 + 4 * 5 + 8 + review_columns.ID_WIDTH
+    collection = review_utils.ReviewCollection("m1", review_utils.load_reviews("m1"))
+    def no_full_load(movie_id):
+        raise AssertionError("full load")
+    monkeypatch.setattr(review_utils, "load_reviews", no_full_load)
+
+    page = review_utils.filter_sort_reviews("m1", rating, sort_by, order, skip=1, limit=4)
+    assert page == collection.page(sort_by, order, rating, skip=1, limit=4)
+
+    cursor = review_utils.encode_cursor(page[-1], sort_by)
+    after = review_utils.decode_cursor(cursor, sort_by)
+    assert review_utils.filter_sort_reviews("m1", rating, sort_by, order, limit=4, cursor=cursor) == \
+        collection.page(sort_by, order, rating, limit=4, after=after)
+
+
+def test_columns_follow_writes_and_ignore_external_edits(review_store):
+    """Saves refresh the sidecar; a file rewritten elsewhere makes it stale and unused."""
+    review_utils.add_vote("m1", "r06", review_schemas.Vote(vote=True))
+    review_utils._collections.clear()
+    row = review_columns.page_rows(review_utils.get_columns("m1"), "total_votes", limit=1)[0]
+    assert review_utils.get_columns("m1")[row]["review_id"] == b"r06"
+
+    path = review_utils._get_review_path("m1")
+    with open(path, "w") as f:
+        json.dump(review_store, f)
+    assert review_utils.get_columns("m1") is None
+    page = review_utils.filter_sort_reviews("m1", sort_by="rating", limit=3)
+    assert [r["rating"] for r in page] == [10, 10, 9]
+
+
+
+# -------------------------------------------------------------------
+# STATS
+# -------------------------------------------------------------------
+def test_review_stats_values(review_store):
+    """Stats over the columns match the same figures computed from the review dicts."""
+    import statistics
+    ratings = [r["rating"] for r in review_store]
+    result = review_utils.review_stats("m1")
+    assert result["count"] == 25
+    assert result["mean"] == round(statistics.mean(ratings), 4)
+    assert result["median"] == statistics.median(ratings)
+    assert result["std_dev"] == round(statistics.pstdev(ratings), 4)
+    assert result["histogram"] == {n: ratings.count(n) for n in range(1, 11)}
+    assert result["reviews_per_month"] == [{"month": "2024-01", "count": 25}]
+    ratios = sorted(r["usefulness"]["helpful"] / r["usefulness"]["total_votes"]
+                    for r in review_store if r["usefulness"]["total_votes"])
+    assert result["helpful_ratio_quantiles"]["p50"] == round(statistics.median(ratios), 4)
+
+    assert review_utils.review_stats("empty")["count"] == 0
+    assert review_utils.review_stats("empty")["helpful_ratio_quantiles"]["p90"] is None
+
+
+def test_review_stats_cached_until_write(review_store, monkeypatch):
+    """Repeat calls reuse the cached result; a write invalidates it."""
+    calls = []
+    real_compute = review_stats.compute
+    monkeypatch.setattr(review_stats, "compute", lambda records: calls.append(1) or real_compute(records))
+    review_utils.review_stats("m1")
+    review_utils.review_stats("m1")
+    assert len(calls) == 1
+    review_utils.delete_review("m1", "r00")
+    assert review_utils.review_stats("m1")["count"] == 24
+    assert len(calls) == 2
+
+
+def test_review_stats_cache_is_bounded(review_store, monkeypatch):
+    """Statistics are kept for the most recently queried movies only."""
+    monkeypatch.setattr(review_utils, "MAX_CACHED_STATS", 2)
+    for movie_id in ("m1", "m2", "m1", "m3"):
+        review_utils.review_stats(movie_id)
+    assert list(review_utils._stats_cache) == ["m1", "m3"]
+
+
+def test_review_stats_route(review_store, auth_user):
+    auth_user("member")
+    res = client.get("/reviews/m1/stats")
+    assert res.status_code == 200
+    body = res.json()
+    assert body["count"] == 25 and body["histogram"]["10"] == 2
+
+
+def test_out_of_range_numbers_skip_columns(review_store):
+    """Ratings outside 1–10 are rejected; stored numbers too big for a column don't fail writes or stats."""
+    with pytest.raises(ValidationError):
+        review_schemas.ReviewCreate(title="Loud", rating=200, text="x")
+    with pytest.raises(ValidationError):
+        review_schemas.ReviewUpdate(rating=0)
+
+    legacy = dict(review_store[0], review_id="big", user_id="u99", rating=200,
+                  usefulness={"helpful": 2 ** 40, "total_votes": 2 ** 40})
+    review_utils.save_reviews("m1", review_store + [legacy])
+    assert review_utils.get_columns("m1") is None  # not representable: JSON storage serves the pages
+    assert review_utils.review_stats("m1")["count"] == 26
+    assert review_utils.filter_sort_reviews("m1", sort_by="rating", limit=1)[0]["review_id"] == "big"
+
+
+
+# -------------------------------------------------------------------
+# NEAR-DUPLICATES
+# -------------------------------------------------------------------
+SPAM = "Buy cheap tickets now at example dot com best deals on every movie this week only"
+
+
+def test_minhash_similarity_estimates_jaccard():
+    """Copies with a small edit score high; unrelated texts and short texts do not match."""
+    a = review_similarity.signature(SPAM)
+    b = review_similarity.signature(SPAM.replace("this week", "this month"))
+    c = review_similarity.signature("A slow but rewarding drama about two brothers rebuilding their family farm")
+    assert review_similarity.similarity(a, a) == 1.0
+    assert review_similarity.similarity(a, b) >= 0.5
+    assert review_similarity.similarity(a, c) < 0.2
+    assert review_similarity.signature("Great movie!") is None
+
+    index = review_similarity.MinHashIndex()
+    index.add(("m1", "spam"), a)
+    index.add(("m1", "drama"), c)
+    assert [m[2] for m in index.near_duplicates(b, 0.5)] == ["spam"]
+    index.remove(("m1", "spam"))
+    assert index.near_duplicates(b, 0.5) == []
+
+
+def test_add_review_reports_near_duplicate(review_store):
+    """A copy-pasted review is accepted and auto-reported; the original is not."""
+    original = review_utils.add_review("m1", review_schemas.ReviewCreate(title="x", rating=1, text=SPAM), "spammer")
+    assert report_utils.load_reports() == []
+
+    copy = review_utils.add_review("m2", review_schemas.ReviewCreate(title="y", rating=1, text=SPAM + "!"), "spammer")
+    reports = report_utils.load_reports()
+    assert len(reports) == 1
+    assert reports[0].reported_id == copy["review_id"]
+    assert reports[0].reporter_id == review_utils.SYSTEM_REPORTER_ID
+    assert original["review_id"] in reports[0].reason
+
+    review_utils.delete_review("m1", original["review_id"])
+    assert ("m1", original["review_id"]) not in review_similarity.get_index().signatures
+
+
+def test_similarity_index_rebuild_and_reload(review_store, monkeypatch):
+    """The batch job signs existing reviews; a restart replays the journal."""
+    review_utils.save_reviews("m2", [{**review_store[0], "movie_id": "m2", "review_id": "s1", "text": SPAM}])
+    assert review_similarity.rebuild(workers=2) == 1
+    added = review_utils.add_review("m1", review_schemas.ReviewCreate(title="x", rating=1, text=SPAM), "u99")
+
+    monkeypatch.setattr(review_similarity, "_store", review_similarity._store.fresh())  # simulate a restart
+    assert set(review_similarity.get_index().signatures) == {("m2", "s1"), ("m1", added["review_id"])}
+
+
+
+def test_similarity_index_builds_in_background(review_store, monkeypatch):
+    """Without a snapshot, a write doesn't sign the corpus inline; the background build picks it up."""
+    review_utils.save_reviews("m2", [{**review_store[0], "movie_id": "m2", "review_id": "s1", "text": SPAM}])
+    release = threading.Event()
+    movie_ids = review_similarity._all_movie_ids
+
+    def slow_movie_ids():
+        release.wait(5)
+        return movie_ids()
+    monkeypatch.setattr(review_similarity, "_all_movie_ids", slow_movie_ids)
+
+    added = review_utils.add_review("m1", review_schemas.ReviewCreate(title="x", rating=1, text=SPAM), "u99")
+    assert set(review_similarity.get_index().signatures) == {("m1", added["review_id"])}
+    assert not os.path.exists(review_similarity._snapshot_path())
+
+    release.set()
+    review_similarity._store.wait(5)
+    assert set(review_similarity.get_index().signatures) == {("m2", "s1"), ("m1", added["review_id"])}
+    with open(review_similarity._snapshot_path()) as f:
+        assert len(json.load(f)) == 2
+
+
+def test_similarity_index_shared_between_workers(review_store, monkeypatch):
+    """A review signed by another worker is still compared against after that worker compacts the journal."""
+    assert review_similarity.rebuild() == 0  # seeded texts are too short to sign
+    monkeypatch.setattr(review_similarity, "JOURNAL_COMPACT_AT", 1)
+    other = review_similarity._store.fresh()  # another worker process over the same files
+    other.record(["add", "m2", "s1", review_similarity._encode(review_similarity.signature(SPAM))])
+    other.wait(5)
+    assert os.path.getsize(review_similarity._journal_path()) == 0
+
+    matches = review_similarity.check_and_record({"movie_id": "m1", "review_id": "copy", "text": SPAM + "!"})
+    assert [m[2] for m in matches] == ["s1"]
+    review_similarity._store.wait(5)
+    assert set(other.current().signatures) == {("m2", "s1"), ("m1", "copy")}
+
+
+# -------------------------------------------------------------------
+# SAMPLING
+# -------------------------------------------------------------------
+def test_sample_reviews_distinct_and_filtered(review_store, monkeypatch):
+    """Samples are distinct, respect the rating filter and never load whole movies."""
+    review_utils.save_reviews("m2", [{**r, "movie_id": "m2", "review_id": "b" + r["review_id"]} for r in review_store[:5]])
+    os.remove(review_utils._get_columns_path("m2"))  # m2 has to be streamed
+    def no_full_load(movie_id):
+        raise AssertionError("full load")
+    monkeypatch.setattr(review_utils, "load_reviews", no_full_load)
+
+    sample = review_utils.sample_reviews(10, seed=1)
+    assert len(sample) == len({r["review_id"] for r in sample}) == 10
+    assert len(review_utils.sample_reviews(100)) == 30
+    assert {r["rating"] for r in review_utils.sample_reviews(5, movie_id="m1", rating=3)} == {3}
+    assert len(review_utils.sample_reviews(5, movie_id="m1", rating=3)) == 3  # r02, r12, r22
+    assert review_utils.sample_reviews(4, seed=7) == review_utils.sample_reviews(4, seed=7)
+
+
+def test_sample_reviews_is_uniform(review_store):
+    """Every review of both layouts is drawn about equally often."""
+    review_utils.save_reviews("m2", [{**r, "movie_id": "m2", "review_id": "b" + r["review_id"]} for r in review_store[:5]])
+    os.remove(review_utils._get_columns_path("m2"))
+    counts = {}
+    for seed in range(600):
+        for review in review_utils.sample_reviews(3, seed=seed):
+            counts[review["review_id"]] = counts.get(review["review_id"], 0) + 1
+    assert len(counts) == 30
+    assert min(counts.values()) > 30 and max(counts.values()) < 90  # expected 60 each
+
+
+@pytest.mark.parametrize("failure", ["unreadable", "rewritten"])
+def test_sample_reviews_survives_sidecar_replaced_while_drawing(review_store, monkeypatch, failure):
+    """A write racing the draw makes the sampler stream the movie instead of failing."""
+    real_load_rows = review_columns.load_rows
+
+    def racing_load_rows(records, rows, resolve):
+        review_utils.save_reviews("m1", review_store[:10])
+        if failure == "unreadable":
+            raise OSError("sidecar replaced")
+        return real_load_rows(records, rows, resolve)
+    monkeypatch.setattr(review_columns, "load_rows", racing_load_rows)
+
+    sample = review_utils.sample_reviews(5, movie_id="m1", seed=3)
+    assert len({r["review_id"] for r in sample}) == 5
+    assert {r["review_id"] for r in sample} <= {r["review_id"] for r in review_store[:10]}
+
+
+def test_sample_route(review_store, auth_user):
+    auth_user("member")
+    res = client.get("/reviews/sample", params={"n": 3, "movie_id": "m1"})
+    assert res.status_code == 200
+    assert len(res.json()) == 3
+    assert client.get("/reviews/sample", params={"rating": 11}).status_code == 422
+
+
+
+# -------------------------------------------------------------------
+# BULK IMPORT
+# -------------------------------------------------------------------
+def _ndjson(rows):
+    return "\n".join(r if isinstance(r, str) else json.dumps(r) for r in rows) + "\n"
+
+
+def test_import_batch_writes_once_per_movie(review_store, monkeypatch):
+    """One store write per movie and one users-file write per batch; bad rows are reported."""
+    saves, user_writes = [], []
+    real_save = review_utils.save_reviews
+    monkeypatch.setattr(review_utils, "save_reviews", lambda m, r: saves.append(m) or real_save(m, r))
+    monkeypatch.setattr(review_utils, "load_active_users", lambda: [{"user_id": "p1"}, {"user_id": "p2"}])
+    monkeypatch.setattr(review_utils, "save_active_users", lambda users: user_writes.append(users))
+
+    rows = [
+        {"movie_id": "m2", "user_id": "p1", "title": "a", "rating": 7, "text": "fine"},
+        {"movie_id": "m2", "user_id": "p2", "title": "b", "rating": 4, "text": "meh"},
+        {"movie_id": "m3", "user_id": "p1", "title": "c", "rating": 9, "text": "great", "date": "2020-05-01"},
+        {"movie_id": "m2", "user_id": "p1", "title": "d", "rating": 2, "text": "again"},
+        {"movie_id": "m1", "user_id": "u3", "title": "e", "rating": 2, "text": "seeded user"},
+        {"movie_id": "m3", "user_id": "p2", "title": "f", "rating": 11, "text": "x"},
+        "not json",
+    ]
+    result = review_utils.import_reviews_batch(list(enumerate(_ndjson(rows).splitlines(), start=1)))
+
+    assert result["imported"] == 3
+    assert [e["line"] for e in result["errors"]] == [4, 5, 6, 7]
+    assert "rating" in result["errors"][2]["error"]
+    assert sorted(saves) == ["m2", "m3"]
+    assert len(user_writes) == 1
+    assert {u["user_id"]: sorted(u["movies_reviewed"]) for u in user_writes[0]} == {"p1": ["m2", "m3"], "p2": ["m2"]}
+    assert review_utils.user_already_reviewed("m3", "p1")
+    assert review_utils.filter_sort_reviews("m3")[0]["date"] == "2020-05-01"
+
+
+def test_import_batch_rejects_unknown_movies_and_bad_dates(review_store):
+    """Rows for missing or path-like movie ids and non-ISO dates fail without touching storage."""
+    rows = [
+        {"movie_id": "../../users/users_active", "user_id": "p1", "title": "a", "rating": 7, "text": "x"},
+        {"movie_id": "m404", "user_id": "p1", "title": "b", "rating": 7, "text": "x"},
+        {"movie_id": "m2", "user_id": "p2", "title": "c", "rating": 7, "text": "x", "date": "May 1st 2020"},
+        {"movie_id": "m2", "user_id": "p3", "title": "d", "rating": 7, "text": "x", "date": "2020-05-01T00:00:00"},
+    ]
+    result = review_utils.import_reviews_batch(list(enumerate(_ndjson(rows).splitlines(), start=1)))
+
+    assert result["imported"] == 1
+    assert [e["line"] for e in result["errors"]] == [1, 2, 3]
+    assert "movie_id" in result["errors"][0]["error"]
+    assert result["errors"][1]["error"] == "Movie not found."
+    assert "date" in result["errors"][2]["error"]
+    assert review_utils.list_movie_ids() == ["m1", "m2"]
+    assert review_utils.load_reviews("m2")[0]["date"] == "2020-05-01"
+
+
+def test_bulk_import_route(review_store, auth_user, monkeypatch):
+    monkeypatch.setattr("backend.reviews.router.BULK_BATCH_SIZE", 2)
+    rows = [{"movie_id": "m2", "user_id": f"p{i}", "title": "t", "rating": 5, "text": "ok"} for i in range(5)]
+    body = _ndjson(rows + ["{"])
+
+    auth_user("member")
+    assert client.post("/reviews/bulk", content=body).status_code == 403
+
+    auth_user("administrator")
+    res = client.post("/reviews/bulk", content=body, headers={"Content-Type": "application/x-ndjson"})
+    assert res.status_code == 200
+    data = res.json()
+    assert (data["received"], data["imported"], data["failed"]) == (6, 5, 1)
+    assert data["errors"][0]["line"] == 6
+    assert len(review_utils.load_reviews("m2")) == 5
+
+
+
+# -------------------------------------------------------------------
+# BATCH VOTES
+# -------------------------------------------------------------------
+def test_add_votes_groups_writes_per_movie(review_store, monkeypatch):
+    """Votes on one movie cost one write; results keep input order and report misses."""
+    review_utils.save_reviews("m2", [{**review_store[0], "movie_id": "m2"}])
+    saves = []
+    real_save = review_utils.save_reviews
+    monkeypatch.setattr(review_utils, "save_reviews", lambda m, r: saves.append(m) or real_save(m, r))
+    votes = [review_schemas.BatchVote(movie_id=m, review_id=r, vote=v) for m, r, v in [
+        ("m1", "r06", True), ("m2", "r00", False), ("m1", "r06", False), ("m1", "nope", True), ("m1", "r01", True),
+    ]]
+    results = review_utils.add_votes(votes)
+
+    assert sorted(saves) == ["m1", "m2"]
+    assert [r["ok"] for r in results] == [True, True, True, False, True]
+    assert results[0]["usefulness"] == {"helpful": 3, "total_votes": 7}
+    assert results[2]["usefulness"] == {"helpful": 3, "total_votes": 8}
+    assert results[3]["error"] == "Review not found"
+    review_utils._collections.clear()
+    assert review_utils.get_review("m1", "r06")["usefulness"] == {"helpful": 3, "total_votes": 8}
+
+
+def test_add_votes_skips_movies_without_reviews(review_store):
+    """Votes for unknown movies fail without creating cached collections."""
+    votes = [review_schemas.BatchVote(movie_id=m, review_id="r01", vote=True) for m in ("ghost-1", "m1", "ghost-2")]
+    results = review_utils.add_votes(votes)
+
+    assert [r["ok"] for r in results] == [False, True, False]
+    assert results[0]["error"] == results[2]["error"] == "Movie not found"
+    assert list(review_utils._collections) == ["m1"]
+    assert review_utils.list_movie_ids() == ["m1"]
+
+
+def test_vote_batch_route(review_store, auth_user):
+    auth_user("member")
+    res = client.post("/reviews/votes:batch", json=[{"movie_id": "m1", "review_id": "r02", "vote": True}])
+    assert res.status_code == 200
+    assert res.json()[0]["usefulness"] == {"helpful": 3, "total_votes": 3}
+
+
+
+# -------------------------------------------------------------------
+# COMPRESSED STORAGE
+# -------------------------------------------------------------------
+@pytest.mark.parametrize("codec", ["zlib", "gzip"])
+@pytest.mark.parametrize("chunked", [False, True])
+def test_compressed_storage_round_trip(review_store, monkeypatch, codec, chunked):
+    """Compressed files are smaller and every read path decodes them transparently."""
+    if chunked:
+        monkeypatch.setattr(review_chunks, "CHUNK_SIZE", 4)
+        review_utils.convert_to_chunks("m1")
+    plain_bytes = _stored_bytes("m1")
+    collection = review_utils.ReviewCollection("m1", review_utils.load_reviews("m1"))
+
+    monkeypatch.setattr(review_codec, "CODEC", codec)
+    review_utils.save_reviews("m1", review_utils.load_reviews("m1"))
+    review_utils._collections.clear()
+    assert _stored_bytes("m1") < plain_bytes / 2
+
+    assert sorted(review_utils.load_reviews("m1"), key=lambda r: r["review_id"]) == review_store
+    assert len(list(review_utils.iter_reviews("m1"))) == 25
+    assert review_utils.get_review("m1", "r17")["title"] == "T17"
+    for sort_by, rating in [("date", None), ("rating", None), ("helpful", 2)]:
+        assert review_utils.filter_sort_reviews("m1", rating, sort_by, limit=4) == \
+            collection.page(sort_by, "desc", rating, limit=4)
+
+    # Switching back rewrites as plain JSON; detection handles either
+    monkeypatch.setattr(review_codec, "CODEC", "json")
+    review_utils.add_vote("m1", "r01", review_schemas.Vote(vote=True))
+    review_utils._collections.clear()
+    assert review_utils.get_review("m1", "r01")["usefulness"]["total_votes"] == 2
+
+
+def _stored_bytes(movie_id):
+    if review_utils.is_chunked(movie_id):
+        movie_dir = review_utils._get_chunk_dir(movie_id)
+        return sum(os.path.getsize(os.path.join(movie_dir, n)) for n in os.listdir(movie_dir) if n != "manifest.json")
+    return os.path.getsize(review_utils._get_review_path(movie_id))
+
+
+def test_streaming_reader_decompresses_incrementally(tmp_path):
+    items = [{"n": i, "text": "x" * (i % 50)} for i in range(500)]
+    for codec in review_codec.CODECS:
+        path = tmp_path / f"items.{codec}"
+        path.write_bytes(review_codec.encode(items, codec)[0])
+        assert review_codec.detect(path.read_bytes()[:2]) == codec
+        assert list(review_reader.iter_json_array(str(path), read_size=7)) == items
+    with pytest.raises(ValueError):
+        review_codec.encode(items, "lz4")
+
 
 # in backend: pytest -v tests/test_reviews.py
\ No newline at end of file
@@ -4,11 +4,14 @@ Tests for /users routes:
 - Admin user management (CRUD on /users and /users/{user_id})
 """
 
+import base64
+import json
 import pytest
 from fastapi.testclient import TestClient
 from fastapi import HTTPException
 from backend.main import app
 from backend.users import schemas
+from backend.authentication import utils as auth_utils
 from backend.authentication.security import get_current_user
 
 client = TestClient(app)
@@ -138,11 +141,96 @@ def test_list_users_admin(monkeypatch, auth_user):
         {"user_id": "u1", "username": "user1", "email": "a@a.com", "role": "member", "status": "active",
          "movies_reviewed": [], "watch_later": [], "penalties": []}
     ]
-    monkeypatch.setattr("backend.users.utils.load_active_users", lambda: fake_users)
+    monkeypatch.setattr("backend.users.utils.list_users", lambda *args: (1, fake_users, None))
 
     response = client.get("/users")
     assert response.status_code == 200
     assert response.json()[0]["username"] == "user1"
+    assert response.headers["X-Total-Count"] == "1"
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_list_users_paginated_and_filtered(monkeypatch, tmp_path, auth_user):
+    """GET /users → role/status/prefix filters from the indexes, cursor pages, total count."""
+    auth_user("administrator")
+    monkeypatch.setattr(auth_utils, "ACTIVE_FILE", str(tmp_path / "users_active.json"))
+    monkeypatch.setattr(auth_utils, "INACTIVE_FILE", str(tmp_path / "users_inactive.json"))
+
+    def user(i, role, status):
+        return {"user_id": f"u{i}", "username": f"{'critic' if role == 'critic' else 'fan'}_{i:02d}",
+                "email": f"u{i}@example.com", "role": role, "status": status,
+                "movies_reviewed": [], "watch_later": [], "penalties": []}
+    auth_utils.save_active_users([user(i, "critic" if i % 3 == 0 else "member", "active") for i in range(10)])
+    auth_utils.save_inactive_users([user(i, "member", "inactive") for i in range(10, 25)])
+
+    first = client.get("/users", params={"limit": 4})
+    assert first.headers["X-Total-Count"] == "25"
+    names = [u["username"] for u in first.json()]
+    assert names == sorted(names) and len(names) == 4
+
+    seen, cursor = [], None
+    while True:
+        params = {"status": "inactive", "limit": 4, **({"cursor": cursor} if cursor else {})}
+        page = client.get("/users", params=params)
+        assert page.headers["X-Total-Count"] == "15"
+        seen += [u["user_id"] for u in page.json()]
+        cursor = page.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert sorted(seen) == sorted(f"u{i}" for i in range(10, 25)) and len(seen) == 15
+
+    critics = client.get("/users", params={"role": "critic", "status": "active"})
+    assert [u["user_id"] for u in critics.json()] == ["u0", "u3", "u6", "u9"]
+    prefixed = client.get("/users", params={"username_prefix": "fan_1", "role": "member"})
+    assert prefixed.headers["X-Total-Count"] == "10"  # fan_10 … fan_19
+    assert client.get("/users", params={"cursor": "not-a-cursor"}).status_code == 400
+
+    # Index follows writes
+    auth_utils.update_user_fields("u1", {"role": "critic", "username": "critic_01"})
+    assert client.get("/users", params={"role": "critic"}).headers["X-Total-Count"] == "5"
+
+
+def test_list_users_reindexes_only_the_written_file(monkeypatch, tmp_path):
+    """A write to the active file leaves the inactive file's index alone; a user in both files is listed once."""
+    monkeypatch.setattr(auth_utils, "ACTIVE_FILE", str(tmp_path / "users_active.json"))
+    monkeypatch.setattr(auth_utils, "INACTIVE_FILE", str(tmp_path / "users_inactive.json"))
+
+    def user(i, status):
+        return {"user_id": f"u{i}", "username": f"user_{i:02d}", "email": f"u{i}@example.com",
+                "role": "member", "status": status, "movies_reviewed": [], "watch_later": [], "penalties": []}
+    auth_utils.save_active_users([user(i, "active") for i in range(5)])
+    auth_utils.save_inactive_users([user(i, "inactive") for i in range(5, 10)])
+    auth_utils.list_users()
+    inactive = auth_utils._file_groups[auth_utils.INACTIVE_FILE]
+
+    auth_utils.update_user_fields("u3", {"username": "aaa"})
+    total, users, next_cursor = auth_utils.list_users(limit=2)
+    assert auth_utils._file_groups[auth_utils.INACTIVE_FILE] is inactive
+    assert total == 10 and [u["user_id"] for u in users] == ["u3", "u0"] and next_cursor
+
+    total, users, _ = auth_utils.list_users(limit=3, cursor=auth_utils.encode_user_cursor(user(4, "active")))
+    assert total == 10 and [u["user_id"] for u in users] == ["u5", "u6", "u7"]
+
+    # A user saved into both files (e.g. mid-move) counts once, as the active record
+    auth_utils.save_inactive_users([user(i, "inactive") for i in range(5, 10)] + [user(1, "inactive")])
+    total, users, _ = auth_utils.list_users(limit=100)
+    assert total == 10 and len(users) == 10
+    assert next(u for u in users if u["user_id"] == "u1")["status"] == "active"
+    assert auth_utils.list_users(status="inactive")[0] == 5
+
+
+@pytest.mark.parametrize("fields", [[1, 2], ["fan_01", None], [["fan_01"], "u1"]])
+def test_list_users_cursor_with_wrong_types(monkeypatch, tmp_path, auth_user, fields):
+    """GET /users → 400 (not 500) for a well-formed cursor holding non-string fields."""
+    auth_user("administrator")
+    monkeypatch.setattr(auth_utils, "ACTIVE_FILE", str(tmp_path / "users_active.json"))
+    monkeypatch.setattr(auth_utils, "INACTIVE_FILE", str(tmp_path / "users_inactive.json"))
+    auth_utils.save_active_users([{"user_id": "u1", "username": "fan_01", "email": "u1@example.com",
+                                   "role": "member", "status": "active"}])
+    cursor = base64.urlsafe_b64encode(json.dumps(fields).encode()).decode().rstrip("=")
+    with pytest.raises(ValueError):
+        auth_utils.decode_user_cursor(cursor)
+    assert client.get("/users", params={"cursor": cursor}).status_code == 400
 
 
 def test_list_users_forbidden(monkeypatch, auth_user):
@@ -257,5 +345,19 @@ def test_create_user_forbidden(auth_user):
     response = client.post("/users", json=payload)
     assert response.status_code == 403
 
+def test_get_user_reviews(monkeypatch, auth_user):
+    """GET /users/{user_id}/reviews → paginated review history with total count."""
+    auth_user("member")
+    review = {
+        "review_id": "r1", "movie_id": "m1", "user_id": "u1", "title": "Good", "rating": 8,
+        "date": "2025-01-01", "text": "Nice!", "usefulness": {"helpful": 0, "total_votes": 0},
+    }
+    monkeypatch.setattr("backend.reviews.utils.get_user_reviews", lambda uid, skip, limit: (41, [review]))
+
+    response = client.get("/users/u1/reviews", params={"skip": 40})
+    assert response.status_code == 200
+    assert response.headers["X-Total-Count"] == "41"
+    assert response.json()[0]["review_id"] == "r1"
+
 
 # in backend: pytest -v tests/test_users.py
\ No newline at end of file
@@ -6,9 +6,12 @@ Includes:
 - Admin-level CRUD routes (/users/, /users/{user_id})
 """
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from typing import List, Optional
 from backend.authentication.security import get_current_user
 from backend.users import utils, schemas
+from backend.reviews import utils as review_utils
+from backend.reviews import schemas as review_schemas
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
@@ -66,11 +69,30 @@ def change_my_status(
 # =========================
 
 @router.get("/", response_model=list[schemas.UserPublic])
-def list_users(current_user: schemas.UserToken = Depends(get_current_user)):
-    """Admin: list all active users."""
+def list_users(
+    response: Response,
+    role: Optional[str] = Query(None, description="Filter by role"),
+    status: Optional[str] = Query(None, description="Filter by status (active, inactive)"),
+    username_prefix: Optional[str] = Query(None, description="Usernames starting with this"),
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+    current_user: schemas.UserToken = Depends(get_current_user),
+):
+    """
+    Admin: list users ordered by username, one page at a time.
+    The number of matching users is in X-Total-Count; when more follow,
+    X-Next-Cursor holds the cursor for the next page.
+    """
     if current_user.role != "administrator":
         raise HTTPException(status_code=403, detail="Not authorized.")
-    return utils.load_active_users()
+    try:
+        total, users, next_cursor = utils.list_users(role, status, username_prefix, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response.headers["X-Total-Count"] = str(total)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return users
 
 
 @router.get("/{user_id}", response_model=schemas.UserPublic)
@@ -84,6 +106,20 @@ def get_user(user_id: str, current_user: schemas.UserToken = Depends(get_current
     return user
 
 
+@router.get("/{user_id}/reviews", response_model=List[review_schemas.Review])
+def get_user_reviews(
+    user_id: str,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: schemas.UserToken = Depends(get_current_user),
+):
+    """List a user's reviews across all movies, most recent first (total in X-Total-Count)."""
+    total, reviews = review_utils.get_user_reviews(user_id, skip=skip, limit=limit)
+    response.headers["X-Total-Count"] = str(total)
+    return reviews
+
+
 @router.patch("/{user_id}", response_model=schemas.UserPublic)
 def update_user_admin(
     user_id: str,
@@ -3,60 +3,43 @@ Utility functions for managing users stored in JSON files.
 Handles reading, writing, updating, and deleting user records.
 """
 
-import os, json, uuid
-from passlib.context import CryptContext
+import uuid
 from fastapi import HTTPException
 from backend.users import schemas
 from backend.authentication import security
-
-# 📁 File paths
-BASE_DIR = os.path.join(os.path.dirname(__file__), "..", "data", "users")
-ACTIVE_FILE = os.path.join(BASE_DIR, "users_active.json")
-INACTIVE_FILE = os.path.join(BASE_DIR, "users_inactive.json")
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from backend.authentication import utils as auth_utils
 
 
 # =========================
 # 🔹 Helper functions
 # =========================
-
-def _load_json(path):
-    if not os.path.exists(path):
-        return []
-    with open(path, "r") as f:
-        return json.load(f)
-
-
-def _save_json(path, data):
-    with open(path, "w") as f:
-        json.dump(data, f, indent=4)
-
+# Users are read and written through the indexed repository in
+# backend.authentication.utils (parsed once, O(1) lookups).
 
 def load_active_users():
-    return _load_json(ACTIVE_FILE)
+    return auth_utils.load_active_users()
 
 
 def load_inactive_users():
-    return _load_json(INACTIVE_FILE)
+    return auth_utils.load_inactive_users()
 
 
 def get_user_by_id(user_id: str):
-    users = load_active_users() + load_inactive_users()
-    for user in users:
-        if user["user_id"] == user_id:
-            return user
-    return None
+    return auth_utils.get_user_by_id(user_id)
 
 
-def add_user(new_user: schemas.UserCreate):
-    users = load_active_users()
+def list_users(role=None, status=None, username_prefix=None, limit: int = 50, cursor=None):
+    """(total, page, next cursor) from the repository's role/status/username indexes."""
+    return auth_utils.list_users(role, status, username_prefix, limit, cursor)
+
 
+def add_user(new_user: schemas.UserCreate):
     # Prevent duplicates
-    if any(u["email"] == new_user.email for u in users):
+    if auth_utils.get_user_by_email(new_user.email):
         raise HTTPException(status_code=400, detail="Email already registered.")
+    users = load_active_users()
 
-    hashed_pw = pwd_context.hash(new_user.password)
+    hashed_pw = security.hash_password(new_user.password)
     user_obj = {
         "user_id": str(uuid.uuid4()),
         "username": new_user.username,
@@ -70,7 +53,7 @@ def add_user(new_user: schemas.UserCreate):
     }
 
     users.append(user_obj)
-    _save_json(ACTIVE_FILE, users)
+    auth_utils.save_active_users(users)
     return user_obj
 
 
@@ -79,7 +62,7 @@ def update_user(user_id: str, updates: dict):
     for user in users:
         if user["user_id"] == user_id:
             user.update(updates)
-            _save_json(ACTIVE_FILE, users)
+            auth_utils.save_active_users(users)
             return user
     raise HTTPException(status_code=404, detail="User not found.")
 
@@ -101,23 +84,21 @@ def update_user_status(user_id: str, status: str):
                     raise HTTPException(status_code=400, detail="Already in that state.")
                 target_list.append(user)
                 user_list.remove(user)
-                _save_json(ACTIVE_FILE, active)
-                _save_json(INACTIVE_FILE, inactive)
+                auth_utils.save_active_users(active)
+                auth_utils.save_inactive_users(inactive)
+                auth_utils.bump_token_generation(user_id)  # tokens carry the old status
                 return {"message": f"User {user_id} moved to {status}."}
 
     raise HTTPException(status_code=404, detail="User not found.")
 
 
 def change_password(user_id: str, old_password: str, new_password: str):
-    users = load_active_users()
-    for user in users:
-        if user["user_id"] == user_id:
-            if not pwd_context.verify(old_password, user["hashed_password"]):
-                raise HTTPException(status_code=403, detail="Incorrect old password.")
-            user["hashed_password"] = pwd_context.hash(new_password)
-            _save_json(ACTIVE_FILE, users)
-            return
-    raise HTTPException(status_code=404, detail="User not found.")
+    user = get_user_by_id(user_id)
+    if not user or user.get("status") != "active":
+        raise HTTPException(status_code=404, detail="User not found.")
+    if not security.verify_password(old_password, user["hashed_password"]):
+        raise HTTPException(status_code=403, detail="Incorrect old password.")
+    auth_utils.update_user_fields(user_id, {"hashed_password": security.hash_password(new_password)})
 
 
 def delete_user(user_id: str):
@@ -125,4 +106,5 @@ def delete_user(user_id: str):
     updated = [u for u in users if u["user_id"] != user_id]
     if len(users) == len(updated):
         raise HTTPException(status_code=404, detail="User not found.")
-    _save_json(ACTIVE_FILE, updated)
+    auth_utils.save_active_users(updated)
+    auth_utils.bump_token_generation(user_id)